@@ -0,0 +1,202 @@
+"""Resolución por lotes sin interfaz gráfica.
+
+Solo importa 'core' y 'data', así que funciona en servidores sin pantalla:
+
+    python cli.py instancias/ --motor held_karp --tiempo 30 --procesos 4 --salida resultados.jsonl
+    python cli.py --listar-motores
+
+Con --cache DIR las matrices y los resultados completos se guardan por contenido (huella de
+coordenadas, métrica y parámetros): volver a correr la misma configuración no recalcula nada.
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from core import logica, traza
+from core.cache_resultados import CacheResultados, huella
+from core.espacial import grafo_candidatos
+from core.motores import ejecutar, listar_motores, obtener_motor
+from data.instancias import (cargar_instancia, cargar_o_construir_matriz, listar_instancias, matriz_de_instancia,
+                             matriz_guardada_vigente)
+
+# Métrica del grafo de candidatos según el tipo de instancia
+_METRICA_GRAFO = {'LATLON': 'aereo', 'EUC_2D': 'euclidea'}
+
+# Una caché por directorio en cada proceso: la memoria sirve entre instancias repetidas
+_CACHES = {}
+
+
+def _cache(directorio):
+    if directorio not in _CACHES:
+        _CACHES[directorio] = CacheResultados(directorio)
+    return _CACHES[directorio]
+
+
+def resolver(ruta, motor, tiempo_max=None, metrica='aereo', guardar_matriz=False, medir_memoria=False,
+             vecinos=None, cache=None, ignorar_limite=False):
+    """Resuelve una instancia y devuelve un dict serializable con ruta, costo, tiempos y los
+    contadores de core.motores.ejecutar.
+    Con guardar_matriz la matriz se guarda/reutiliza como .npy junto a la instancia. Con
+    vecinos=k no se arma la matriz densa sino un grafo de k vecinas (core.espacial).
+    cache es un directorio de core.cache_resultados: si la instancia ya se resolvió con los
+    mismos parámetros se devuelve ese registro (con 'desde_cache': True).
+    Una instancia más grande que el n_max del motor se rechaza salvo con ignorar_limite."""
+    instancia = cargar_instancia(ruta)
+    nombres = instancia.nombres
+    n = instancia.n
+    n_max = obtener_motor(motor).n_max
+    if n_max and n > n_max and not ignorar_limite:
+        raise ValueError(f"El motor {motor} no es práctico para {n} ciudades (n_max={n_max}); "
+                         f"use un motor heurístico o --ignorar-limite")
+
+    memo = _cache(cache) if cache else None
+    if memo is not None:
+        contenido = huella(instancia.tipo, instancia.pesos if instancia.tipo == 'EXPLICIT' else instancia.coords)
+        clave = huella(contenido, metrica, motor=motor, tiempo=tiempo_max, vecinos=vecinos)
+        guardado = memo.obtener(clave)
+        if guardado is not None:
+            return dict(guardado, instancia=ruta, desde_cache=True)
+
+    desde_memo = False
+    t0 = time.perf_counter()
+    with traza.tramo('matriz_instancia', 'matriz', n=n, metrica=metrica):
+        if vecinos:
+            if metrica != 'aereo' or instancia.tipo not in _METRICA_GRAFO:
+                raise ValueError(f"--vecinos necesita coordenadas LATLON o EUC_2D y métrica aérea "
+                                 f"(instancia {instancia.tipo}, métrica {metrica})")
+            if not obtener_motor(motor).grafo:
+                raise ValueError(f"El motor {motor} no trabaja sobre el grafo de vecinos")
+            matriz = grafo_candidatos(instancia.coords, vecinos, _METRICA_GRAFO[instancia.tipo])
+        elif guardar_matriz:
+            desde_memo = matriz_guardada_vigente(instancia, metrica)
+            matriz = cargar_o_construir_matriz(instancia, metrica)
+        elif memo is not None:
+            clave_matriz = huella(contenido, metrica, tipo='matriz')
+            matriz = memo.obtener(clave_matriz)
+            if matriz is None:
+                matriz = matriz_de_instancia(instancia, metrica)
+                # Si OSRM no respondió completo la matriz es aérea o mixta: no vale como carretera
+                if metrica != 'carretera' or logica.LAST_ROAD_MATRIX_STATUS == 'ok':
+                    memo.guardar(clave_matriz, matriz)
+            else:
+                desde_memo = True
+        else:
+            matriz = matriz_de_instancia(instancia, metrica)
+    t_matriz = time.perf_counter() - t0
+    # Las matrices de carretera guardadas (caché o .npy) solo se escribieron si OSRM respondió completo
+    estado_carretera = None
+    if metrica == 'carretera':
+        estado_carretera = 'ok' if desde_memo else logica.LAST_ROAD_MATRIX_STATUS
+
+    registro = ejecutar(motor, matriz, tiempo_max=tiempo_max, medir_memoria=medir_memoria)
+    mejor_ruta = registro['ruta']
+
+    resultado = {
+        'instancia': ruta,
+        'motor': motor,
+        'metrica': metrica,
+        'estado_carretera': estado_carretera,
+        'n': n,
+        'costo': registro['costo'],
+        'ruta': mejor_ruta,
+        'nombres': [nombres[i] for i in mejor_ruta] if mejor_ruta is not None else None,
+        'completo': registro['completo'],
+        'tiempo_matriz': t_matriz,
+        'tiempo_solver': registro['tiempo'],
+        'tiempo_mejor': registro['tiempo_mejor'],
+        'entregas': registro['entregas'],
+        'mejoras': registro['mejoras'],
+        'evaluaciones': registro['evaluaciones'],
+        'nodos_expandidos': registro['nodos_expandidos'],
+        'memoria_pico': registro['memoria_pico'],
+    }
+    # Solo los resultados completos: uno cortado por tiempo depende de la carga de la máquina,
+    # y uno de carretera sobre una matriz aérea o mixta no vale para la próxima corrida
+    if memo is not None and registro['completo'] and (metrica != 'carretera' or estado_carretera == 'ok'):
+        memo.guardar(clave, resultado)
+    return resultado
+
+
+def _resolver_seguro(args):
+    ruta, motor, tiempo_max, metrica, guardar_matriz, medir_memoria, vecinos, cache, ignorar_limite = args
+    try:
+        return resolver(ruta, motor, tiempo_max, metrica, guardar_matriz, medir_memoria, vecinos, cache,
+                        ignorar_limite)
+    except Exception as e:
+        return {'instancia': ruta, 'motor': motor, 'error': f"{type(e).__name__}: {e}"}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resuelve instancias TSP sin interfaz gráfica.")
+    parser.add_argument('rutas', nargs='*', help="Archivos de instancia o directorios")
+    parser.add_argument('--motor', choices=[m.nombre for m in listar_motores()], default='busqueda_local')
+    parser.add_argument('--ignorar-limite', action='store_true',
+                        help="Corre el motor aunque la instancia supere su n_max (ver --listar-motores)")
+    parser.add_argument('--listar-motores', action='store_true', help="Muestra los motores y sus capacidades")
+    parser.add_argument('--tiempo', type=float, default=None, help="Presupuesto por instancia (s)")
+    parser.add_argument('--metrica', choices=('aereo', 'carretera'), default='aereo')
+    parser.add_argument('--procesos', type=int, default=1, help="Instancias resueltas en paralelo")
+    parser.add_argument('--guardar-matriz', action='store_true',
+                        help="Guarda la matriz como .npy y la reutiliza (mmap) en siguientes corridas")
+    parser.add_argument('--vecinos', type=int, default=None,
+                        help="Usa un grafo de k vecinas en vez de la matriz densa (instancias grandes)")
+    parser.add_argument('--cache', default=None,
+                        help="Directorio donde se guardan matrices y resultados por contenido y se "
+                             "reutilizan en siguientes corridas")
+    parser.add_argument('--memoria', action='store_true',
+                        help="Mide la memoria pico del solver con tracemalloc (más lento)")
+    parser.add_argument('--traza', default=None,
+                        help="Guarda los tramos (matriz, OSRM, solver) en formato Chrome/Perfetto e imprime "
+                             "un resumen; las instancias se resuelven en este proceso")
+    parser.add_argument('--salida', default=None, help="Archivo JSON lines (por defecto stdout)")
+    args = parser.parse_args(argv)
+
+    if args.listar_motores:
+        for m in listar_motores():
+            capacidades = ['exacto' if m.exacto else 'heurístico']
+            if m.asimetrico:
+                capacidades.append('asimétrico')
+            if m.anytime:
+                capacidades.append('anytime')
+            if m.grafo:
+                capacidades.append('grafo')
+            limite = f"n<={m.n_max}" if m.n_max else ""
+            print(f"{m.nombre:24} {', '.join(capacidades):38} {limite:8} {m.descripcion}")
+        return 0
+    if not args.rutas:
+        parser.error("se necesita al menos una instancia o directorio")
+
+    instancias = listar_instancias(args.rutas)
+    tareas = [(ruta, args.motor, args.tiempo, args.metrica, args.guardar_matriz, args.memoria,
+               args.vecinos, args.cache, args.ignorar_limite)
+              for ruta in instancias]
+
+    if args.traza:
+        traza.activar()
+
+    salida = open(args.salida, 'w', encoding='utf-8') if args.salida else sys.stdout
+    try:
+        # Los tramos viven en memoria del proceso, así que con --traza no se usa el pool
+        if args.procesos > 1 and len(tareas) > 1 and not args.traza:
+            with ProcessPoolExecutor(max_workers=min(args.procesos, len(tareas))) as pool:
+                resultados = pool.map(_resolver_seguro, tareas)
+                for resultado in resultados:
+                    salida.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+                    salida.flush()
+        else:
+            for tarea in tareas:
+                salida.write(json.dumps(_resolver_seguro(tarea), ensure_ascii=False) + "\n")
+                salida.flush()
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+        if args.traza:
+            traza.exportar_chrome(args.traza)
+            traza.resumen()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
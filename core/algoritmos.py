@@ -1,34 +1,80 @@
 import itertools
-from .logica import calcular_costo_ruta
+import random
+from collections import deque
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from .espacial import GrafoCandidatos, MatrizPerezosa
+from .logica import calcular_costo_ruta, calcular_costos_lote
 
-def generador_vecino_mas_cercano(n_ciudades, matriz):
-    visitados = [False] * n_ciudades
-    ruta = [0]
-    visitados[0] = True
-    nodo_actual = 0
-    
-    yield ruta, 0 
+def generador_vecino_mas_cercano(n_ciudades, matriz, ciudad_inicial=0):
+    if isinstance(matriz, GrafoCandidatos):
+        yield from _vecino_mas_cercano_en_grafo(matriz, ciudad_inicial)
+        return
+    # Con una MatrizPerezosa cada paso pide una sola fila
+    d = matriz if isinstance(matriz, MatrizPerezosa) else np.asarray(matriz, dtype=np.float64)
+    visitados = np.zeros(n_ciudades, dtype=bool)
+    ruta = [ciudad_inicial]
+    visitados[ciudad_inicial] = True
+    nodo_actual = ciudad_inicial
+    costo = 0.0
+
+    yield ruta, 0
 
     for _ in range(n_ciudades - 1):
-        mas_cercano = -1
-        min_dist = float('inf')
-        
-        for v in range(n_ciudades):
-            if not visitados[v] and matriz[nodo_actual][v] < min_dist:
-                min_dist = matriz[nodo_actual][v]
-                mas_cercano = v
-        
-        if mas_cercano != -1:
-            nodo_actual = mas_cercano
-            visitados[nodo_actual] = True
-            ruta.append(nodo_actual)
-            costo = calcular_costo_ruta(ruta, matriz)
-            yield ruta, costo
+        # argmin enmascarado sobre la fila actual; el costo se acumula en vez de recalcularse
+        fila = np.where(visitados, np.inf, d[nodo_actual])
+        mas_cercano = int(np.argmin(fila))
+        costo += float(fila[mas_cercano])
+        nodo_actual = mas_cercano
+        visitados[nodo_actual] = True
+        ruta.append(nodo_actual)
+        yield ruta, costo
 
     # Cerrar ciclo
-    ruta.append(0)
-    costo_final = calcular_costo_ruta(ruta, matriz)
-    yield ruta, costo_final
+    ruta.append(ciudad_inicial)
+    costo += float(d[nodo_actual][ciudad_inicial])
+    yield ruta, costo
+
+def _vecino_mas_cercano_en_grafo(grafo, ciudad_inicial=0):
+    """Vecino más cercano sobre un GrafoCandidatos: toma la primera vecina libre de la lista y
+    solo si están todas visitadas busca en la grilla espacial, sin matriz densa."""
+    visitados = np.zeros(grafo.n, dtype=bool)
+    ruta = [ciudad_inicial]
+    visitados[ciudad_inicial] = True
+    conteo = grafo.grilla.conteo_por_celda(~visitados)
+    nodo_actual = ciudad_inicial
+    costo = 0.0
+
+    yield ruta, 0
+
+    for _ in range(grafo.n - 1):
+        libres = ~visitados[grafo.vecinos[nodo_actual]]
+        if libres.any():
+            j = int(np.argmax(libres))
+            siguiente, paso = int(grafo.vecinos[nodo_actual, j]), float(grafo.distancias[nodo_actual, j])
+        else:
+            siguiente, paso = grafo.grilla.mas_cercano(nodo_actual, ~visitados, conteo)
+        costo += paso
+        nodo_actual = siguiente
+        visitados[nodo_actual] = True
+        conteo[grafo.grilla.cx[nodo_actual], grafo.grilla.cy[nodo_actual]] -= 1
+        ruta.append(nodo_actual)
+        yield ruta, costo
+
+    ruta.append(ciudad_inicial)
+    costo += grafo.distancia(nodo_actual, ciudad_inicial)
+    yield ruta, costo
+
+def _ultimo(generador):
+    """Consume un generador (ruta, costo) y devuelve solo su última entrega."""
+    return deque(generador, maxlen=1)[0]
+
+def _rotar_a_deposito(ruta):
+    """Reordena un ciclo cerrado para que empiece y termine en la ciudad 0."""
+    cuerpo = ruta[:-1]
+    k = cuerpo.index(0)
+    return cuerpo[k:] + cuerpo[:k] + [0]
 
 def generador_fuerza_bruta(n_ciudades, matriz):
     indices = range(1, n_ciudades)
@@ -47,4 +93,869 @@ def generador_fuerza_bruta(n_ciudades, matriz):
             mejor_ruta = list(ruta_actual)
 
     # Entrega final garantizada
-    yield mejor_ruta, min_costo
\ No newline at end of file
+    yield mejor_ruta, min_costo
+
+def _lotes_de_rutas(n_ciudades, prefijo=(), tam_lote=4096):
+    """Genera bloques (lote, n+1) de rutas cerradas en 0 que empiezan por 'prefijo'."""
+    resto = [c for c in range(1, n_ciudades) if c not in prefijo]
+    k = len(resto)
+    inicio = 1 + len(prefijo)
+    if k == 0:
+        yield np.array([[0, *prefijo, 0]], dtype=np.intp)
+        return
+    perms = itertools.permutations(resto)
+    while True:
+        plano = np.fromiter(itertools.chain.from_iterable(itertools.islice(perms, tam_lote)), dtype=np.intp)
+        if plano.size == 0:
+            return
+        rutas = np.zeros((plano.size // k, n_ciudades + 1), dtype=np.intp)
+        rutas[:, 1:inicio] = prefijo
+        rutas[:, inicio:-1] = plano.reshape(-1, k)
+        yield rutas
+
+def _mejor_de_lotes(n_ciudades, matriz, prefijo=(), tam_lote=4096):
+    """Recorre los bloques de rutas y solo compara el argmin de cada bloque con el mejor."""
+    mejor_ruta = None
+    min_costo = float('inf')
+    evaluadas = 0
+    for rutas in _lotes_de_rutas(n_ciudades, prefijo, tam_lote):
+        costos = calcular_costos_lote(rutas, matriz)
+        evaluadas += len(costos)
+        i = int(np.argmin(costos))
+        if costos[i] < min_costo:
+            min_costo = float(costos[i])
+            mejor_ruta = rutas[i].tolist()
+        yield mejor_ruta, min_costo, evaluadas
+
+def generador_fuerza_bruta_vectorizada(n_ciudades, matriz, tam_lote=4096, estadisticas=None):
+    """Fuerza bruta evaluando bloques de permutaciones con NumPy.
+
+    Entrega la mejor ruta tras cada bloque (no cada permutación), por lo que conviene
+    cuando interesa el resultado más que la animación de cada intento.
+    'estadisticas' (opcional) se actualiza con 'evaluadas'.
+    """
+    if estadisticas is None:
+        estadisticas = {}
+    estadisticas['evaluadas'] = 0
+    d = np.asarray(matriz, dtype=np.float64)
+    mejor_ruta, min_costo = None, float('inf')
+    for mejor_ruta, min_costo, evaluadas in _mejor_de_lotes(n_ciudades, d, tam_lote=tam_lote):
+        estadisticas['evaluadas'] = evaluadas
+        yield mejor_ruta, min_costo
+    yield mejor_ruta, min_costo
+
+# Matriz compartida por cada proceso trabajador (se envía una sola vez al iniciarlo)
+_MATRIZ_TRABAJADOR = None
+_VECINAS_TRABAJADOR = None
+
+def _iniciar_trabajador(matriz, vecinas=None):
+    global _MATRIZ_TRABAJADOR, _VECINAS_TRABAJADOR
+    _MATRIZ_TRABAJADOR = matriz
+    _VECINAS_TRABAJADOR = vecinas
+
+def _mejor_con_prefijo(prefijo, n_ciudades):
+    """Recorre todas las permutaciones que empiezan por 'prefijo' y devuelve solo la mejor."""
+    resultado = (None, float('inf'), 0)
+    for resultado in _mejor_de_lotes(n_ciudades, _MATRIZ_TRABAJADOR, prefijo):
+        pass
+    return resultado
+
+def generador_fuerza_bruta_paralela(n_ciudades, matriz, procesos=None, largo_prefijo=None, estadisticas=None):
+    """Fuerza bruta repartida en un pool de procesos según prefijos fijos de la permutación.
+
+    Cada bloque corresponde a las primeras 'largo_prefijo' ciudades tras el depósito y
+    devuelve solo su mejor ruta. El proceso principal combina los resultados a medida que
+    terminan y entrega la mejor ruta hasta el momento por cada bloque completado.
+    'estadisticas' (opcional) se actualiza con 'bloques_completados', 'bloques_totales'
+    y 'evaluadas'.
+    """
+    if estadisticas is None:
+        estadisticas = {}
+    procesos = procesos or os.cpu_count() or 1
+    libres = n_ciudades - 1
+    if largo_prefijo is None:
+        # Con un solo nivel a veces hay menos bloques que procesos: se usan dos
+        largo_prefijo = 1 if libres >= 4 * procesos else 2
+    largo_prefijo = max(0, min(largo_prefijo, libres - 1))
+
+    prefijos = list(itertools.permutations(range(1, n_ciudades), largo_prefijo))
+    estadisticas['bloques_totales'] = len(prefijos)
+    estadisticas['bloques_completados'] = 0
+    estadisticas['evaluadas'] = 0
+
+    if libres < 2:
+        yield from generador_fuerza_bruta(n_ciudades, matriz)
+        return
+
+    mejor_ruta = None
+    min_costo = float('inf')
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_trabajador,
+                             initargs=(np.asarray(matriz, dtype=np.float64),)) as pool:
+        futuros = [pool.submit(_mejor_con_prefijo, prefijo, n_ciudades) for prefijo in prefijos]
+        try:
+            for futuro in as_completed(futuros):
+                ruta, costo, evaluadas = futuro.result()
+                estadisticas['bloques_completados'] += 1
+                estadisticas['evaluadas'] += evaluadas
+                if costo < min_costo:
+                    min_costo = costo
+                    mejor_ruta = ruta
+                yield mejor_ruta, min_costo
+        finally:
+            # Si el consumidor cierra el generador antes de tiempo no se esperan los bloques pendientes
+            for futuro in futuros:
+                futuro.cancel()
+
+    yield mejor_ruta, min_costo
+
+def _tour_vecino_desde(inicio, n_ciudades):
+    return _ultimo(generador_vecino_mas_cercano(n_ciudades, _MATRIZ_TRABAJADOR, inicio))
+
+def generador_vecino_mas_cercano_multiarranque(n_ciudades, matriz, procesos=1):
+    """Ejecuta vecino más cercano desde cada ciudad y entrega cada mejora (rotada a 0).
+
+    Con procesos > 1 los arranques se reparten en un pool de procesos.
+    """
+    d = np.asarray(matriz, dtype=np.float64)
+    mejor_ruta = None
+    min_costo = float('inf')
+
+    if procesos > 1:
+        pool = ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_trabajador, initargs=(d,))
+        futuros = [pool.submit(_tour_vecino_desde, inicio, n_ciudades) for inicio in range(n_ciudades)]
+        resultados = (f.result() for f in as_completed(futuros))
+    else:
+        pool = None
+        resultados = (_ultimo(generador_vecino_mas_cercano(n_ciudades, d, inicio)) for inicio in range(n_ciudades))
+
+    try:
+        for ruta, costo in resultados:
+            if costo < min_costo:
+                min_costo = costo
+                mejor_ruta = _rotar_a_deposito(ruta)
+                yield mejor_ruta, min_costo
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    yield mejor_ruta, min_costo
+
+def _reconstruir_held_karp(padre, mascara, ultimo):
+    """Recorre la tabla de padres hacia atrás y devuelve el camino 0 -> ... -> ultimo."""
+    camino = []
+    while ultimo >= 0:
+        camino.append(ultimo + 1)
+        previo = int(padre[mascara, ultimo])
+        mascara ^= 1 << ultimo
+        ultimo = previo
+    camino.reverse()
+    return [0] + camino
+
+def generador_held_karp(n_ciudades, matriz):
+    """Programación dinámica de Held-Karp sobre máscaras de bits, O(n^2 * 2^n).
+
+    dp[S, j] es el costo mínimo de salir de 0, visitar el conjunto S (ciudades 1..n-1)
+    y terminar en j. Las tablas se procesan por capas (tamaño de S) de forma vectorizada.
+    Respeta la dirección de la matriz, por lo que sirve para matrices asimétricas
+    (p. ej. carretera). Memoria: ~9 bytes * n * 2^(n-1).
+    """
+    d = np.asarray(matriz, dtype=np.float64)
+    yield [0], 0
+
+    m = n_ciudades - 1
+    if m <= 0:
+        yield [0, 0], 0.0
+        return
+
+    n_mascaras = 1 << m
+    dp = np.full((n_mascaras, m), np.inf)
+    padre = np.full((n_mascaras, m), -1, dtype=np.int8 if m < 127 else np.int16)
+
+    todas = np.arange(n_mascaras, dtype=np.int64)
+    popcount = np.zeros(n_mascaras, dtype=np.int8)
+    for b in range(m):
+        popcount += ((todas >> b) & 1).astype(np.int8)
+
+    # Capa 1: caminos 0 -> j
+    for j in range(m):
+        dp[1 << j, j] = d[0, j + 1]
+
+    sub = d[1:, 1:]
+    for k in range(2, m + 1):
+        capa = todas[popcount == k]
+        for j in range(m):
+            bit = 1 << j
+            mascaras = capa[(capa & bit) != 0]
+            previas = mascaras ^ bit
+            # Las columnas fuera de 'previas' valen inf, así que no necesitan máscara extra
+            candidatos = dp[previas] + sub[:, j]
+            mejor = np.argmin(candidatos, axis=1)
+            dp[mascaras, j] = candidatos[np.arange(len(mascaras)), mejor]
+            padre[mascaras, j] = mejor
+
+        # Mejor camino parcial de la capa, para que la animación muestre el avance
+        filas = dp[capa]
+        idx = int(np.argmin(filas))
+        fila, ultimo = divmod(idx, m)
+        mascara = int(capa[fila])
+        yield _reconstruir_held_karp(padre, mascara, ultimo), float(filas[fila, ultimo])
+
+    completa = n_mascaras - 1
+    totales = dp[completa] + d[1:, 0]
+    ultimo = int(np.argmin(totales))
+    ruta = _reconstruir_held_karp(padre, completa, ultimo) + [0]
+    yield ruta, float(totales[ultimo])
+
+
+def _reducir_matriz(m):
+    """Reduce filas y columnas de m in situ y devuelve la suma reducida (cota inferior)."""
+    filas = m.min(axis=1)
+    filas[np.isinf(filas)] = 0.0
+    m -= filas[:, None]
+    columnas = m.min(axis=0)
+    columnas[np.isinf(columnas)] = 0.0
+    m -= columnas
+    return float(filas.sum() + columnas.sum())
+
+def _arbol_minimo(d):
+    """Árbol de expansión mínima de Prim en O(n^2) vectorizado sobre una matriz simétrica.
+
+    Parte de 0 y devuelve (orden, padre): las demás ciudades en el orden en que entran al
+    árbol y el arreglo de padres (padre[0] = 0), así que las aristas son (padre[v], v).
+    """
+    n = len(d)
+    orden = np.empty(max(n - 1, 0), dtype=np.intp)
+    en_arbol = np.zeros(n, dtype=bool)
+    en_arbol[0] = True
+    padre = np.zeros(n, dtype=np.intp)
+    dist = d[0].copy()
+    dist[0] = np.inf
+    for k in range(n - 1):
+        v = int(np.argmin(dist))
+        en_arbol[v] = True
+        orden[k] = v
+        mejora = (d[v] < dist) & ~en_arbol
+        padre[mejora] = v
+        dist[mejora] = d[v][mejora]
+        dist[v] = np.inf
+    return orden, padre
+
+def _costo_arbol_minimo(d, nodos):
+    """Peso del árbol de expansión mínima sobre los nodos dados."""
+    if len(nodos) <= 1:
+        return 0.0
+    sub = d[np.ix_(nodos, nodos)]
+    orden, padre = _arbol_minimo(sub)
+    return float(sub[padre[orden], orden].sum())
+
+def generador_branch_and_bound(n_ciudades, matriz, estadisticas=None):
+    """Ramificación y acotamiento en profundidad.
+
+    La cota de cada nodo es el máximo entre la de matriz reducida (Little et al.) y una
+    cota de 1-árbol: costo del camino parcial + MST de las ciudades pendientes + las
+    aristas más baratas que las unen con los extremos del camino. El incumbente inicial
+    es el tour de vecino más cercano. Cada nodo abierto guarda su matriz reducida (O(n^2));
+    en profundidad la pila tiene a lo sumo O(n^2) nodos (hasta n hijos por nivel y n niveles),
+    así que la memoria es O(n^4) en el peor caso en lugar de O(2^n).
+    Sirve para matrices asimétricas. Si se entrega el diccionario 'estadisticas' se
+    actualiza con 'nodos_expandidos' y 'nodos_podados'.
+    """
+    if estadisticas is None:
+        estadisticas = {}
+    estadisticas['nodos_expandidos'] = 0
+    estadisticas['nodos_podados'] = 0
+
+    d = np.asarray(matriz, dtype=np.float64)
+    if n_ciudades <= 2:
+        ruta = list(range(n_ciudades)) + [0]
+        yield ruta, calcular_costo_ruta(ruta, d)
+        return
+
+    ruta_nn, _ = _ultimo(generador_vecino_mas_cercano(n_ciudades, d))
+    mejor_ruta = list(ruta_nn)
+    mejor_costo = calcular_costo_ruta(mejor_ruta, d)
+    yield list(mejor_ruta), mejor_costo
+
+    # Versión simétrica para el 1-árbol: una cota válida también si d es asimétrica
+    simetrica = np.minimum(d, d.T)
+    np.fill_diagonal(simetrica, np.inf)
+
+    raiz = d.copy()
+    np.fill_diagonal(raiz, np.inf)
+    cota_raiz = _reducir_matriz(raiz)
+
+    # Cada nodo: (cota para podar, cota de la matriz reducida, matriz, ruta, costo parcial)
+    pila = [(cota_raiz, cota_raiz, raiz, [0], 0.0)]
+    while pila:
+        cota, cota_reducida, reducida, ruta, parcial = pila.pop()
+        # El incumbente pudo mejorar desde que el nodo entró a la pila
+        if cota >= mejor_costo:
+            estadisticas['nodos_podados'] += 1
+            continue
+        estadisticas['nodos_expandidos'] += 1
+
+        i = ruta[-1]
+        hijos = []
+        for j in np.flatnonzero(np.isfinite(reducida[i])):
+            j = int(j)
+            nueva_ruta = ruta + [j]
+            if len(nueva_ruta) == n_ciudades:
+                nueva_ruta.append(0)
+                costo = calcular_costo_ruta(nueva_ruta, d)
+                if costo < mejor_costo:
+                    mejor_costo = costo
+                    mejor_ruta = nueva_ruta
+                    yield list(mejor_ruta), mejor_costo
+                continue
+
+            hija = reducida.copy()
+            hija[i, :] = np.inf
+            hija[:, j] = np.inf
+            hija[j, 0] = np.inf
+            reducida_hija = cota_reducida + reducida[i, j] + _reducir_matriz(hija)
+            parcial_hija = parcial + d[i, j]
+            cota_hija = reducida_hija
+            if cota_hija < mejor_costo:
+                libres = np.ones(n_ciudades, dtype=bool)
+                libres[nueva_ruta] = False
+                pendientes = np.flatnonzero(libres)
+                cota_arbol = (parcial_hija + _costo_arbol_minimo(simetrica, pendientes)
+                              + simetrica[j, pendientes].min() + simetrica[0, pendientes].min())
+                cota_hija = max(cota_hija, cota_arbol)
+            if cota_hija >= mejor_costo:
+                estadisticas['nodos_podados'] += 1
+                continue
+            hijos.append((cota_hija, reducida_hija, hija, nueva_ruta, parcial_hija))
+
+        # El hijo más prometedor queda al tope de la pila
+        hijos.sort(key=lambda h: h[0], reverse=True)
+        pila.extend(hijos)
+
+    yield mejor_ruta, mejor_costo
+
+
+def _recorrido_arbol(hijos, raiz=0):
+    """Recorrido de Euler del árbol (ida y vuelta por cada arista) y su preorden."""
+    recorrido, preorden = [raiz], [raiz]
+    pila = [(raiz, iter(hijos[raiz]))]
+    while pila:
+        v, pendientes = pila[-1]
+        h = next(pendientes, None)
+        if h is None:
+            pila.pop()
+            if pila:
+                recorrido.append(pila[-1][0])
+            continue
+        recorrido.append(h)
+        preorden.append(h)
+        pila.append((h, iter(hijos[h])))
+    return recorrido, preorden
+
+def generador_arbol_doble(n_ciudades, matriz):
+    """Heurística del doble árbol: MST de Prim, recorrido en preorden y atajos.
+
+    Con desigualdad triangular el tour cuesta a lo más el doble del óptimo. Mientras crece
+    el árbol se entrega su recorrido de Euler (el costo es el peso del árbol hasta ahí), así
+    la animación lo muestra completo; al final se entrega el tour cerrado. En matrices
+    asimétricas el árbol se arma sobre min(d, d^T) y el tour se recorre en el sentido más barato.
+    """
+    d = np.asarray(matriz, dtype=np.float64)
+    n = n_ciudades
+    yield [0], 0
+    if n <= 2:
+        ruta = list(range(n)) + [0]
+        yield ruta, calcular_costo_ruta(ruta, d)
+        return
+
+    simetrica = np.minimum(d, d.T)
+    hijos = [[] for _ in range(n)]
+    peso = 0.0
+    # Unas 50 entregas mientras crece el árbol: el recorrido cuesta O(n) cada vez
+    cada = max(1, n // 50)
+    orden, padre = _arbol_minimo(simetrica)
+    for k, v in enumerate(orden.tolist(), start=1):
+        p = int(padre[v])
+        hijos[p].append(v)
+        peso += float(simetrica[p, v])
+        if k % cada == 0:
+            yield _recorrido_arbol(hijos)[0], peso
+
+    _, preorden = _recorrido_arbol(hijos)
+    ruta = preorden + [0]
+    inversa = ruta[::-1]
+    costo, costo_inverso = calcular_costo_ruta(ruta, d), calcular_costo_ruta(inversa, d)
+    if costo_inverso < costo:
+        ruta, costo = inversa, costo_inverso
+    yield ruta, costo
+
+def _mejor_insercion(d, tour, ciudades):
+    """Para cada ciudad, la arista (tour[p], tour[p+1]) donde insertarla sale más barato.
+    Devuelve (costos, posiciones p) como arreglos."""
+    a = np.asarray(tour, dtype=np.intp)
+    b = np.roll(a, -1)
+    # Filas: ciudades; columnas: aristas del tour
+    deltas = d[np.ix_(a, ciudades)].T + d[np.ix_(ciudades, b)] - d[a, b]
+    p = np.argmin(deltas, axis=1)
+    return deltas[np.arange(len(ciudades)), p], p
+
+def _generador_insercion(n_ciudades, matriz, mas_lejana):
+    d = np.asarray(matriz, dtype=np.float64)
+    n = n_ciudades
+    yield [0], 0
+    if n <= 2:
+        ruta = list(range(n)) + [0]
+        yield ruta, calcular_costo_ruta(ruta, d)
+        return
+
+    simetrica = np.minimum(d, d.T)
+    fila = simetrica[0].copy()
+    fila[0] = np.nan
+    segunda = int(np.nanargmax(fila) if mas_lejana else np.nanargmin(fila))
+    tour = [0, segunda]
+    costo = float(d[0, segunda] + d[segunda, 0])
+    yield tour + [0], costo
+
+    fuera = np.ones(n, dtype=bool)
+    fuera[tour] = False
+    # Distancia de cada ciudad al tour, para elegir la más lejana
+    al_tour = np.minimum(simetrica[0], simetrica[segunda])
+    # Inserción más barata: costo de la mejor inserción de cada ciudad pendiente y su arista (u, v)
+    if not mas_lejana:
+        pendientes = np.flatnonzero(fuera)
+        mejor = np.full(n, np.inf)
+        arista_u = np.zeros(n, dtype=np.intp)
+        arista_v = np.zeros(n, dtype=np.intp)
+        deltas, p = _mejor_insercion(d, tour, pendientes)
+        mejor[pendientes] = deltas
+        arista_u[pendientes] = np.asarray(tour)[p]
+        arista_v[pendientes] = np.asarray(tour)[(p + 1) % len(tour)]
+
+    for _ in range(n - 2):
+        if mas_lejana:
+            k = int(np.argmax(np.where(fuera, al_tour, -np.inf)))
+            deltas, p = _mejor_insercion(d, tour, np.array([k]))
+            delta, posicion = float(deltas[0]), int(p[0])
+        else:
+            k = int(np.argmin(np.where(fuera, mejor, np.inf)))
+            u, v = int(arista_u[k]), int(arista_v[k])
+            delta, posicion = float(mejor[k]), tour.index(u)
+        tour.insert(posicion + 1, k)
+        costo += delta
+        fuera[k] = False
+        al_tour = np.minimum(al_tour, simetrica[k])
+        yield tour + [0], costo
+
+        pendientes = np.flatnonzero(fuera)
+        if mas_lejana or not len(pendientes):
+            continue
+        # La arista (u, v) ya no existe: las ciudades que iban ahí se recalculan contra todo el tour
+        rotas = pendientes[(arista_u[pendientes] == u) & (arista_v[pendientes] == v)]
+        if len(rotas):
+            deltas, p = _mejor_insercion(d, tour, rotas)
+            arreglo = np.asarray(tour)
+            mejor[rotas] = deltas
+            arista_u[rotas] = arreglo[p]
+            arista_v[rotas] = arreglo[(p + 1) % len(tour)]
+        # El resto solo puede mejorar con las dos aristas nuevas (u, k) y (k, v)
+        for x, y in ((u, k), (k, v)):
+            delta = d[x, pendientes] + d[pendientes, y] - d[x, y]
+            mejora = delta < mejor[pendientes]
+            cambian = pendientes[mejora]
+            mejor[cambian] = delta[mejora]
+            arista_u[cambian] = x
+            arista_v[cambian] = y
+
+def generador_insercion_mas_barata(n_ciudades, matriz):
+    """Inserción más barata: agrega la ciudad y la posición que menos encarecen el tour.
+
+    Se guarda la mejor inserción de cada ciudad pendiente y tras cada paso solo se revisan
+    las dos aristas nuevas; las ciudades cuya arista desapareció se recalculan contra todo
+    el tour. Más lenta que la más lejana en instancias grandes. Entrega el subtour cerrado
+    tras cada inserción.
+    """
+    return _generador_insercion(n_ciudades, matriz, mas_lejana=False)
+
+def generador_insercion_mas_lejana(n_ciudades, matriz):
+    """Inserción más lejana: agrega la ciudad más alejada del tour en su posición más barata.
+
+    Primero fija el contorno general y luego rellena, lo que suele dar tours mejores que la
+    inserción más barata. O(n^2) vectorizado. Entrega el subtour cerrado tras cada inserción.
+    """
+    return _generador_insercion(n_ciudades, matriz, mas_lejana=True)
+
+def _listas_de_vecinos(d, k):
+    """Para cada ciudad, sus k vecinas más cercanas ordenadas por distancia."""
+    sin_diagonal = d.copy()
+    np.fill_diagonal(sin_diagonal, np.inf)
+    cercanas = np.argpartition(sin_diagonal, k - 1, axis=1)[:, :k]
+    orden = np.argsort(np.take_along_axis(sin_diagonal, cercanas, axis=1), axis=1)
+    return np.take_along_axis(cercanas, orden, axis=1).tolist()
+
+# Largo máximo del tramo que mueve cada patada double-bridge
+_VENTANA_PATADA = 50
+
+def _patada_doble_puente(n, azar):
+    """Elige cortes i < j < k (k <= n - 2) a menos de _VENTANA_PATADA posiciones entre sí.
+
+    Intercambiar los tramos t[i+1..j] y t[j+1..k] es el double-bridge: una perturbación que
+    2-opt y Or-opt no deshacen en un paso. Con cortes cercanos el cambio es local y la
+    reoptimización posterior cuesta poco aunque n sea grande.
+    """
+    tramo = min(n - 2, _VENTANA_PATADA)
+    i = azar.randrange(n - tramo - 1)
+    j, k = sorted(azar.sample(range(i + 1, i + tramo + 1), 2))
+    return i, j, k
+
+def generador_busqueda_local(n_ciudades, matriz, ruta_inicial=None, vecinos=10, estadisticas=None,
+                             constructor=None, patadas=0, semilla=None, listas_vecinas=None):
+    """2-opt y Or-opt sobre las 'vecinos' más cercanas, desde ruta_inicial o el tour de
+    'constructor'. Entrega cada mejora; con patadas > 0 sigue como búsqueda local iterada."""
+    if estadisticas is None:
+        estadisticas = {}
+    estadisticas['movimientos_2opt'] = 0
+    estadisticas['movimientos_oropt'] = 0
+    estadisticas['patadas'] = 0
+    estadisticas['patadas_aceptadas'] = 0
+
+    perezosa = isinstance(matriz, MatrizPerezosa)
+    d = matriz if perezosa else np.asarray(matriz, dtype=np.float64)
+    n = n_ciudades
+    if ruta_inicial is None:
+        ruta_inicial, _ = _ultimo((constructor or generador_vecino_mas_cercano)(n, d))
+    t = [int(c) for c in ruta_inicial[:n]]
+    costo = calcular_costo_ruta(t + [t[0]], d)
+    yield _rotar_a_deposito(t + t[:1]), costo
+    if n < 5:
+        return
+
+    if perezosa:
+        # Las métricas calculadas desde coordenadas son simétricas
+        simetrica = True
+        vecinas = listas_vecinas or d.listas_de_vecinos(min(vecinos, n - 1))
+    else:
+        simetrica = np.allclose(d, d.T)
+        vecinas = listas_vecinas or _listas_de_vecinos(d, min(vecinos, n - 1))
+    pos = [0] * n
+    prefijos = {}
+
+    def reindexar(inicio=0, fin=n):
+        for idx in range(inicio, fin):
+            pos[t[idx]] = idx
+        if not simetrica:
+            arr = np.array(t + [t[0]])
+            prefijos['ida'] = np.concatenate(([0.0], np.cumsum(d[arr[:-1], arr[1:]]))).tolist()
+            prefijos['vuelta'] = np.concatenate(([0.0], np.cumsum(d[arr[1:], arr[:-1]]))).tolist()
+
+    def costo_inversion(p, q):
+        """Diferencia de costo interna al invertir t[p..q] (0 si la matriz es simétrica)."""
+        if simetrica:
+            return 0.0
+        return (prefijos['vuelta'][q] - prefijos['vuelta'][p]) - (prefijos['ida'][q] - prefijos['ida'][p])
+
+    def delta_2opt(p, q):
+        """Cambio de costo al cambiar (t[p],t[p+1]), (t[q],t[q+1]) por (t[p],t[q]), (t[p+1],t[q+1])."""
+        a, b = t[p], t[p + 1]
+        c, e = t[q], t[(q + 1) % n]
+        return d[a, c] + d[b, e] - d[a, b] - d[c, e] + costo_inversion(p + 1, q)
+
+    def intentar_2opt(a):
+        i = pos[a]
+        for sentido in (1, -1):
+            # sentido 1: arista (a, sucesor); sentido -1: arista (predecesor, a)
+            b = t[(i + sentido) % n]
+            base = d[a, b] if sentido == 1 else d[b, a]
+            for c in vecinas[a]:
+                if d[a, c] >= base:
+                    break
+                j = pos[c]
+                if sentido == 1:
+                    p, q = i, j
+                else:
+                    p, q = (i - 1) % n, (j - 1) % n
+                if p > q:
+                    p, q = q, p
+                if q - p < 2:
+                    continue
+                delta = delta_2opt(p, q)
+                if delta < -1e-10:
+                    extremos = (t[p], t[p + 1], t[q], t[(q + 1) % n])
+                    if simetrica and 2 * (q - p) > n:
+                        # Invertir el complemento da el mismo ciclo y mueve menos ciudades
+                        indices = [(q + 1 + m) % n for m in range(n - (q - p))]
+                        for idx, c in zip(indices, [t[idx] for idx in reversed(indices)]):
+                            t[idx] = c
+                            pos[c] = idx
+                    else:
+                        t[p + 1:q + 1] = t[p + 1:q + 1][::-1]
+                        reindexar(p + 1, q + 1)
+                    return delta, extremos
+        return None
+
+    def intentar_oropt(a):
+        i = pos[a]
+        for largo in (1, 2, 3):
+            if largo >= n - 2:
+                break
+            segmento = [t[(i + m) % n] for m in range(largo)]
+            primero, ultimo = segmento[0], segmento[-1]
+            previo, siguiente = t[(i - 1) % n], t[(i + largo) % n]
+            ida = sum(d[segmento[m], segmento[m + 1]] for m in range(largo - 1))
+            vuelta = sum(d[segmento[m + 1], segmento[m]] for m in range(largo - 1))
+            ahorro = d[previo, primero] + d[ultimo, siguiente] - d[previo, siguiente]
+            if simetrica:
+                # Como en 2-opt, se corta cuando la arista nueva hacia el extremo ya supera el
+                # ahorro (en matrices asimétricas sin desigualdad triangular descarta demasiado)
+                candidatos = itertools.chain(
+                    itertools.takewhile(lambda c: d[c, primero] < ahorro, vecinas[primero]),
+                    () if largo == 1 else itertools.takewhile(lambda c: d[c, ultimo] < ahorro, vecinas[ultimo]))
+            else:
+                candidatos = vecinas[primero] if largo == 1 else vecinas[primero] + vecinas[ultimo]
+            for c in candidatos:
+                if c in segmento or c == previo:
+                    continue
+                e = t[(pos[c] + 1) % n]
+                directo = d[c, primero] + d[ultimo, e] - d[c, e]
+                invertido = d[c, ultimo] + d[primero, e] - d[c, e] + vuelta - ida
+                invertir = invertido < directo
+                delta = (invertido if invertir else directo) - ahorro
+                if delta < -1e-10:
+                    nuevo = segmento[::-1] if invertir else segmento
+                    k = pos[c]
+                    if i + largo > n:
+                        # El segmento da la vuelta al final de la lista: se rearma entera
+                        resto = [x for x in t if x not in segmento]
+                        k = resto.index(c) + 1
+                        t[:] = resto[:k] + nuevo + resto[k:]
+                        reindexar()
+                    elif k > i:
+                        t[i:k + 1] = t[i + largo:k + 1] + nuevo
+                        reindexar(i, k + 1)
+                    else:
+                        t[k + 1:i + largo] = nuevo + t[k + 1:i]
+                        reindexar(k + 1, i + largo)
+                    return delta, (previo, siguiente, c, e, primero, ultimo)
+        return None
+
+    en_cola = [False] * n
+
+    def descender(ciudades):
+        """Aplica movimientos hasta que ninguna ciudad activa mejore; entrega el costo tras cada uno."""
+        nonlocal costo
+        activas = deque()
+        for c in ciudades:
+            if not en_cola[c]:
+                en_cola[c] = True
+                activas.append(c)
+        while activas:
+            a = activas.popleft()
+            en_cola[a] = False
+            resultado = intentar_2opt(a)
+            if resultado is not None:
+                estadisticas['movimientos_2opt'] += 1
+            else:
+                resultado = intentar_oropt(a)
+                if resultado is None:
+                    continue
+                estadisticas['movimientos_oropt'] += 1
+
+            delta, extremos = resultado
+            costo += delta
+            for c in (a,) + extremos:
+                if not en_cola[c]:
+                    en_cola[c] = True
+                    activas.append(c)
+            yield costo
+
+    reindexar()
+    for _ in descender(t):
+        yield _rotar_a_deposito(t + t[:1]), costo
+
+    if patadas > 0:
+        azar = random.Random(semilla)
+        mejor_t, mejor_pos, mejor_costo = t[:], pos[:], costo
+        for _ in range(patadas):
+            estadisticas['patadas'] += 1
+            i, j, k = _patada_doble_puente(n, azar)
+            extremos = (t[i], t[i + 1], t[j], t[j + 1], t[k], t[k + 1])
+            # A B C D -> A C B D: cambian tres aristas y ningún tramo se invierte
+            costo += (d[t[i], t[j + 1]] + d[t[k], t[i + 1]] + d[t[j], t[k + 1]]
+                      - d[t[i], t[i + 1]] - d[t[j], t[j + 1]] - d[t[k], t[k + 1]])
+            t[i + 1:k + 1] = t[j + 1:k + 1] + t[i + 1:j + 1]
+            reindexar(i + 1, k + 1)
+            for _ in descender(extremos):
+                pass
+            if costo <= mejor_costo + 1e-10:
+                estadisticas['patadas_aceptadas'] += 1
+                mejoro = costo < mejor_costo - 1e-10
+                mejor_t[:], mejor_pos[:], mejor_costo = t, pos, costo
+                if mejoro:
+                    yield _rotar_a_deposito(t + t[:1]), costo
+            else:
+                t[:], pos[:], costo = mejor_t, mejor_pos, mejor_costo
+                if not simetrica:
+                    reindexar(0, 0)
+
+    ruta = _rotar_a_deposito(t + t[:1])
+    yield ruta, calcular_costo_ruta(ruta, d)
+
+def _ronda_iterada(ruta, n_ciudades, patadas, semilla, matriz=None, vecinas=None):
+    """Corre 'patadas' perturbaciones desde 'ruta' y devuelve (mejor ruta, costo, estadísticas)."""
+    estadisticas = {}
+    matriz = _MATRIZ_TRABAJADOR if matriz is None else matriz
+    vecinas = _VECINAS_TRABAJADOR if vecinas is None else vecinas
+    ruta, costo = _ultimo(generador_busqueda_local(n_ciudades, matriz, ruta, estadisticas=estadisticas,
+                                                   patadas=patadas, semilla=semilla, listas_vecinas=vecinas))
+    return ruta, costo, estadisticas
+
+def generador_busqueda_local_iterada(n_ciudades, matriz, cadenas=None, procesos=None, patadas=None,
+                                     patadas_por_ronda=200, semilla=0, vecinos=10, estadisticas=None):
+    """Búsqueda local iterada (2-opt + Or-opt con patadas double-bridge) en varias cadenas.
+
+    Primero se lleva el tour de vecino más cercano a un óptimo local; desde ahí corren
+    'cadenas' cadenas independientes de 'patadas' perturbaciones cada una (por defecto
+    max(1000, 5 * n)), con semillas derivadas de 'semilla', así que el resultado es
+    reproducible. Cada cadena avanza por rondas de patadas_por_ronda; con procesos > 1 las
+    rondas se reparten en un pool de procesos y al terminar cada una se entrega el mejor
+    tour global si mejoró. Por defecto procesos es la cantidad de CPUs y hay una cadena por
+    proceso. 'estadisticas' (opcional) lleva 'cadenas', 'rondas', 'patadas' y
+    'patadas_aceptadas'.
+    """
+    if estadisticas is None:
+        estadisticas = {}
+    procesos = procesos or os.cpu_count() or 1
+    cadenas = cadenas or procesos
+    n = n_ciudades
+    patadas = max(1000, 5 * n) if patadas is None else patadas
+    estadisticas.update(cadenas=cadenas, rondas=0, patadas=0, patadas_aceptadas=0)
+
+    d = matriz if isinstance(matriz, MatrizPerezosa) else np.asarray(matriz, dtype=np.float64)
+    mejor_ruta, min_costo = None, float('inf')
+    for mejor_ruta, min_costo in generador_busqueda_local(n, d, vecinos=vecinos):
+        yield mejor_ruta, min_costo
+    if n < 5 or patadas <= 0:
+        return
+
+    if isinstance(d, MatrizPerezosa):
+        vecinas = d.listas_de_vecinos(min(vecinos, n - 1))
+    else:
+        vecinas = _listas_de_vecinos(d, min(vecinos, n - 1))
+    # Un generador de semillas por cadena: cada ronda toma la siguiente
+    semillas = [random.Random(semilla * 1000003 + c) for c in range(cadenas)]
+    rutas = [mejor_ruta] * cadenas
+    pendientes = [patadas] * cadenas
+
+    def ronda(c):
+        cantidad = min(patadas_por_ronda, pendientes[c])
+        pendientes[c] -= cantidad
+        return (rutas[c], n, cantidad, semillas[c].getrandbits(32))
+
+    def registrar(c, resultado):
+        nonlocal mejor_ruta, min_costo
+        rutas[c], costo, contadores = resultado
+        estadisticas['rondas'] += 1
+        estadisticas['patadas'] += contadores['patadas']
+        estadisticas['patadas_aceptadas'] += contadores['patadas_aceptadas']
+        if costo < min_costo - 1e-10:
+            mejor_ruta, min_costo = rutas[c], costo
+            return True
+        return False
+
+    if procesos == 1:
+        # Rondas intercaladas entre cadenas en este mismo proceso
+        while any(pendientes):
+            for c in range(cadenas):
+                if pendientes[c] and registrar(c, _ronda_iterada(*ronda(c), matriz=d, vecinas=vecinas)):
+                    yield mejor_ruta, min_costo
+        yield mejor_ruta, min_costo
+        return
+
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_trabajador,
+                             initargs=(d, vecinas)) as pool:
+        en_curso = {pool.submit(_ronda_iterada, *ronda(c)): c for c in range(cadenas)}
+        try:
+            while en_curso:
+                futuro = next(as_completed(en_curso))
+                c = en_curso.pop(futuro)
+                if registrar(c, futuro.result()):
+                    yield mejor_ruta, min_costo
+                if pendientes[c]:
+                    en_curso[pool.submit(_ronda_iterada, *ronda(c))] = c
+        finally:
+            for futuro in en_curso:
+                futuro.cancel()
+
+    yield mejor_ruta, min_costo
+
+ITERACIONES_HORMIGAS = 100
+
+def generador_colonia_hormigas(n_ciudades, matriz, hormigas=256, iteraciones=ITERACIONES_HORMIGAS, alfa=1.0, beta=3.0,
+                               evaporacion=0.1, semilla=0, estadisticas=None):
+    """Sistema de hormigas Max-Min con toda la colonia en arreglos NumPy.
+
+    Los tours de la iteración son un arreglo int32 (hormigas, n) que parte en el depósito:
+    en cada paso todas las hormigas eligen su siguiente ciudad a la vez (probabilidad
+    proporcional a feromona^alfa * (1/d)^beta entre las no visitadas, muestreada con sumas
+    acumuladas) y los costos salen de un solo gather. Solo la mejor hormiga de la iteración
+    deposita feromona, y la feromona queda acotada entre tau_min y tau_max, que se ajustan
+    al mejor costo conocido; así la colonia no se estanca en un único tour. Se entrega
+    primero el tour de vecino más cercano (con el que se inicializa tau_max) y luego el
+    mejor tour global tras cada iteración. Cada iteración cuesta O(hormigas * n^2).
+    'estadisticas' (opcional) lleva 'iteraciones' y 'evaluadas' (tours construidos).
+    """
+    if estadisticas is None:
+        estadisticas = {}
+    estadisticas['iteraciones'] = 0
+    estadisticas['evaluadas'] = 0
+    d = np.asarray(matriz, dtype=np.float64)
+    n = n_ciudades
+    mejor_ruta, mejor_costo = _ultimo(generador_vecino_mas_cercano(n, d))
+    yield mejor_ruta, mejor_costo
+    if n < 4:
+        return
+
+    azar = np.random.default_rng(semilla)
+    simetrica = np.allclose(d, d.T)
+    atraccion = (1.0 / np.maximum(d, 1e-12)) ** beta
+    np.fill_diagonal(atraccion, 0.0)
+    tau_max = 1.0 / (evaporacion * mejor_costo)
+    tau = np.full((n, n), tau_max)
+    hormiga = np.arange(hormigas)
+
+    for _ in range(iteraciones):
+        peso = tau ** alfa * atraccion
+        tours = np.zeros((hormigas, n), dtype=np.int32)
+        libres = np.ones((hormigas, n), dtype=bool)
+        libres[:, 0] = False
+        actual = tours[:, 0]
+        for paso in range(1, n):
+            acumulado = np.cumsum(peso[actual] * libres, axis=1)
+            total = acumulado[:, -1]
+            umbral = azar.random(hormigas) * total
+            siguiente = (acumulado <= umbral[:, None]).sum(axis=1)
+            # Si todos los pesos se fueron a cero se toma la primera ciudad libre
+            sin_peso = total <= 0
+            if sin_peso.any():
+                siguiente[sin_peso] = libres[sin_peso].argmax(axis=1)
+            actual = siguiente.astype(np.int32)
+            tours[:, paso] = actual
+            libres[hormiga, actual] = False
+
+        cerrados = np.concatenate((tours, tours[:, :1]), axis=1)
+        costos = calcular_costos_lote(cerrados, d)
+        estadisticas['iteraciones'] += 1
+        estadisticas['evaluadas'] += hormigas
+        k = int(costos.argmin())
+        if costos[k] < mejor_costo - 1e-10:
+            mejor_ruta, mejor_costo = cerrados[k].tolist(), float(costos[k])
+
+        # Evaporación, depósito de la mejor de la iteración y límites de Max-Min
+        tau *= 1.0 - evaporacion
+        origen, destino = cerrados[k, :-1], cerrados[k, 1:]
+        tau[origen, destino] += 1.0 / costos[k]
+        if simetrica:
+            tau[destino, origen] += 1.0 / costos[k]
+        tau_max = 1.0 / (evaporacion * mejor_costo)
+        np.clip(tau, tau_max / (2 * n), tau_max, out=tau)
+        yield mejor_ruta, mejor_costo
+
+    yield mejor_ruta, calcular_costo_ruta(mejor_ruta, d)
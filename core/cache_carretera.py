@@ -0,0 +1,140 @@
+import os
+import sqlite3
+import threading
+import time
+
+_RUTA_POR_DEFECTO = os.path.join(os.path.expanduser('~'), '.cache', 'tsp_chile', 'carretera.sqlite')
+
+# SQLite limita la cantidad de parámetros por consulta (999 en versiones antiguas)
+_MAX_PARAMETROS = 900
+
+
+def _clave(c):
+    lat, lon = c
+    return f"{float(lat):.6f},{float(lon):.6f}"
+
+
+class CacheCarretera:
+    """Caché persistente (SQLite) de distancias por carretera en km entre pares de coordenadas.
+
+    max_entradas limita el tamaño expulsando las menos usadas (LRU) y ttl_segundos
+    descarta entradas antiguas. Lleva contadores de aciertos y fallos. La conexión se
+    abre al primer uso; ruta=':memory:' sirve para una caché que no se guarda en disco.
+    """
+
+    def __init__(self, ruta=None, max_entradas=200_000, ttl_segundos=None):
+        self.ruta = ruta or os.environ.get('TSP_CACHE_CARRETERA', _RUTA_POR_DEFECTO)
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self.aciertos = 0
+        self.fallos = 0
+        self._conexion = None
+        self._lock = threading.Lock()
+
+    def _conectar(self):
+        if self._conexion is None:
+            if self.ruta != ':memory:':
+                os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+            self._conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+            self._conexion.execute(
+                "CREATE TABLE IF NOT EXISTS distancias ("
+                " origen TEXT NOT NULL, destino TEXT NOT NULL, km REAL NOT NULL,"
+                " creado REAL NOT NULL, acceso REAL NOT NULL,"
+                " PRIMARY KEY (origen, destino))")
+            self._conexion.execute("CREATE INDEX IF NOT EXISTS idx_acceso ON distancias (acceso)")
+        return self._conexion
+
+    def _vigente_desde(self):
+        return time.time() - self.ttl_segundos if self.ttl_segundos else float('-inf')
+
+    def obtener(self, c1, c2):
+        """Distancia guardada entre c1 y c2, o None si no está (o expiró)."""
+        return self.obtener_bloque([c1], [c2]).get((0, 0))
+
+    def obtener_bloque(self, origenes, destinos):
+        """Busca de una vez todas las distancias origen x destino guardadas.
+        Devuelve {(i, j): km} con los índices de las listas recibidas."""
+        claves_o = [_clave(c) for c in origenes]
+        claves_d = [_clave(c) for c in destinos]
+        idx_o, idx_d = {}, {}
+        for i, k in enumerate(claves_o):
+            idx_o.setdefault(k, []).append(i)
+        for j, k in enumerate(claves_d):
+            idx_d.setdefault(k, []).append(j)
+
+        unicos_o, unicos_d = list(idx_o), list(idx_d)
+        paso_o = max(1, _MAX_PARAMETROS // 2)
+        paso_d = max(1, _MAX_PARAMETROS - min(paso_o, len(unicos_o)))
+        vigente = self._vigente_desde()
+        resultado = {}
+        encontrados = []
+        with self._lock:
+            con = self._conectar()
+            for a in range(0, len(unicos_o), paso_o):
+                grupo_o = unicos_o[a:a + paso_o]
+                for b in range(0, len(unicos_d), paso_d):
+                    grupo_d = unicos_d[b:b + paso_d]
+                    filas = con.execute(
+                        f"SELECT origen, destino, km FROM distancias"
+                        f" WHERE origen IN ({','.join('?' * len(grupo_o))})"
+                        f" AND destino IN ({','.join('?' * len(grupo_d))}) AND creado >= ?",
+                        (*grupo_o, *grupo_d, vigente))
+                    for origen, destino, km in filas:
+                        encontrados.append((origen, destino))
+                        for i in idx_o[origen]:
+                            for j in idx_d[destino]:
+                                resultado[(i, j)] = km
+            if encontrados:
+                ahora = time.time()
+                con.executemany("UPDATE distancias SET acceso = ? WHERE origen = ? AND destino = ?",
+                                [(ahora, o, d) for o, d in encontrados])
+                con.commit()
+            # Los pares de un punto consigo mismo (la diagonal) no se consultan a OSRM: no cuentan
+            diagonal = sum(len(idx_o[k]) * len(idx_d[k]) for k in idx_o.keys() & idx_d.keys())
+            aciertos_diagonal = sum(1 for i, j in resultado if claves_o[i] == claves_d[j])
+            self.aciertos += len(resultado) - aciertos_diagonal
+            self.fallos += len(origenes) * len(destinos) - len(resultado) - (diagonal - aciertos_diagonal)
+        return resultado
+
+    def guardar(self, c1, c2, km):
+        self.guardar_varios([(c1, c2, km)])
+
+    def guardar_varios(self, registros):
+        """Guarda una secuencia de (c1, c2, km) y aplica la expulsión si corresponde."""
+        ahora = time.time()
+        filas = [(_clave(c1), _clave(c2), float(km), ahora, ahora) for c1, c2, km in registros]
+        if not filas:
+            return
+        with self._lock:
+            con = self._conectar()
+            con.executemany("INSERT OR REPLACE INTO distancias VALUES (?, ?, ?, ?, ?)", filas)
+            self._expulsar(con)
+            con.commit()
+
+    def _expulsar(self, con):
+        if self.ttl_segundos:
+            con.execute("DELETE FROM distancias WHERE creado < ?", (self._vigente_desde(),))
+        if self.max_entradas is not None:
+            total = con.execute("SELECT COUNT(*) FROM distancias").fetchone()[0]
+            sobrantes = total - self.max_entradas
+            if sobrantes > 0:
+                con.execute("DELETE FROM distancias WHERE rowid IN"
+                            " (SELECT rowid FROM distancias ORDER BY acceso LIMIT ?)", (sobrantes,))
+
+    def __len__(self):
+        with self._lock:
+            return self._conectar().execute("SELECT COUNT(*) FROM distancias").fetchone()[0]
+
+    def limpiar(self):
+        with self._lock:
+            con = self._conectar()
+            con.execute("DELETE FROM distancias")
+            con.commit()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def cerrar(self):
+        with self._lock:
+            if self._conexion is not None:
+                self._conexion.close()
+                self._conexion = None
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def _actualizar(h, valor):
+    """Agrega 'valor' al hash: arreglos y secuencias numéricas por sus bytes en float64 (así
+    [(1, 2)] y np.array([[1., 2.]]) dan la misma huella), el resto por su repr."""
+    if isinstance(valor, (list, tuple, np.ndarray)):
+        arr = np.asarray(valor)
+        if arr.dtype.kind in 'biuf':
+            arr = np.ascontiguousarray(arr, dtype=np.float64)
+            h.update(f"arr{arr.shape}".encode())
+            h.update(arr.tobytes())
+        else:
+            h.update(f"seq{len(valor)}".encode())
+            for v in valor:
+                _actualizar(h, v)
+    else:
+        h.update(repr(valor).encode())
+    h.update(b'\x00')
+
+
+def huella(*partes, **parametros):
+    """Clave de contenido: hash de las partes (coordenadas, matriz, métrica...) y de los
+    parámetros con nombre, sin importar su orden."""
+    h = hashlib.sha256()
+    for parte in partes:
+        _actualizar(h, parte)
+    for nombre in sorted(parametros):
+        h.update(nombre.encode() + b'=')
+        _actualizar(h, parametros[nombre])
+    return h.hexdigest()[:32]
+
+
+def _a_json(valor):
+    if isinstance(valor, np.generic):
+        return valor.item()
+    raise TypeError(f"No serializable: {type(valor).__name__}")
+
+
+class CacheResultados:
+    """Caché por contenido de matrices de distancias y tours resueltos.
+
+    Las claves salen de huella(). En memoria guarda hasta max_entradas valores y
+    max_bytes en arreglos, y expulsa los menos usados (LRU). Con 'directorio' (o la
+    variable de entorno TSP_CACHE_RESULTADOS) además escribe cada valor en disco: los
+    arreglos como .npy (se leen con mmap) y el resto como .json, así que sirve entre
+    corridas y entre procesos. Lleva contadores de aciertos y fallos.
+    """
+
+    def __init__(self, directorio=None, max_entradas=128, max_bytes=256 * 2**20):
+        self.directorio = directorio or os.environ.get('TSP_CACHE_RESULTADOS')
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self._valores = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _archivo(self, clave, extension):
+        return os.path.join(self.directorio, f"{clave}.{extension}")
+
+    def _leer_disco(self, clave):
+        if not self.directorio:
+            return None
+        try:
+            return np.load(self._archivo(clave, 'npy'), mmap_mode='r', allow_pickle=False)
+        except FileNotFoundError:
+            pass
+        try:
+            with open(self._archivo(clave, 'json'), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _escribir_disco(self, clave, valor):
+        os.makedirs(self.directorio, exist_ok=True)
+        # Se escribe a un temporal y se reemplaza: otro proceso nunca lee un archivo a medias
+        temporal = self._archivo(f"{clave}.{os.getpid()}.{threading.get_ident()}", 'tmp')
+        if isinstance(valor, np.ndarray):
+            with open(temporal, 'wb') as f:
+                np.save(f, valor, allow_pickle=False)
+            os.replace(temporal, self._archivo(clave, 'npy'))
+        else:
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(valor, f, ensure_ascii=False, default=_a_json)
+            os.replace(temporal, self._archivo(clave, 'json'))
+
+    def _recordar(self, clave, valor):
+        if clave in self._valores:
+            self._bytes -= getattr(self._valores.pop(clave), 'nbytes', 0)
+        self._valores[clave] = valor
+        self._bytes += getattr(valor, 'nbytes', 0)
+        while len(self._valores) > 1 and (len(self._valores) > self.max_entradas or self._bytes > self.max_bytes):
+            _, viejo = self._valores.popitem(last=False)
+            self._bytes -= getattr(viejo, 'nbytes', 0)
+
+    def obtener(self, clave):
+        """Valor guardado bajo 'clave' (de memoria o, si no está, de disco) o None."""
+        with self._lock:
+            valor = self._valores.get(clave)
+            if valor is not None:
+                self._valores.move_to_end(clave)
+            else:
+                valor = self._leer_disco(clave)
+                if valor is not None:
+                    self._recordar(clave, valor)
+            if valor is None:
+                self.fallos += 1
+            else:
+                self.aciertos += 1
+            return valor
+
+    def guardar(self, clave, valor):
+        """Guarda un arreglo NumPy o un valor serializable en JSON (p. ej. {'ruta', 'costo'})."""
+        with self._lock:
+            self._recordar(clave, valor)
+            if self.directorio:
+                self._escribir_disco(clave, valor)
+
+    def obtener_o_calcular(self, clave, calcular):
+        """Devuelve el valor guardado o lo calcula con calcular() y lo guarda."""
+        valor = self.obtener(clave)
+        if valor is None:
+            valor = calcular()
+            self.guardar(clave, valor)
+        return valor
+
+    def __contains__(self, clave):
+        with self._lock:
+            return clave in self._valores or (
+                bool(self.directorio) and (os.path.exists(self._archivo(clave, 'npy'))
+                                           or os.path.exists(self._archivo(clave, 'json'))))
+
+    def __len__(self):
+        return len(self._valores)
+
+    def limpiar(self, disco=False):
+        """Vacía la memoria y, con disco=True, borra también los archivos del directorio."""
+        with self._lock:
+            self._valores.clear()
+            self._bytes = 0
+            if disco and self.directorio and os.path.isdir(self.directorio):
+                for nombre in os.listdir(self.directorio):
+                    if nombre.endswith(('.npy', '.json')):
+                        os.remove(os.path.join(self.directorio, nombre))
+        self.aciertos = 0
+        self.fallos = 0
@@ -0,0 +1,284 @@
+"""Índice espacial de grilla y grafo de k vecinos más cercanos para instancias grandes.
+
+Con decenas de miles de puntos la matriz densa no cabe en memoria (50.000 puntos son 20 GB
+en float64). MatrizPerezosa calcula cada distancia desde las coordenadas cuando se pide y guarda
+solo las filas más usadas; GrafoCandidatos agrega las k vecinas de cada ciudad, así que
+ocupa O(n*k):
+
+    grafo = grafo_candidatos(coords, k=10)
+    ruta, costo = _ultimo(generador_busqueda_local(len(grafo), grafo))
+"""
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+R_TIERRA = 6371.0
+# Puntos por celda esperados en la grilla
+_PUNTOS_POR_CELDA = 8.0
+
+
+def _distancias(metrica, a, b):
+    """Distancias entre los puntos a (k, 2) y b (m, 2) como arreglo (k, m).
+
+    'aereo' recibe (lat, lon) en radianes y usa la misma fórmula que core.logica.matriz_aerea;
+    'euclidea' recibe coordenadas planas.
+    """
+    if metrica == 'aereo':
+        x = (b[None, :, 1] - a[:, None, 1]) * np.cos((a[:, None, 0] + b[None, :, 0]) / 2.0)
+        y = b[None, :, 0] - a[:, None, 0]
+        return R_TIERRA * np.sqrt(x * x + y * y)
+    dx = b[None, :, 0] - a[:, None, 0]
+    dy = b[None, :, 1] - a[:, None, 1]
+    return np.sqrt(dx * dx + dy * dy)
+
+
+def _distancias_pares(metrica, a, b):
+    """Distancias elemento a elemento entre los puntos a[k] y b[k]."""
+    if metrica == 'aereo':
+        x = (b[..., 1] - a[..., 1]) * np.cos((a[..., 0] + b[..., 0]) / 2.0)
+        return R_TIERRA * np.sqrt(x * x + (b[..., 0] - a[..., 0]) ** 2)
+    return np.sqrt(((b - a) ** 2).sum(axis=-1))
+
+
+class GrillaEspacial:
+    """Grilla uniforme sobre una proyección plana de los puntos (unos 8 puntos por celda).
+
+    Para 'aereo' se proyecta con x = R*lon*cos(lat media), y = R*lat. 'factor' acota cuánto
+    puede achicar la proyección una distancia real, y así la búsqueda por anillos es exacta.
+    """
+
+    def __init__(self, puntos, metrica='aereo'):
+        self.metrica = metrica
+        self.puntos = puntos
+        if metrica == 'aereo':
+            cos0 = math.cos(float(puntos[:, 0].mean()))
+            cos_min = math.cos(float(np.abs(puntos[:, 0]).max()))
+            plano = np.column_stack((R_TIERRA * puntos[:, 1] * cos0, R_TIERRA * puntos[:, 0]))
+            self.factor = min(1.0, cos_min / cos0)
+        else:
+            plano = puntos
+            self.factor = 1.0
+
+        n = len(puntos)
+        minimo = plano.min(axis=0)
+        extension = np.maximum(plano.max(axis=0) - minimo, 1e-9)
+        area = extension[0] * extension[1] if extension.min() > 1e-9 * extension.max() else extension.max() ** 2
+        self.lado = max(math.sqrt(area * _PUNTOS_POR_CELDA / max(n, 1)), 1e-9)
+        self.columnas, self.filas = (np.floor(extension / self.lado).astype(int) + 1).tolist()
+        celda = np.floor((plano - minimo) / self.lado).astype(np.int64)
+        self.cx = np.minimum(celda[:, 0], self.columnas - 1)
+        self.cy = np.minimum(celda[:, 1], self.filas - 1)
+        ids = self.cx * self.filas + self.cy
+        # Puntos ordenados por celda: los de la celda c son orden[inicio[c]:inicio[c + 1]]
+        self.orden = np.argsort(ids, kind='stable')
+        self.inicio = np.searchsorted(ids[self.orden], np.arange(self.columnas * self.filas + 1))
+
+    def en_anillo(self, cx, cy, r):
+        """Índices de los puntos en las celdas a distancia de Chebyshev <= r de (cx, cy)."""
+        x0, x1 = max(cx - r, 0), min(cx + r, self.columnas - 1)
+        y0, y1 = max(cy - r, 0), min(cy + r, self.filas - 1)
+        tramos = [self.orden[self.inicio[x * self.filas + y0]:self.inicio[x * self.filas + y1 + 1]]
+                  for x in range(x0, x1 + 1)]
+        return np.concatenate(tramos)
+
+    def k_vecinos(self, k):
+        """(vecinos, distancias) de forma (n, k), ordenados por distancia creciente."""
+        n = len(self.puntos)
+        vecinos = np.empty((n, k), dtype=np.int32)
+        distancias = np.empty((n, k), dtype=np.float64)
+        no_vacias = np.flatnonzero(np.diff(self.inicio))
+        for c in no_vacias:
+            miembros = self.orden[self.inicio[c]:self.inicio[c + 1]]
+            cx, cy = divmod(int(c), self.filas)
+            r = 1
+            while True:
+                candidatos = self.en_anillo(cx, cy, r)
+                if len(candidatos) > k or len(candidatos) == n:
+                    dist = _distancias(self.metrica, self.puntos[miembros], self.puntos[candidatos])
+                    dist[miembros[:, None] == candidatos[None, :]] = np.inf
+                    kk = min(k, len(candidatos) - 1)
+                    cercanos = np.argpartition(dist, kk - 1, axis=1)[:, :kk] if kk else np.empty((len(miembros), 0), int)
+                    d_cercanos = np.take_along_axis(dist, cercanos, axis=1)
+                    # Todo punto fuera del anillo está a más de r*lado (en la proyección)
+                    cubre_todo = len(candidatos) == n
+                    if cubre_todo or d_cercanos.max(initial=0.0) <= r * self.lado * self.factor:
+                        break
+                r += 1
+            orden = np.argsort(d_cercanos, axis=1)
+            vecinos[miembros, :kk] = candidatos[np.take_along_axis(cercanos, orden, axis=1)]
+            distancias[miembros, :kk] = np.take_along_axis(d_cercanos, orden, axis=1)
+        return vecinos, distancias
+
+    def conteo_por_celda(self, mascara):
+        """Cuántos puntos con mascara True hay en cada celda, como arreglo (columnas, filas)."""
+        ids = self.cx * self.filas + self.cy
+        return np.bincount(ids[mascara], minlength=self.columnas * self.filas).reshape(self.columnas, self.filas)
+
+    def mas_cercano(self, i, libres, conteo):
+        """El punto libre más cercano a i: (índice, distancia), o None si no queda ninguno.
+
+        'conteo' es conteo_por_celda(libres), mantenido por quien llama. La caja de celdas
+        se duplica hasta que el mejor encontrado está más cerca que cualquier celda de afuera.
+        """
+        cx, cy = int(self.cx[i]), int(self.cy[i])
+        r = 1
+        while True:
+            x0, x1 = max(cx - r, 0), min(cx + r, self.columnas - 1)
+            y0, y1 = max(cy - r, 0), min(cy + r, self.filas - 1)
+            cubre_todo = x0 == 0 and y0 == 0 and x1 == self.columnas - 1 and y1 == self.filas - 1
+            celdas = np.argwhere(conteo[x0:x1 + 1, y0:y1 + 1] > 0)
+            if len(celdas):
+                ids = (celdas[:, 0] + x0) * self.filas + celdas[:, 1] + y0
+                puntos = np.concatenate([self.orden[self.inicio[c]:self.inicio[c + 1]] for c in ids])
+                puntos = puntos[libres[puntos]]
+                dist = _distancias(self.metrica, self.puntos[i:i + 1], self.puntos[puntos])[0]
+                j = int(np.argmin(dist))
+                if cubre_todo or dist[j] <= r * self.lado * self.factor:
+                    return int(puntos[j]), float(dist[j])
+            elif cubre_todo:
+                return None
+            r *= 2
+
+
+class MatrizPerezosa:
+    """Matriz de distancias que se calcula desde las coordenadas al consultarla.
+
+    Se comporta como la matriz densa en los usos del proyecto: m[i][j], m[i, j], m[i]
+    (fila completa), m[filas, columnas] con arreglos (gather en lote) y np.asarray(m).
+    Las filas pedidas se guardan en una caché LRU de max_filas, así que la memoria depende
+    de las filas en uso y no de n^2. Las consultas escalares no pasan por la caché.
+    """
+
+    def __init__(self, puntos, metrica='aereo', max_filas=256):
+        self.puntos = puntos
+        self.metrica = metrica
+        self.n = len(puntos)
+        self.shape = (self.n, self.n)
+        self.dtype = np.dtype(np.float64)
+        self.max_filas = max_filas
+        self._filas = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        # Listas de floats: en las consultas escalares leer de una lista es mucho más barato
+        # que indexar el arreglo NumPy
+        self._a = puntos[:, 0].tolist()
+        self._b = puntos[:, 1].tolist()
+
+    @classmethod
+    def desde_coordenadas(cls, coords, metrica='aereo', max_filas=256):
+        """coords en (lat, lon) grados para 'aereo' o planas para 'euclidea'."""
+        puntos = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        if metrica == 'aereo':
+            puntos = np.radians(puntos)
+        return cls(puntos, metrica, max_filas)
+
+    def distancia(self, i, j):
+        a, b = self._a, self._b
+        if self.metrica == 'aereo':
+            x = (b[j] - b[i]) * math.cos((a[i] + a[j]) * 0.5)
+            return R_TIERRA * math.sqrt(x * x + (a[j] - a[i]) ** 2)
+        return math.hypot(a[j] - a[i], b[j] - b[i])
+
+    def distancias_desde(self, i, destinos):
+        """Distancias de i a cada ciudad de 'destinos' (arreglo de índices)."""
+        return _distancias(self.metrica, self.puntos[i:i + 1], self.puntos[destinos])[0]
+
+    def fila(self, i):
+        """Fila i completa (solo lectura), desde la caché LRU si está."""
+        i = int(i)
+        fila = self._filas.get(i)
+        if fila is not None:
+            self._filas.move_to_end(i)
+            self.aciertos += 1
+            return fila
+        self.fallos += 1
+        fila = _distancias(self.metrica, self.puntos[i:i + 1], self.puntos)[0]
+        fila[i] = 0.0
+        fila.flags.writeable = False
+        self._filas[i] = fila
+        if len(self._filas) > self.max_filas:
+            self._filas.popitem(last=False)
+        return fila
+
+    def costo_ruta(self, ruta):
+        r = np.asarray(ruta, dtype=np.intp)
+        if len(r) < 2:
+            return 0.0
+        return float(_distancias_pares(self.metrica, self.puntos[r[:-1]], self.puntos[r[1:]]).sum())
+
+    def listas_de_vecinos(self, k):
+        """Para cada ciudad, sus k vecinas más cercanas; se recorre por bloques de filas sin
+        guardar la matriz (O(n^2) tiempo, O(n*k) memoria)."""
+        vecinas = []
+        for i0 in range(0, self.n, 1024):
+            bloque = _distancias(self.metrica, self.puntos[i0:i0 + 1024], self.puntos)
+            bloque[np.arange(len(bloque)), np.arange(i0, i0 + len(bloque))] = np.inf
+            cercanas = np.argpartition(bloque, k - 1, axis=1)[:, :k]
+            orden = np.argsort(np.take_along_axis(bloque, cercanas, axis=1), axis=1)
+            vecinas.extend(np.take_along_axis(cercanas, orden, axis=1).tolist())
+        return vecinas
+
+    def __getitem__(self, idx):
+        if type(idx) is tuple:
+            i, j = idx
+            if isinstance(i, (int, np.integer)):
+                if isinstance(j, (int, np.integer)):
+                    return self.distancia(int(i), int(j))
+                return self.fila(i)[j]
+            i, j = np.broadcast_arrays(np.asarray(i, dtype=np.intp), np.asarray(j, dtype=np.intp))
+            return _distancias_pares(self.metrica, self.puntos[i], self.puntos[j])
+        return self.fila(idx)
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield self.fila(i)
+
+    def __array__(self, dtype=None, copy=None):
+        densa = _distancias(self.metrica, self.puntos, self.puntos)
+        np.fill_diagonal(densa, 0.0)
+        return densa if dtype is None else densa.astype(dtype)
+
+    @property
+    def nbytes(self):
+        """Memoria de coordenadas y filas en caché (las listas _a y _b suman ~64 bytes por ciudad)."""
+        return self.puntos.nbytes + sum(f.nbytes for f in self._filas.values())
+
+
+class GrafoCandidatos(MatrizPerezosa):
+    """Grafo disperso de k vecinas por ciudad que se usa en lugar de la matriz de distancias.
+
+    Además de la matriz perezosa guarda vecinos[i] (las k más cercanas a i, de la grilla) y
+    sus distancias, así que las heurísticas no necesitan recorrer filas completas.
+    """
+
+    def __init__(self, puntos, vecinos, distancias, metrica, grilla=None, max_filas=256):
+        super().__init__(puntos, metrica, max_filas)
+        self.grilla = grilla
+        self.vecinos = vecinos
+        self.distancias = distancias
+
+    def listas_de_vecinos(self, k):
+        return self.vecinos[:, :k].tolist()
+
+    @property
+    def nbytes(self):
+        return super().nbytes + self.vecinos.nbytes + self.distancias.nbytes
+
+
+def grafo_candidatos(coords, k=10, metrica='aereo'):
+    """Grafo de las k vecinas más cercanas de cada punto, en O(n log n) con una grilla.
+
+    metrica 'aereo' para (lat, lon) en grados (misma distancia que generar_matriz_distancias)
+    o 'euclidea' para coordenadas planas (p. ej. TSPLIB EUC_2D, sin redondeo).
+    """
+    puntos = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if metrica == 'aereo':
+        puntos = np.radians(puntos)
+    k = max(0, min(k, len(puntos) - 1))
+    grilla = GrillaEspacial(puntos, metrica)
+    vecinos, distancias = grilla.k_vecinos(k)
+    return GrafoCandidatos(puntos, vecinos, distancias, metrica, grilla)
@@ -1,14 +1,28 @@
 import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-try:
-    import requests
-except ImportError:
-    requests = None
+# 'requests' se importa al primer uso de la red (ver _requests): su import es lento y
+# el modo por lotes sin red no lo necesita. None indica que no está instalado.
+requests = False
+from .cache_carretera import CacheCarretera
+from .espacial import MatrizPerezosa
+from .traza import trazar
 
-_ROAD_CACHE = {}
+# Caché persistente compartida por las consultas por par y las de tabla
+_ROAD_CACHE = CacheCarretera()
+
+# Servidor OSRM (se puede apuntar a uno propio o a un stub local para pruebas)
+OSRM_URL = os.environ.get('TSP_OSRM_URL', 'http://router.project-osrm.org')
+_SESIONES = threading.local()
 
 # Estado de la última petición de matriz por carretera: 'ok', 'unavailable', 'partial' o None
 LAST_ROAD_MATRIX_STATUS = None
+# Detalle por bloque de la última matriz por carretera: dicts con 'filas', 'columnas' y 'estado'
+# ('cache', 'ok', 'reintentado', 'por_pares' si se completó entero por pares, 'mixto' o 'aereo')
+LAST_ROAD_MATRIX_TILES = []
 def euclidian_km(c1, c2):
     """Distancia Euclidiana (aproximación equirectangular)."""
     lat1, lon1 = c1
@@ -22,103 +36,359 @@ def euclidian_km(c1, c2):
     y = (lat2_rad - lat1_rad)
     return R * math.sqrt(x**2 + y**2)
 
-def _road_distance_osrm(c1, c2):
-    """Intenta obtener distancia por carretera, si falla usa aérea."""
-    if requests is None: return euclidian_km(c1, c2)
-    key = (c1, c2)
-    if key in _ROAD_CACHE: return _ROAD_CACHE[key]
+def _requests():
+    global requests
+    if requests is False:
+        try:
+            import requests as modulo
+        except ImportError:
+            modulo = None
+        requests = modulo
+    return requests
+
+def _sesion_http():
+    """Sesión 'requests' por hilo: reutiliza conexiones keep-alive con el servidor OSRM."""
+    sesion = getattr(_SESIONES, 'sesion', None)
+    if sesion is None:
+        sesion = _requests().Session()
+        adaptador = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        sesion.mount('http://', adaptador)
+        sesion.mount('https://', adaptador)
+        _SESIONES.sesion = sesion
+    return sesion
 
-    try:
-        # OSRM usa lon,lat
-        url = f"http://router.project-osrm.org/route/v1/driving/{c1[1]},{c1[0]};{c2[1]},{c2[0]}?overview=false"
-        resp = requests.get(url, timeout=1)
+def _fetch_road_pair(c1, c2, url_base=None, timeout=1, reintentos=2, espera=0.25):
+    """Distancia por carretera (km) desde el servicio 'route' de OSRM, o None si falla.
+    Reintenta con espera exponencial ante errores de red, 429 o 5xx."""
+    # OSRM usa lon,lat
+    url = f"{url_base or OSRM_URL}/route/v1/driving/{c1[1]},{c1[0]};{c2[1]},{c2[0]}?overview=false"
+    for intento in range(reintentos + 1):
+        if intento:
+            time.sleep(espera * 2 ** (intento - 1))
+        try:
+            resp = _sesion_http().get(url, timeout=timeout)
+        except Exception:
+            continue
         if resp.status_code == 200:
-            dist = resp.json()['routes'][0]['distance'] / 1000.0
-            _ROAD_CACHE[key] = dist
-            return dist
-    except Exception:
-        pass
-    return euclidian_km(c1, c2)
+            try:
+                return resp.json()['routes'][0]['distance'] / 1000.0
+            except Exception:
+                return None
+        if resp.status_code != 429 and resp.status_code < 500:
+            return None
+    return None
 
+def _road_pairs_osrm(coords, pares=None, max_hilos=8, url_base=None, timeout=1, reintentos=2, espera=0.25):
+    """Distancias por carretera de los pares (i, j) indicados (por defecto todos con i != j),
+    consultadas en paralelo.
 
-def _road_matrix_osrm(coords):
-    """Intenta obtener la matriz de distancias por carretera usando el servicio 'table' de OSRM.
-    Si falla, devuelve None para indicar que se debe usar fallback (haversine o N^2 requests).
+    Primero se revisa la caché en bloque (solo las filas x columnas de esos pares); los
+    restantes se piden con un pool de hilos acotado y sesiones persistentes. Un par que
+    falla usa la distancia aérea. Devuelve ({(i, j): km}, cantidad de pares con fallback aéreo).
     """
+    n = len(coords)
+    if pares is None:
+        pares = [(i, j) for i in range(n) for j in range(n) if i != j]
+        distancias = _ROAD_CACHE.obtener_bloque(coords, coords)
+    else:
+        filas = sorted({i for i, _ in pares})
+        columnas = sorted({j for _, j in pares})
+        encontradas = _ROAD_CACHE.obtener_bloque([coords[i] for i in filas], [coords[j] for j in columnas])
+        distancias = {(filas[a], columnas[b]): km for (a, b), km in encontradas.items()}
+    pendientes = [par for par in pares if par not in distancias]
+    if not pendientes:
+        return distancias, 0
+
+    if _requests() is None:
+        obtenidas = [None] * len(pendientes)
+    else:
+        def tarea(par):
+            i, j = par
+            return _fetch_road_pair(coords[i], coords[j], url_base, timeout, reintentos, espera)
+        with ThreadPoolExecutor(max_workers=max_hilos) as pool:
+            obtenidas = list(pool.map(tarea, pendientes))
+
+    nuevas = []
+    fallidos = 0
+    for (i, j), km in zip(pendientes, obtenidas):
+        if km is None:
+            fallidos += 1
+            km = euclidian_km(coords[i], coords[j])
+        else:
+            nuevas.append((coords[i], coords[j], km))
+        distancias[(i, j)] = km
+    _ROAD_CACHE.guardar_varios(nuevas)
+    return distancias, fallidos
+
+@trazar('osrm.pares', 'osrm')
+def _matriz_carretera_por_pares(coords, dtype=np.float64, **opciones):
     global LAST_ROAD_MATRIX_STATUS
-    if requests is None:
+    n = len(coords)
+    distancias, fallidos = _road_pairs_osrm(coords, **opciones)
+    matriz = np.zeros((n, n), dtype=dtype)
+    for (i, j), km in distancias.items():
+        matriz[i, j] = km
+    if fallidos == 0:
+        LAST_ROAD_MATRIX_STATUS = 'ok'
+    elif fallidos < n * (n - 1):
+        LAST_ROAD_MATRIX_STATUS = 'partial'
+    else:
         LAST_ROAD_MATRIX_STATUS = 'unavailable'
-        return None
+    return matriz
 
+
+@trazar('osrm.bloque', 'osrm')
+def _fetch_table_tile(coords, filas, columnas, url_base=None, timeout=5, reintentos=2, espera=0.5):
+    """Pide al servicio 'table' de OSRM el bloque filas x columnas (rangos de índices).
+    Devuelve (arreglo en km con NaN donde no hay ruta, intentos usados) o (None, intentos)."""
+    puntos = [coords[i] for i in filas] + [coords[j] for j in columnas]
     # Construir la cadena de coordenadas lon,lat;lon,lat;...
-    coord_str = ";".join([f"{lon},{lat}" for lat, lon in coords])
-    url = f"http://router.project-osrm.org/table/v1/driving/{coord_str}?annotations=distance"
-    try:
-        resp = requests.get(url, timeout=5)
-        if resp.status_code == 200:
-            data = resp.json()
-            if 'distances' in data and data['distances']:
-                # distances are in meters; convert to km
-                arr = data['distances']
-                n = len(arr)
-                mat = [[0.0]*n for _ in range(n)]
-                for i in range(n):
-                    for j in range(n):
-                        d = arr[i][j]
-                        mat[i][j] = 0.0 if d is None else (d / 1000.0)
-                LAST_ROAD_MATRIX_STATUS = 'ok'
-                return mat
-    except Exception:
-        pass
-    LAST_ROAD_MATRIX_STATUS = 'unavailable'
-    return None
+    coord_str = ";".join(f"{lon},{lat}" for lat, lon in puntos)
+    origenes = ";".join(str(k) for k in range(len(filas)))
+    destinos = ";".join(str(len(filas) + k) for k in range(len(columnas)))
+    url = (f"{url_base or OSRM_URL}/table/v1/driving/{coord_str}"
+           f"?annotations=distance&sources={origenes}&destinations={destinos}")
+    for intento in range(reintentos + 1):
+        if intento:
+            time.sleep(espera * 2 ** (intento - 1))
+        try:
+            resp = _sesion_http().get(url, timeout=timeout)
+            if resp.status_code == 200:
+                data = resp.json()
+                if data.get('distances'):
+                    # distances viene en metros; None (sin ruta) queda como NaN
+                    bloque = np.array(data['distances'], dtype=np.float64) / 1000.0
+                    if bloque.shape == (len(filas), len(columnas)):
+                        return bloque, intento + 1
+            elif resp.status_code != 429 and resp.status_code < 500:
+                break
+        except Exception:
+            pass
+    return None, reintentos + 1
+
+@trazar('osrm.table', 'osrm')
+def _road_matrix_osrm(coords, tam_bloque=100, max_hilos=4, url_base=None, timeout=5, reintentos=2, espera=0.5):
+    """Matriz de distancias por carretera usando el servicio 'table' de OSRM por bloques.
+
+    La matriz se divide en bloques origen x destino de tam_bloque (así no se superan los
+    límites de largo de URL ni de tamaño de tabla), que se piden en paralelo y se escriben
+    directo en un arreglo NumPy. Los bloques ya presentes en la caché no se piden. Un bloque
+    que sigue fallando tras los reintentos se completa con consultas por par. El estado de
+    cada bloque queda en LAST_ROAD_MATRIX_TILES. Si ningún bloque pendiente se pudo obtener
+    devuelve None para indicar que se debe usar fallback (aérea).
+    """
+    global LAST_ROAD_MATRIX_STATUS, LAST_ROAD_MATRIX_TILES
+    n = len(coords)
+    matriz = np.full((n, n), np.nan)
+    np.fill_diagonal(matriz, 0.0)
+    for (i, j), km in _ROAD_CACHE.obtener_bloque(coords, coords).items():
+        matriz[i, j] = km
+
+    bloques = [{'filas': (i0, min(i0 + tam_bloque, n)), 'columnas': (j0, min(j0 + tam_bloque, n))}
+               for i0 in range(0, n, tam_bloque) for j0 in range(0, n, tam_bloque)]
+    pendientes = []
+    for bloque in bloques:
+        (i0, i1), (j0, j1) = bloque['filas'], bloque['columnas']
+        if np.isnan(matriz[i0:i1, j0:j1]).any():
+            pendientes.append(bloque)
+        else:
+            bloque['estado'] = 'cache'
+    LAST_ROAD_MATRIX_TILES = bloques
+
+    if pendientes and _requests() is None:
+        LAST_ROAD_MATRIX_STATUS = 'unavailable'
+        return None
+
+    def tarea(bloque):
+        (i0, i1), (j0, j1) = bloque['filas'], bloque['columnas']
+        return _fetch_table_tile(coords, range(i0, i1), range(j0, j1), url_base, timeout, reintentos, espera)
+
+    fallidos = []
+    with ThreadPoolExecutor(max_workers=max_hilos) as pool:
+        for bloque, (datos, intentos) in zip(pendientes, pool.map(tarea, pendientes)):
+            if datos is None:
+                fallidos.append(bloque)
+                continue
+            (i0, i1), (j0, j1) = bloque['filas'], bloque['columnas']
+            vista = matriz[i0:i1, j0:j1]
+            diagonal = np.arange(i0, i1)[:, None] == np.arange(j0, j1)[None, :]
+            vista[~diagonal] = datos[~diagonal]
+            bloque['estado'] = 'ok' if intentos == 1 else 'reintentado'
+            validos = np.argwhere(~np.isnan(datos) & ~diagonal)
+            _ROAD_CACHE.guardar_varios((coords[i0 + a], coords[j0 + b], datos[a, b]) for a, b in validos)
+
+    if pendientes and len(fallidos) == len(pendientes):
+        for bloque in fallidos:
+            bloque['estado'] = 'aereo'
+        LAST_ROAD_MATRIX_STATUS = 'unavailable'
+        return None
+
+    # Bloques caídos: se completan con consultas por par
+    for bloque in fallidos:
+        (i0, i1), (j0, j1) = bloque['filas'], bloque['columnas']
+        pares = [(i, j) for i in range(i0, i1) for j in range(j0, j1) if i != j and np.isnan(matriz[i, j])]
+        distancias, sin_ruta = _road_pairs_osrm(coords, pares, url_base=url_base)
+        for par in pares:
+            matriz[par] = distancias[par]
+        # Recuperado entero por pares vale igual que un bloque de la tabla
+        bloque['estado'] = 'por_pares' if sin_ruta == 0 else ('mixto' if sin_ruta < len(pares) else 'aereo')
+
+    # Pares sin ruta según OSRM: distancia aérea
+    faltantes = np.argwhere(np.isnan(matriz))
+    for i, j in faltantes:
+        matriz[i, j] = euclidian_km(coords[i], coords[j])
+
+    estados = {b['estado'] for b in bloques}
+    completos = {'ok', 'reintentado', 'cache', 'por_pares'}
+    LAST_ROAD_MATRIX_STATUS = 'ok' if estados <= completos and not len(faltantes) else 'partial'
+    return matriz
+
+def _bloques_aereos(coords, filas_por_bloque=1024):
+    """Distancias aéreas vectorizadas (misma fórmula que euclidian_km), por bloques de filas
+    para acotar la memoria temporal. Entrega (inicio, bloque) con bloque de forma (k, n)."""
+    c = np.radians(np.asarray(coords, dtype=np.float64).reshape(-1, 2))
+    lat, lon = c[:, 0], c[:, 1]
+    R = 6371.0
+    for i0 in range(0, len(c), filas_por_bloque):
+        i1 = min(i0 + filas_por_bloque, len(c))
+        x = (lon[None, :] - lon[i0:i1, None]) * np.cos((lat[i0:i1, None] + lat[None, :]) / 2.0)
+        y = lat[None, :] - lat[i0:i1, None]
+        yield i0, R * np.sqrt(x**2 + y**2)
 
-def generar_matriz_distancias(coords, metric='aereo'):
+def matriz_aerea(coords, dtype=np.float64, out=None):
+    """Matriz densa de distancias aéreas calculada con broadcasting.
+    out permite escribir directo en un arreglo ya reservado (p. ej. un memmap en disco)."""
     n = len(coords)
-    matriz = np.zeros((n, n))
+    matriz = np.empty((n, n), dtype=dtype) if out is None else out
+    for i0, bloque in _bloques_aereos(coords):
+        matriz[i0:i0 + len(bloque)] = bloque
+        matriz[i0:i0 + len(bloque)][np.arange(len(bloque)), np.arange(i0, i0 + len(bloque))] = 0
+    return matriz
+
+
+class MatrizCondensada:
+    """Matriz simétrica guardada solo con su triángulo superior (n*(n-1)/2 valores).
+
+    Acepta los mismos accesos que usan los solvers: m[i][j], m[i, j], filas m[i] y
+    'gathers' m[I, J] con arreglos. np.asarray(m) la expande a una matriz densa.
+    El ahorro de memoria es solo para guardarla o cachearla: los solvers la expanden con
+    np.asarray al empezar (para resolver sin la matriz densa está core.espacial.MatrizPerezosa).
+    """
+
+    def __init__(self, valores, n):
+        self.valores = valores
+        self.n = n
+        self.shape = (n, n)
+        self.dtype = valores.dtype
+
+    @classmethod
+    def desde_coordenadas(cls, coords, dtype=np.float64):
+        n = len(coords)
+        valores = np.empty(n * (n - 1) // 2, dtype=dtype)
+        for i0, bloque in _bloques_aereos(coords):
+            for k, fila in enumerate(bloque):
+                i = i0 + k
+                inicio = cls._desplazamiento(n, i)
+                valores[inicio:inicio + n - i - 1] = fila[i + 1:]
+        return cls(valores, n)
+
+    @staticmethod
+    def _desplazamiento(n, i):
+        return n * i - i * (i + 1) // 2
+
+    def _indices(self, i, j):
+        i = np.asarray(i)
+        j = np.asarray(j)
+        a = np.minimum(i, j)
+        b = np.maximum(i, j)
+        # En la diagonal el índice no importa: el resultado se reemplaza por 0
+        k = self.n * a - a * (a + 1) // 2 + b - a - 1
+        return np.where(a == b, 0, k), a == b
+
+    def get(self, i, j):
+        k, diagonal = self._indices(i, j)
+        if self.valores.size == 0:
+            return np.zeros(np.shape(k), dtype=self.dtype)
+        return np.where(diagonal, 0, self.valores[k])
+
+    def fila(self, i):
+        return self.get(i, np.arange(self.n))
+
+    def __getitem__(self, idx):
+        if isinstance(idx, tuple):
+            return self.get(*idx)
+        return self.fila(idx)
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield self.fila(i)
+
+    def __array__(self, dtype=None, copy=None):
+        densa = np.zeros((self.n, self.n), dtype=dtype or self.dtype)
+        for i in range(self.n):
+            densa[i] = self.fila(i)
+        return densa
+
+    @property
+    def nbytes(self):
+        return self.valores.nbytes
+
+
+@trazar('generar_matriz_distancias', 'matriz')
+def generar_matriz_distancias(coords, metric='aereo', dtype=np.float64, condensada=False,
+                              perezosa=False, max_filas=256):
+    """Matriz de distancias entre coords.
+
+    dtype permite usar float32 y condensada=True devuelve una MatrizCondensada cuando la
+    métrica es simétrica (aérea); la de carretera siempre es densa porque puede ser asimétrica.
+    perezosa=True (solo aérea) devuelve una core.espacial.MatrizPerezosa que calcula las
+    distancias al consultarlas y guarda a lo sumo max_filas filas.
+    """
     if metric == 'carretera':
         # Intentar obtener toda la matriz de una sola vez (más eficiente)
         road_mat = _road_matrix_osrm(coords)
         if road_mat is not None:
-            for i in range(n):
-                for j in range(n):
-                    matriz[i][j] = road_mat[i][j]
-            return matriz
+            return road_mat.astype(dtype, copy=False)
 
         # Si la petición de tabla no estuvo disponible, preferimos usar haversine
         # para evitar múltiples llamadas lentas a OSRM desde la red pública.
-        if metric == 'carretera' and LAST_ROAD_MATRIX_STATUS == 'unavailable':
+        if LAST_ROAD_MATRIX_STATUS == 'unavailable':
             metric = 'aereo'
 
-        # Fallback: calcular por pares (aérea o carretera con llamada por par)
-    for i in range(n):
-        for j in range(n):
-            if i == j:
-                matriz[i][j] = 0
-            else:
-                if metric == 'carretera':
-                    matriz[i][j] = _road_distance_osrm(coords[i], coords[j])
-                else:
-                    matriz[i][j] = euclidian_km(coords[i], coords[j])
-    return matriz
+    if metric != 'carretera':
+        if perezosa:
+            return MatrizPerezosa.desde_coordenadas(coords, 'aereo', max_filas=max_filas)
+        if condensada:
+            return MatrizCondensada.desde_coordenadas(coords, dtype=dtype)
+        return matriz_aerea(coords, dtype=dtype)
 
+    # Fallback: carretera con una llamada por par
+    return _matriz_carretera_por_pares(coords, dtype=dtype)
 
-def generar_matriz_carretera_forzada(coords):
+
+def generar_matriz_carretera_forzada(coords, max_hilos=8):
     """Fuerza el cálculo de la matriz usando llamadas por par a OSRM (más lento).
     Útil cuando la API de 'table' no está disponible pero quieres distancias por carretera.
+    Las llamadas se hacen en paralelo con max_hilos hilos y reintentos.
     """
-    n = len(coords)
-    matriz = np.zeros((n, n))
-    for i in range(n):
-        for j in range(n):
-            if i == j:
-                matriz[i][j] = 0
-            else:
-                matriz[i][j] = _road_distance_osrm(coords[i], coords[j])
-    return matriz
+    return _matriz_carretera_por_pares(coords, max_hilos=max_hilos)
 
 def calcular_costo_ruta(ruta, matriz):
+    # Matrices perezosas o dispersas (p. ej. core.espacial.GrafoCandidatos) saben sumar la ruta
+    # sin armar filas completas
+    if hasattr(matriz, 'costo_ruta'):
+        return matriz.costo_ruta(ruta)
     costo = 0
     for i in range(len(ruta) - 1):
         costo += matriz[ruta[i]][ruta[i+1]]
-    return costo
\ No newline at end of file
+    return costo
+
+def calcular_costos_lote(rutas, matriz):
+    """Costo de un bloque de rutas con un solo 'gather' de NumPy.
+    rutas: arreglo entero de forma (lote, n+1); devuelve un arreglo de largo 'lote'.
+    """
+    m = matriz if isinstance(matriz, MatrizCondensada) else np.asarray(matriz)
+    return m[rutas[:, :-1], rutas[:, 1:]].sum(axis=1)
@@ -0,0 +1,177 @@
+"""Registro de motores de resolución y ejecución instrumentada.
+
+Cada motor envuelve un generador de core.algoritmos y declara sus capacidades, para que
+la interfaz y las herramientas por lotes los listen sin conocerlos de antemano:
+
+    for motor in listar_motores(exacto=True):
+        registro = ejecutar(motor.nombre, matriz, tiempo_max=10)
+"""
+import math
+import time
+import tracemalloc
+
+from . import algoritmos, traza
+
+
+class Motor:
+    """Generador (n_ciudades, matriz, **opciones) -> (ruta, costo) con sus capacidades.
+
+    exacto: la última entrega es el óptimo. asimetrico: respeta matriz[i][j] != matriz[j][i].
+    anytime: las entregas intermedias son tours cerrados válidos, así que cortar por tiempo
+    deja una solución. n_max: tamaño recomendado a partir del cual deja de ser práctico.
+    estadisticas: el generador acepta el dict 'estadisticas' de contadores.
+    total_entregas: función (n, **opciones) -> cantidad de tuplas que produce, si se conoce de
+    antemano (permite mostrar la fracción completada). grafo: acepta un core.espacial.GrafoCandidatos
+    o una MatrizPerezosa sin armar la matriz densa (los demás motores la expanden con np.asarray).
+    """
+
+    def __init__(self, nombre, generador, descripcion, exacto, asimetrico=True, anytime=False,
+                 n_max=None, estadisticas=False, total_entregas=None, grafo=False):
+        self.nombre = nombre
+        self.generador = generador
+        self.descripcion = descripcion
+        self.exacto = exacto
+        self.asimetrico = asimetrico
+        self.anytime = anytime
+        self.n_max = n_max
+        self.estadisticas = estadisticas
+        self.total_entregas = total_entregas
+        self.grafo = grafo
+
+    def crear(self, n_ciudades, matriz, estadisticas=None, **opciones):
+        """Devuelve el generador listo para iterar; pasa 'estadisticas' solo si el motor las lleva."""
+        if self.estadisticas and estadisticas is not None:
+            opciones['estadisticas'] = estadisticas
+        return traza.generador(self.generador(n_ciudades, matriz, **opciones), f"solver.{self.nombre}", n=n_ciudades)
+
+    def __repr__(self):
+        tipo = 'exacto' if self.exacto else 'heurístico'
+        return f"Motor({self.nombre!r}, {tipo})"
+
+
+_MOTORES = {}
+
+
+def registrar(motor):
+    """Agrega (o reemplaza) un motor en el registro y lo devuelve."""
+    _MOTORES[motor.nombre] = motor
+    return motor
+
+
+def obtener_motor(nombre):
+    try:
+        return _MOTORES[nombre]
+    except KeyError:
+        raise ValueError(f"Motor desconocido: {nombre!r} (disponibles: {', '.join(_MOTORES)})") from None
+
+
+def listar_motores(exacto=None, asimetrico=None, anytime=None, n=None, grafo=None):
+    """Motores registrados, en orden de registro, filtrados por capacidad y tamaño."""
+    return [m for m in _MOTORES.values()
+            if (exacto is None or m.exacto == exacto)
+            and (asimetrico is None or m.asimetrico == asimetrico)
+            and (anytime is None or m.anytime == anytime)
+            and (grafo is None or m.grafo == grafo)
+            and (n is None or m.n_max is None or n <= m.n_max)]
+
+
+registrar(Motor('nn', algoritmos.generador_vecino_mas_cercano, "Vecino más cercano",
+                exacto=False, total_entregas=lambda n, **_: n + 1, grafo=True))
+registrar(Motor('nn_multi', algoritmos.generador_vecino_mas_cercano_multiarranque,
+                "Vecino más cercano desde cada ciudad", exacto=False, anytime=True))
+registrar(Motor('arbol_doble', algoritmos.generador_arbol_doble, "Doble árbol (MST)",
+                exacto=False, asimetrico=False))
+registrar(Motor('insercion_mas_barata', algoritmos.generador_insercion_mas_barata, "Inserción más barata",
+                exacto=False, total_entregas=lambda n, **_: max(n, 2)))
+registrar(Motor('insercion_mas_lejana', algoritmos.generador_insercion_mas_lejana, "Inserción más lejana",
+                exacto=False, total_entregas=lambda n, **_: max(n, 2)))
+registrar(Motor('busqueda_local', algoritmos.generador_busqueda_local, "2-opt + Or-opt",
+                exacto=False, anytime=True, estadisticas=True, grafo=True))
+registrar(Motor('busqueda_local_iterada', algoritmos.generador_busqueda_local_iterada,
+                "Búsqueda local iterada (varias cadenas)", exacto=False, anytime=True, estadisticas=True,
+                grafo=True))
+registrar(Motor('colonia_hormigas', algoritmos.generador_colonia_hormigas, "Colonia de hormigas (Max-Min)",
+                exacto=False, anytime=True, n_max=500, estadisticas=True,
+                total_entregas=lambda n, iteraciones=algoritmos.ITERACIONES_HORMIGAS, **_:
+                iteraciones + 2 if n >= 4 else 1))
+registrar(Motor('fuerza_bruta_secuencial', algoritmos.generador_fuerza_bruta,
+                "Fuerza bruta (cada permutación)", exacto=True, anytime=True, n_max=10,
+                total_entregas=lambda n, **_: math.factorial(max(n - 1, 0)) + 1))
+registrar(Motor('fuerza_bruta', algoritmos.generador_fuerza_bruta_vectorizada,
+                "Fuerza bruta vectorizada", exacto=True, anytime=True, n_max=12, estadisticas=True))
+registrar(Motor('fuerza_bruta_paralela', algoritmos.generador_fuerza_bruta_paralela,
+                "Fuerza bruta en varios procesos", exacto=True, anytime=True, n_max=13, estadisticas=True))
+registrar(Motor('held_karp', algoritmos.generador_held_karp, "Held-Karp (programación dinámica)",
+                exacto=True, n_max=22, total_entregas=lambda n, **_: max(n, 2)))
+registrar(Motor('branch_and_bound', algoritmos.generador_branch_and_bound, "Ramificación y acotamiento",
+                exacto=True, anytime=True, n_max=30, estadisticas=True))
+
+
+def ejecutar(motor, matriz, tiempo_max=None, detener=None, medir_memoria=False, **opciones):
+    """Corre un motor hasta el final (o hasta tiempo_max / detener) y devuelve su registro.
+
+    El registro es un dict serializable con: motor, n, ruta, costo, completo, tiempo,
+    tiempo_mejor (desde el inicio hasta la última mejora), entregas (tuplas producidas),
+    mejoras (veces que bajó el mejor tour cerrado), evaluaciones y nodos_expandidos (None si
+    el motor no los informa), memoria_pico en bytes (solo con medir_memoria; tracemalloc
+    vuelve más lento el código Python y no ve la memoria de procesos hijos) y
+    estadisticas con los contadores propios del motor.
+    'detener' es un threading.Event opcional para cancelar la corrida desde otro hilo.
+    """
+    if isinstance(motor, str):
+        motor = obtener_motor(motor)
+    n = len(matriz)
+    estadisticas = {}
+    mejor_ruta, mejor_costo, t_mejor = None, float('inf'), None
+    entregas = mejoras = 0
+    completo = True
+
+    medir_memoria = medir_memoria and not tracemalloc.is_tracing()
+    if medir_memoria:
+        tracemalloc.start()
+    generador = motor.crear(n, matriz, estadisticas, **opciones)
+    # Si el motor anuncia cuántas tuplas produce, la última marca el final aunque llegue tarde
+    total = motor.total_entregas(n, **opciones) if motor.total_entregas else None
+    t0 = time.perf_counter()
+    try:
+        while True:
+            # El plazo se revisa antes de pedir la siguiente entrega: la que ya llegó cuenta
+            if total is None or entregas < total:
+                if (tiempo_max is not None and time.perf_counter() - t0 > tiempo_max) or \
+                        (detener is not None and detener.is_set()):
+                    completo = False
+                    break
+            try:
+                ruta, costo = next(generador)
+            except StopIteration:
+                break
+            entregas += 1
+            # Solo cuentan los tours cerrados (los constructivos también entregan rutas parciales,
+            # y el recorrido de Euler del doble árbol puede tener justo n + 1 ciudades con repetidas)
+            if len(ruta) == n + 1 and costo < mejor_costo and len(set(ruta)) == n:
+                mejor_ruta, mejor_costo = list(ruta), float(costo)
+                t_mejor = time.perf_counter() - t0
+                mejoras += 1
+    finally:
+        generador.close()
+        tiempo = time.perf_counter() - t0
+        memoria_pico = None
+        if medir_memoria:
+            memoria_pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    return {
+        'motor': motor.nombre,
+        'n': n,
+        'ruta': mejor_ruta,
+        'costo': mejor_costo if mejor_ruta is not None else None,
+        'completo': completo,
+        'tiempo': tiempo,
+        'tiempo_mejor': t_mejor,
+        'entregas': entregas,
+        'mejoras': mejoras,
+        'evaluaciones': estadisticas.get('evaluadas'),
+        'nodos_expandidos': estadisticas.get('nodos_expandidos'),
+        'memoria_pico': memoria_pico,
+        'estadisticas': estadisticas,
+    }
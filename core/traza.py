@@ -0,0 +1,180 @@
+"""Tramos de tiempo (spans) livianos con exportación a formato Chrome/Perfetto.
+
+Desactivado no cuesta más que revisar una variable global por llamada. Se activa con
+activar() o con la variable de entorno TSP_TRAZA=archivo.json; en ese caso al salir del
+programa se escribe el archivo y se imprime un resumen por stderr:
+
+    TSP_TRAZA=traza.json python main.py
+    python cli.py instancias/ --traza traza.json
+
+El archivo se abre en chrome://tracing o https://ui.perfetto.dev.
+
+Solo se traza el proceso principal: los tramos de los trabajadores de un pool de procesos
+(fuerza bruta paralela, búsqueda local iterada con procesos > 1) quedan en la memoria de cada
+trabajador y no llegan al archivo. El tramo del generador en el proceso principal sí cubre
+la corrida completa.
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+_ACTIVA = False
+_EVENTOS = []
+_PID = os.getpid()
+
+
+def _ahora():
+    """Microsegundos de un reloj monótono (unidad de 'ts' y 'dur' en Chrome)."""
+    return time.perf_counter_ns() / 1000.0
+
+
+def activar(limpiar=True):
+    global _ACTIVA
+    if limpiar:
+        _EVENTOS.clear()
+    _ACTIVA = True
+
+
+def desactivar():
+    global _ACTIVA
+    _ACTIVA = False
+
+
+def activa():
+    return _ACTIVA
+
+
+def _registrar(nombre, categoria, inicio, duracion, args):
+    # list.append es atómico con el GIL: los hilos de OSRM pueden registrar sin lock
+    _EVENTOS.append({'name': nombre, 'cat': categoria, 'ph': 'X', 'ts': inicio, 'dur': duracion,
+                     'pid': _PID, 'tid': threading.get_ident(), 'args': args})
+
+
+class _Tramo:
+    __slots__ = ('nombre', 'categoria', 'args', 'inicio')
+
+    def __init__(self, nombre, categoria, args):
+        self.nombre = nombre
+        self.categoria = categoria
+        self.args = args
+
+    def __enter__(self):
+        self.inicio = _ahora()
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        if tipo is not None:
+            self.args['error'] = tipo.__name__
+        _registrar(self.nombre, self.categoria, self.inicio, _ahora() - self.inicio, self.args)
+        return False
+
+
+class _TramoNulo:
+    __slots__ = ()
+    args = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        return False
+
+
+_NULO = _TramoNulo()
+
+
+def tramo(nombre, categoria='general', **args):
+    """Context manager que mide el bloque: with tramo('matriz', n=100): ..."""
+    if not _ACTIVA:
+        return _NULO
+    return _Tramo(nombre, categoria, args)
+
+
+def trazar(nombre=None, categoria='general'):
+    """Decorador que registra cada llamada a la función como un tramo."""
+    def decorador(funcion):
+        etiqueta = nombre or funcion.__qualname__
+
+        @functools.wraps(funcion)
+        def envoltura(*a, **k):
+            if not _ACTIVA:
+                return funcion(*a, **k)
+            with _Tramo(etiqueta, categoria, {}):
+                return funcion(*a, **k)
+        return envoltura
+    return decorador
+
+
+def generador(gen, nombre, categoria='solver', **args):
+    """Envuelve un generador (ruta, costo) en un tramo desde la primera entrega hasta que se
+    agota o se cierra. En args quedan las entregas y el tiempo propio del generador (sin el
+    tiempo que el consumidor pasa entre entregas, p. ej. dibujando)."""
+    if not _ACTIVA:
+        return gen
+    return _generador_trazado(gen, nombre, categoria, args)
+
+
+def _generador_trazado(gen, nombre, categoria, args):
+    inicio = _ahora()
+    propio = 0.0
+    entregas = 0
+    try:
+        while True:
+            t = _ahora()
+            try:
+                item = next(gen)
+            except StopIteration:
+                break
+            finally:
+                propio += _ahora() - t
+            entregas += 1
+            yield item
+    finally:
+        gen.close()
+        args.update(entregas=entregas, tiempo_propio_ms=propio / 1000.0)
+        _registrar(nombre, categoria, inicio, _ahora() - inicio, args)
+
+
+def eventos():
+    return list(_EVENTOS)
+
+
+def exportar_chrome(ruta):
+    """Escribe los tramos en formato Trace Event (JSON) y devuelve cuántos se exportaron."""
+    datos = eventos()
+    nombres_hilo = {t.ident: t.name for t in threading.enumerate()}
+    metadatos = [{'name': 'thread_name', 'ph': 'M', 'pid': _PID, 'tid': tid,
+                  'args': {'name': nombres_hilo.get(tid, str(tid))}}
+                 for tid in {e['tid'] for e in datos}]
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': metadatos + datos, 'displayTimeUnit': 'ms'}, f, default=str)
+    return len(datos)
+
+
+def resumen(archivo=None):
+    """Imprime por tramo: llamadas, total, media y máximo en milisegundos."""
+    archivo = archivo or sys.stderr
+    grupos = {}
+    for e in eventos():
+        grupos.setdefault(e['name'], []).append(e['dur'] / 1000.0)
+    print(f"{'tramo':40} {'llamadas':>9} {'total ms':>11} {'media ms':>10} {'máx ms':>10}", file=archivo)
+    for nombre, duraciones in sorted(grupos.items(), key=lambda g: -sum(g[1])):
+        total = sum(duraciones)
+        print(f"{nombre:40} {len(duraciones):9} {total:11.2f} {total / len(duraciones):10.2f} "
+              f"{max(duraciones):10.2f}", file=archivo)
+
+
+def _exportar_al_salir(ruta):
+    if _EVENTOS:
+        exportar_chrome(ruta)
+        resumen()
+        print(f"Traza guardada en {ruta}", file=sys.stderr)
+
+
+if os.environ.get('TSP_TRAZA'):
+    activar()
+    atexit.register(_exportar_al_salir, os.environ['TSP_TRAZA'])
@@ -0,0 +1,172 @@
+import csv
+import os
+
+import numpy as np
+
+from core import logica
+from core.logica import generar_matriz_distancias, matriz_aerea
+from . import tsplib
+
+# Extensiones que sabe leer cargar_instancia
+EXTENSIONES = ('.csv', '.tsp', '.npy')
+
+
+class Instancia:
+    """Instancia TSP cargada desde archivo.
+
+    tipo es 'LATLON' (coordenadas geográficas propias), 'EUC_2D', 'GEO' o 'EXPLICIT'
+    (matriz dada en 'pesos'). coords_mapa son (lat, lon) para dibujar, o None si la
+    instancia no es geográfica.
+    """
+
+    def __init__(self, nombre, nombres, coords, tipo='LATLON', pesos=None, ruta=None, coords_mapa=None):
+        self.nombre = nombre
+        self.nombres = nombres
+        self.coords = coords
+        self.tipo = tipo
+        self.pesos = pesos
+        self.ruta = ruta
+        self.coords_mapa = coords_mapa if coords_mapa is not None else (coords if tipo == 'LATLON' else None)
+
+    @property
+    def n(self):
+        return len(self.nombres)
+
+
+def cargar_csv(ruta):
+    """Lee un CSV de coordenadas con columnas nombre,lat,lon (o solo lat,lon).
+    La fila de encabezado es opcional. Devuelve (nombres, coords)."""
+    nombres, coords = [], []
+    with open(ruta, newline='', encoding='utf-8') as f:
+        for fila in csv.reader(f):
+            fila = [c.strip() for c in fila]
+            if not fila or not any(fila) or fila[0].startswith('#'):
+                continue
+            try:
+                valores = [float(c) for c in fila[-2:]]
+            except ValueError:
+                # Encabezado
+                continue
+            nombre = fila[0] if len(fila) >= 3 else str(len(nombres))
+            nombres.append(nombre)
+            coords.append((valores[0], valores[1]))
+    return nombres, coords
+
+
+def cargar_instancia(ruta):
+    """Carga una instancia desde archivo según su extensión (.csv, .tsp o una matriz .npy)."""
+    base, ext = os.path.splitext(ruta)
+    ext = ext.lower()
+    nombre = os.path.basename(base)
+    if ext == '.csv':
+        nombres, coords = cargar_csv(ruta)
+        return Instancia(nombre, nombres, coords, ruta=ruta)
+    if ext == '.tsp':
+        datos = tsplib.leer_tsplib(ruta)
+        n = datos['DIMENSION']
+        coords = datos['coords']
+        mapa = None
+        if datos['EDGE_WEIGHT_TYPE'] == 'GEO':
+            mapa = [tuple(c) for c in tsplib.geo_a_latlon(coords)]
+        return Instancia(datos.get('NAME', nombre), [str(i + 1) for i in range(n)],
+                         [tuple(c) for c in coords] if coords is not None else None,
+                         tipo=datos['EDGE_WEIGHT_TYPE'], pesos=datos['pesos'], ruta=ruta, coords_mapa=mapa)
+    if ext == '.npy':
+        # Matriz precalculada: se abre mapeada en memoria, sin copiarla a RAM
+        pesos = np.load(ruta, mmap_mode='r')
+        return Instancia(nombre, [str(i) for i in range(len(pesos))], None, tipo='EXPLICIT', pesos=pesos, ruta=ruta)
+    raise ValueError(f"Formato de instancia no soportado: {ruta}")
+
+
+def listar_instancias(rutas):
+    """Expande archivos y directorios a la lista ordenada de instancias reconocidas."""
+    archivos = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            nombres = sorted(os.listdir(ruta))
+            for nombre in nombres:
+                base, ext = os.path.splitext(nombre)
+                if ext.lower() not in EXTENSIONES:
+                    continue
+                # Las matrices guardadas por cargar_o_construir_matriz (x.aereo.npy) no son instancias
+                if ext.lower() == '.npy' and any(os.path.splitext(base)[0] + e in nombres for e in ('.csv', '.tsp')):
+                    continue
+                archivos.append(os.path.join(ruta, nombre))
+        else:
+            archivos.append(ruta)
+    return archivos
+
+
+def matriz_de_instancia(instancia, metric='aereo', dtype=np.float64, out=None):
+    """Construye la matriz de distancias de la instancia (en 'out' si se entrega)."""
+    n = instancia.n
+    if instancia.tipo == 'EXPLICIT':
+        if out is None:
+            return instancia.pesos
+        out[:] = instancia.pesos
+        return out
+    if instancia.tipo == 'LATLON':
+        if metric == 'aereo':
+            return matriz_aerea(instancia.coords, dtype=dtype, out=out)
+        matriz = generar_matriz_distancias(instancia.coords, metric=metric, dtype=dtype)
+        if out is None:
+            return matriz
+        out[:] = matriz
+        return out
+    if metric == 'carretera':
+        raise ValueError(f"La instancia {instancia.nombre} ({instancia.tipo}) no admite métrica carretera")
+    matriz = np.empty((n, n), dtype=dtype) if out is None else out
+    for i0, bloque in tsplib.bloques_distancias(instancia.tipo, instancia.coords):
+        matriz[i0:i0 + len(bloque)] = bloque
+    return matriz
+
+
+def ruta_matriz(instancia, metric='aereo', directorio=None):
+    """Archivo .npy donde se guarda la matriz de la instancia para esa métrica."""
+    etiqueta = metric if instancia.tipo == 'LATLON' else instancia.tipo.lower()
+    base = os.path.splitext(instancia.ruta)[0]
+    if directorio:
+        base = os.path.join(directorio, os.path.basename(base))
+    return f"{base}.{etiqueta}.npy"
+
+
+def matriz_guardada_vigente(instancia, metric='aereo', directorio=None):
+    """True si el .npy de la matriz existe y es más nuevo que el archivo de la instancia."""
+    ruta = ruta_matriz(instancia, metric, directorio)
+    return os.path.exists(ruta) and os.path.getmtime(ruta) >= os.path.getmtime(instancia.ruta)
+
+
+def cargar_o_construir_matriz(instancia, metric='aereo', directorio=None, dtype=np.float64):
+    """Devuelve la matriz de la instancia abierta con np.load(mmap_mode='r').
+
+    La primera vez se construye escribiendo por bloques directo a un .npy en disco
+    (sin tenerla completa en RAM); las siguientes se reutiliza mientras sea más nueva que
+    el archivo de la instancia. Las instancias .npy ya son matrices y se devuelven tal cual.
+    La de carretera solo se guarda si OSRM respondió completo; si cayó a distancias aéreas
+    o mixtas se devuelve en memoria sin escribirla.
+    """
+    if instancia.tipo == 'EXPLICIT' and instancia.ruta and instancia.ruta.lower().endswith('.npy'):
+        return instancia.pesos
+    ruta = ruta_matriz(instancia, metric, directorio)
+    if matriz_guardada_vigente(instancia, metric, directorio):
+        return np.load(ruta, mmap_mode='r')
+
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    temporal = ruta + '.tmp'
+    if metric == 'carretera':
+        # OSRM entrega la matriz completa en memoria: se escribe solo si es carretera de verdad
+        matriz = matriz_de_instancia(instancia, metric, dtype=dtype)
+        if logica.LAST_ROAD_MATRIX_STATUS != 'ok':
+            return matriz
+        with open(temporal, 'wb') as f:
+            np.save(f, matriz)
+        os.replace(temporal, ruta)
+        return np.load(ruta, mmap_mode='r')
+    n = instancia.n
+    destino = np.lib.format.open_memmap(temporal, mode='w+', dtype=dtype, shape=(n, n))
+    matriz_de_instancia(instancia, metric, dtype=dtype, out=destino)
+    destino.flush()
+    del destino
+    os.replace(temporal, ruta)
+    return np.load(ruta, mmap_mode='r')
@@ -0,0 +1,122 @@
+"""Lectura de instancias TSPLIB (.tsp) y sus funciones de distancia.
+
+Soporta EDGE_WEIGHT_TYPE EUC_2D, GEO y EXPLICIT (FULL_MATRIX, UPPER_ROW, LOWER_ROW,
+UPPER_DIAG_ROW y LOWER_DIAG_ROW). Las distancias siguen la especificación de TSPLIB,
+incluido el redondeo a enteros, para que los óptimos publicados coincidan.
+"""
+import numpy as np
+
+TIPOS_SOPORTADOS = ('EUC_2D', 'GEO', 'EXPLICIT')
+
+_SECCIONES = ('NODE_COORD_SECTION', 'EDGE_WEIGHT_SECTION', 'DISPLAY_DATA_SECTION',
+              'TOUR_SECTION', 'FIXED_EDGES_SECTION', 'EOF')
+
+
+def leer_tsplib(ruta):
+    """Lee un archivo .tsp y devuelve un dict con los campos de cabecera (en mayúsculas),
+    'coords' (arreglo n x 2 o None) y 'pesos' (matriz n x n o None)."""
+    with open(ruta, encoding='utf-8') as f:
+        lineas = f.read().splitlines()
+
+    cabecera = {}
+    secciones = {}
+    actual = None
+    for linea in lineas:
+        texto = linea.strip()
+        if not texto:
+            continue
+        palabra = texto.split(':')[0].strip().upper()
+        if palabra in _SECCIONES:
+            actual = palabra
+            if actual == 'EOF':
+                break
+            secciones[actual] = []
+            continue
+        if actual is None or (':' in texto and palabra.replace('_', '').isalpha()):
+            clave, _, valor = texto.partition(':')
+            cabecera[clave.strip().upper()] = valor.strip()
+            actual = None
+            continue
+        secciones[actual].extend(texto.split())
+
+    n = int(cabecera['DIMENSION'])
+    tipo = cabecera.get('EDGE_WEIGHT_TYPE', 'EXPLICIT').upper()
+    if tipo not in TIPOS_SOPORTADOS:
+        raise ValueError(f"EDGE_WEIGHT_TYPE no soportado: {tipo}")
+
+    datos = dict(cabecera)
+    datos['DIMENSION'] = n
+    datos['EDGE_WEIGHT_TYPE'] = tipo
+    datos['coords'] = None
+    datos['pesos'] = None
+
+    if 'NODE_COORD_SECTION' in secciones:
+        valores = np.array(secciones['NODE_COORD_SECTION'], dtype=np.float64).reshape(n, -1)
+        datos['coords'] = valores[:, 1:3]
+    if tipo == 'EXPLICIT':
+        formato = cabecera.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX').upper()
+        valores = np.array(secciones.get('EDGE_WEIGHT_SECTION', []), dtype=np.float64)
+        datos['pesos'] = _matriz_explicita(valores, n, formato)
+    elif datos['coords'] is None:
+        raise ValueError(f"{ruta}: falta NODE_COORD_SECTION")
+    return datos
+
+
+def _matriz_explicita(valores, n, formato):
+    matriz = np.zeros((n, n))
+    if formato == 'FULL_MATRIX':
+        return valores[:n * n].reshape(n, n).copy()
+    if formato in ('UPPER_ROW', 'LOWER_COL'):
+        filas, columnas = np.triu_indices(n, k=1)
+    elif formato in ('LOWER_ROW', 'UPPER_COL'):
+        filas, columnas = np.tril_indices(n, k=-1)
+    elif formato in ('UPPER_DIAG_ROW', 'LOWER_DIAG_COL'):
+        filas, columnas = np.triu_indices(n)
+    elif formato in ('LOWER_DIAG_ROW', 'UPPER_DIAG_COL'):
+        filas, columnas = np.tril_indices(n)
+    else:
+        raise ValueError(f"EDGE_WEIGHT_FORMAT no soportado: {formato}")
+    matriz[filas, columnas] = valores[:len(filas)]
+    matriz[columnas, filas] = valores[:len(filas)]
+    return matriz
+
+
+def _nint(x):
+    return np.floor(x + 0.5)
+
+
+def _radianes_geo(x):
+    """Convierte el formato DDD.MM de TSPLIB a radianes (constante PI de la especificación)."""
+    grados = np.trunc(x)
+    minutos = x - grados
+    return 3.141592 * (grados + 5.0 * minutos / 3.0) / 180.0
+
+
+def geo_a_latlon(coords):
+    """Coordenadas GEO (DDD.MM) a grados decimales, para dibujarlas en el mapa."""
+    grados = np.trunc(coords)
+    return grados + (coords - grados) * 100.0 / 60.0
+
+
+def bloques_distancias(tipo, coords, filas_por_bloque=1024):
+    """Entrega (inicio, bloque) con las filas de la matriz TSPLIB de tipo EUC_2D o GEO."""
+    coords = np.asarray(coords, dtype=np.float64)
+    if tipo == 'GEO':
+        rad = _radianes_geo(coords)
+    for i0 in range(0, len(coords), filas_por_bloque):
+        i1 = min(i0 + filas_por_bloque, len(coords))
+        if tipo == 'EUC_2D':
+            dx = coords[i0:i1, None, 0] - coords[None, :, 0]
+            dy = coords[i0:i1, None, 1] - coords[None, :, 1]
+            bloque = _nint(np.sqrt(dx**2 + dy**2))
+        elif tipo == 'GEO':
+            lat, lon = rad[:, 0], rad[:, 1]
+            q1 = np.cos(lon[i0:i1, None] - lon[None, :])
+            q2 = np.cos(lat[i0:i1, None] - lat[None, :])
+            q3 = np.cos(lat[i0:i1, None] + lat[None, :])
+            arg = np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0)
+            bloque = np.trunc(6378.388 * np.arccos(arg) + 1.0)
+        else:
+            raise ValueError(f"Tipo sin coordenadas: {tipo}")
+        bloque[np.arange(i1 - i0), np.arange(i0, i1)] = 0.0
+        yield i0, bloque
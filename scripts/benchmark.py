@@ -0,0 +1,209 @@
+"""Benchmark reproducible de las rutas críticas: matriz, costo de ruta, solvers y dibujo.
+
+Uso (desde la raíz del repositorio):
+
+    python -m scripts.benchmark --salida bench_base.json
+    python -m scripts.benchmark --salida bench_nuevo.json --comparar bench_base.json
+
+Las instancias aleatorias usan una semilla fija dentro del sur de Chile; se pueden sumar
+instancias TSPLIB con --tsplib. El dibujo se mide fuera de pantalla con el backend Agg.
+Con --comparar se imprime la razón contra otra corrida y el proceso termina con código 1
+si algún caso empeora más que --umbral.
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import numpy as np
+
+from core import algoritmos
+from core.logica import calcular_costo_ruta, generar_matriz_distancias
+from data.instancias import cargar_instancia, matriz_de_instancia
+
+# (nombre, generador, n máximo para el que se mide)
+SOLVERS = [
+    ('vecino_mas_cercano', algoritmos.generador_vecino_mas_cercano, 5000),
+    ('vecino_mas_cercano_multiarranque', algoritmos.generador_vecino_mas_cercano_multiarranque, 500),
+    ('arbol_doble', algoritmos.generador_arbol_doble, 5000),
+    ('insercion_mas_barata', algoritmos.generador_insercion_mas_barata, 1000),
+    ('insercion_mas_lejana', algoritmos.generador_insercion_mas_lejana, 5000),
+    ('fuerza_bruta', algoritmos.generador_fuerza_bruta, 9),
+    ('fuerza_bruta_vectorizada', algoritmos.generador_fuerza_bruta_vectorizada, 10),
+    ('fuerza_bruta_paralela', algoritmos.generador_fuerza_bruta_paralela, 10),
+    ('held_karp', algoritmos.generador_held_karp, 16),
+    ('branch_and_bound', algoritmos.generador_branch_and_bound, 15),
+    ('busqueda_local', algoritmos.generador_busqueda_local, 2000),
+    # Carga fija (no depende de la cantidad de CPUs) para que las corridas sean comparables
+    ('busqueda_local_iterada', functools.partial(algoritmos.generador_busqueda_local_iterada,
+                                                 cadenas=2, procesos=1, patadas=500), 1000),
+    ('colonia_hormigas', functools.partial(algoritmos.generador_colonia_hormigas, iteraciones=20), 100),
+]
+
+TAMANOS_MATRIZ = [100, 1000, 3000]
+TAMANOS_COSTO = [8, 100, 1000]
+TAMANOS_SOLVER = [8, 10, 14, 16, 100, 1000]
+TAMANOS_DIBUJO = [8, 100, 1000]
+
+
+def coordenadas_aleatorias(n, semilla=0):
+    """Coordenadas (lat, lon) reproducibles en el rectángulo de las ciudades de data.ciudades."""
+    rng = np.random.default_rng(semilla + n)
+    lat = rng.uniform(-40.6, -36.6, n)
+    lon = rng.uniform(-73.7, -71.9, n)
+    return list(zip(lat.tolist(), lon.tolist()))
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - t0)
+    return {'mejor': min(tiempos), 'mediana': statistics.median(tiempos), 'repeticiones': repeticiones}
+
+
+def _consumir(generador):
+    for _ in generador:
+        pass
+
+
+def casos(args):
+    """Genera (grupo, nombre, instancia, n, función sin argumentos, repeticiones)."""
+    instancias = [("aleatoria", n, coordenadas_aleatorias(n, args.semilla), None)
+                  for n in sorted(set(TAMANOS_MATRIZ + TAMANOS_COSTO + TAMANOS_SOLVER + TAMANOS_DIBUJO))]
+    for ruta in args.tsplib:
+        inst = cargar_instancia(ruta)
+        instancias.append((inst.nombre, inst.n, inst.coords_mapa, matriz_de_instancia(inst)))
+
+    for etiqueta, n, coords, matriz_fija in instancias:
+        if matriz_fija is None:
+            matriz = generar_matriz_distancias(coords)
+            if n in TAMANOS_MATRIZ:
+                yield ('matriz', 'generar_matriz_distancias', etiqueta, n,
+                       lambda c=coords: generar_matriz_distancias(c), args.repeticiones)
+        else:
+            matriz = matriz_fija
+
+        if n in TAMANOS_COSTO or matriz_fija is not None:
+            ruta = list(range(n)) + [0]
+            yield ('costo', 'calcular_costo_ruta', etiqueta, n,
+                   lambda r=ruta, m=matriz: calcular_costo_ruta(r, m), args.repeticiones)
+
+        if n in TAMANOS_SOLVER or matriz_fija is not None:
+            for nombre, generador, n_max in SOLVERS:
+                if n <= n_max:
+                    yield ('solver', nombre, etiqueta, n,
+                           lambda g=generador, m=matriz, k=n: _consumir(g(k, m)), args.repeticiones)
+
+        if not args.sin_dibujo and coords is not None and (n in TAMANOS_DIBUJO or matriz_fija is not None):
+            yield ('dibujo', 'dibujar_ruta', etiqueta, n, _caso_dibujo(coords, args), 1)
+
+
+def _caso_dibujo(coords, args):
+    from ui import grafico
+    if args.sin_basemap:
+        grafico._USAR_MAPA_BASE = False
+
+    def funcion():
+        mapa = grafico.MapaGrafico(None, coords, [str(i) for i in range(len(coords))])
+        ruta = list(range(len(coords))) + [0]
+        t0 = time.perf_counter()
+        for _ in range(args.cuadros):
+            mapa.dibujar_ruta(ruta)
+        return (time.perf_counter() - t0) / args.cuadros
+    return funcion
+
+
+def ejecutar(args):
+    resultados = []
+    for grupo, nombre, instancia, n, funcion, repeticiones in casos(args):
+        if grupo == 'dibujo':
+            tiempos = [funcion() for _ in range(args.repeticiones)]
+            medida = {'mejor': min(tiempos), 'mediana': statistics.median(tiempos),
+                      'repeticiones': args.repeticiones, 'por': 'cuadro'}
+        else:
+            medida = medir(funcion, repeticiones)
+        registro = {'grupo': grupo, 'nombre': nombre, 'instancia': instancia, 'n': n, **medida}
+        resultados.append(registro)
+        print(f"{grupo:7} {nombre:34} {instancia:10} n={n:<6} mejor={medida['mejor']:.6f}s "
+              f"mediana={medida['mediana']:.6f}s", file=sys.stderr)
+    return resultados
+
+
+def metadatos():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        'commit': commit,
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def _clave(r):
+    return (r['grupo'], r['nombre'], r['instancia'], r['n'])
+
+
+def comparar(actual, base, umbral):
+    """Imprime la razón actual/base por caso y devuelve la lista de regresiones."""
+    previos = {_clave(r): r for r in base['resultados']}
+    regresiones = []
+    print(f"{'caso':70} {'base':>10} {'actual':>10} {'razón':>7}")
+    for r in actual['resultados']:
+        p = previos.get(_clave(r))
+        if p is None or p['mejor'] <= 0:
+            continue
+        razon = r['mejor'] / p['mejor']
+        marca = '  <-- regresión' if razon > umbral else ''
+        caso = f"{r['grupo']}/{r['nombre']}/{r['instancia']}/n={r['n']}"
+        print(f"{caso:70} {p['mejor']:10.6f} {r['mejor']:10.6f} {razon:7.2f}{marca}")
+        if razon > umbral:
+            regresiones.append(caso)
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de matriz, solvers y dibujo del mapa.")
+    parser.add_argument('--salida', default=None, help="Archivo JSON de resultados (por defecto stdout)")
+    parser.add_argument('--comparar', default=None, help="JSON de una corrida anterior para comparar")
+    parser.add_argument('--umbral', type=float, default=1.25, help="Razón actual/base considerada regresión")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--tsplib', nargs='*', default=[], help="Instancias .tsp adicionales")
+    parser.add_argument('--cuadros', type=int, default=5, help="Cuadros por medición de dibujo")
+    parser.add_argument('--sin-dibujo', action='store_true', help="No medir el dibujo del mapa")
+    parser.add_argument('--sin-basemap', action='store_true', help="Dibujar sin teselas (por defecto se usan las ya precargadas en disco)")
+    args = parser.parse_args(argv)
+
+    informe = {'metadatos': metadatos(), 'resultados': ejecutar(args)}
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)
+        if comparar(informe, base, args.umbral):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+"""Prueba manual del mapa base: precarga las teselas de dos ciudades y dibuja el mapa sin ventana.
+
+    python scripts/probar_mapa_base.py [salida.png]
+
+Necesita red la primera vez; después las teselas salen de la caché local (ui/teselas.py).
+"""
+import os
+import sys
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ui import grafico, teselas  # noqa: E402
+
+coords = [(40.4168, -3.7038), (41.3851, 2.1734)]  # Madrid, Barcelona
+merc = [grafico.ll2mercator(lat, lon) for lat, lon in coords]
+extension = teselas.extension_mapa([m[0] for m in merc], [m[1] for m in merc])
+z = teselas.zoom_automatico(*extension)
+nuevas = grafico._CACHE_TESELAS.precargar(*extension, [z])
+print(f"zoom {z}: {nuevas} teselas descargadas en {grafico._CACHE_TESELAS.directorio}")
+
+mapa = grafico.MapaGrafico(None, coords, ['Madrid', 'Barcelona'])
+mapa.dibujar_ruta([0, 1, 0])
+salida = sys.argv[1] if len(sys.argv) > 1 else 'mapa_base.png'
+mapa.fig.savefig(salida)
+print('mapa guardado en', salida)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Las pruebas importan 'core' y 'data' como lo hacen main.py y cli.py, desde la raíz del repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,91 @@
+"""Motores del registro: los exactos contra una enumeración directa de permutaciones y los
+heurísticos entregando tours válidos."""
+import itertools
+
+import numpy as np
+import pytest
+
+from core.logica import calcular_costo_ruta
+from core.motores import ejecutar, listar_motores, obtener_motor
+
+EXACTOS = [m.nombre for m in listar_motores(exacto=True)]
+
+
+def _matriz(n, semilla, simetrica):
+    azar = np.random.default_rng(semilla)
+    if simetrica:
+        puntos = azar.random((n, 2)) * 100
+        return np.sqrt(((puntos[:, None] - puntos[None]) ** 2).sum(axis=-1))
+    d = azar.random((n, n)) * 100
+    np.fill_diagonal(d, 0.0)
+    return d
+
+
+def _optimo(d):
+    n = len(d)
+    return min(calcular_costo_ruta([0, *perm, 0], d) for perm in itertools.permutations(range(1, n)))
+
+
+def _es_tour(ruta, n):
+    return len(ruta) == n + 1 and ruta[0] == ruta[-1] == 0 and sorted(ruta[:-1]) == list(range(n))
+
+
+@pytest.mark.parametrize('motor', EXACTOS)
+@pytest.mark.parametrize('simetrica', [True, False], ids=['simetrica', 'asimetrica'])
+@pytest.mark.parametrize('semilla', range(3))
+def test_exactos_igualan_a_la_enumeracion(motor, simetrica, semilla):
+    d = _matriz(7, semilla, simetrica)
+    registro = ejecutar(motor, d)
+    assert registro['completo']
+    assert _es_tour(registro['ruta'], 7)
+    assert registro['costo'] == pytest.approx(calcular_costo_ruta(registro['ruta'], d))
+    assert registro['costo'] == pytest.approx(_optimo(d))
+
+
+@pytest.mark.parametrize('motor', ['held_karp', 'branch_and_bound'])
+@pytest.mark.parametrize('n', [1, 2, 3])
+def test_exactos_en_instancias_minimas(motor, n):
+    d = _matriz(n, 0, simetrica=False)
+    registro = ejecutar(motor, d)
+    assert _es_tour(registro['ruta'], n)
+    assert registro['costo'] == pytest.approx(calcular_costo_ruta(registro['ruta'], d))
+
+
+HEURISTICOS = [m.nombre for m in listar_motores(exacto=False)]
+
+
+def _es_ciclo(ruta, n):
+    return len(ruta) == n + 1 and ruta[0] == ruta[-1] and sorted(ruta[:-1]) == list(range(n))
+
+
+@pytest.mark.parametrize('motor', HEURISTICOS)
+@pytest.mark.parametrize('simetrica', [True, False], ids=['simetrica', 'asimetrica'])
+def test_heuristicos_entregan_tours_validos(motor, simetrica):
+    d = _matriz(25, 1, simetrica)
+    registro = ejecutar(motor, d)
+    assert registro['completo']
+    assert _es_ciclo(registro['ruta'], 25)
+    assert registro['costo'] == pytest.approx(calcular_costo_ruta(registro['ruta'], d))
+
+
+@pytest.mark.parametrize('motor', HEURISTICOS)
+def test_heuristicos_no_empeoran_el_optimo(motor):
+    d = _matriz(8, 2, simetrica=True)
+    registro = ejecutar(motor, d)
+    assert _es_ciclo(registro['ruta'], 8)
+    assert registro['costo'] >= _optimo(d) - 1e-9
+
+
+@pytest.mark.parametrize('motor', ['busqueda_local', 'busqueda_local_iterada'])
+def test_busqueda_local_mejora_al_vecino_mas_cercano(motor):
+    d = _matriz(40, 3, simetrica=True)
+    assert ejecutar(motor, d)['costo'] <= ejecutar('nn', d)['costo'] + 1e-9
+
+
+@pytest.mark.parametrize('motor, opciones', [
+    (m.nombre, {}) for m in listar_motores() if m.total_entregas and m.nombre != 'fuerza_bruta_secuencial'
+] + [('colonia_hormigas', {'iteraciones': 5})])
+def test_total_entregas_coincide_con_las_entregas(motor, opciones):
+    d = _matriz(9, 4, simetrica=True)
+    registro = ejecutar(motor, d, **opciones)
+    assert registro['entregas'] == obtener_motor(motor).total_entregas(9, **opciones)
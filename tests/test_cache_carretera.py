@@ -0,0 +1,69 @@
+"""Caché SQLite de distancias por carretera: bloques, contadores, LRU y expiración."""
+import time
+
+from core.cache_carretera import CacheCarretera
+
+PUNTOS = [(-33.45, -70.66), (-36.82, -73.05), (-23.65, -70.40)]
+
+
+def test_guardar_y_obtener_persisten_en_disco(tmp_path):
+    ruta = str(tmp_path / 'carretera.sqlite')
+    cache = CacheCarretera(ruta)
+    cache.guardar(PUNTOS[0], PUNTOS[1], 510.0)
+    cache.cerrar()
+
+    otra = CacheCarretera(ruta)
+    assert otra.obtener(PUNTOS[0], PUNTOS[1]) == 510.0
+    # Es dirigida: la vuelta es otra entrada
+    assert otra.obtener(PUNTOS[1], PUNTOS[0]) is None
+    assert len(otra) == 1
+
+
+def test_obtener_bloque_y_contadores(tmp_path):
+    cache = CacheCarretera(str(tmp_path / 'c.sqlite'))
+    cache.guardar_varios([(PUNTOS[0], PUNTOS[1], 1.0), (PUNTOS[1], PUNTOS[2], 2.0), (PUNTOS[2], PUNTOS[0], 3.0)])
+    bloque = cache.obtener_bloque(PUNTOS, PUNTOS)
+    assert bloque == {(0, 1): 1.0, (1, 2): 2.0, (2, 0): 3.0}
+    # 6 pares fuera de la diagonal: 3 aciertos y 3 fallos; la diagonal no cuenta
+    assert (cache.aciertos, cache.fallos) == (3, 3)
+
+    # Índices de las listas recibidas, también con puntos repetidos
+    assert cache.obtener_bloque([PUNTOS[1], PUNTOS[0], PUNTOS[1]], [PUNTOS[2]]) == {(0, 0): 2.0, (2, 0): 2.0}
+
+    cache.limpiar()
+    assert len(cache) == 0 and (cache.aciertos, cache.fallos) == (0, 0)
+
+
+def test_bloques_grandes_respetan_el_limite_de_parametros(tmp_path):
+    cache = CacheCarretera(str(tmp_path / 'c.sqlite'), max_entradas=None)
+    puntos = [(-30.0 - i * 0.001, -70.0) for i in range(1200)]
+    cache.guardar_varios((puntos[i], puntos[-1 - i], float(i)) for i in range(1200))
+    bloque = cache.obtener_bloque(puntos, puntos)
+    assert len(bloque) == 1200
+    assert bloque[(5, 1194)] == 5.0
+
+
+def test_expulsa_las_menos_usadas(tmp_path):
+    cache = CacheCarretera(str(tmp_path / 'c.sqlite'), max_entradas=2)
+    cache.guardar(PUNTOS[0], PUNTOS[1], 1.0)
+    time.sleep(0.01)
+    cache.guardar(PUNTOS[1], PUNTOS[2], 2.0)
+    time.sleep(0.01)
+    # Usarla la vuelve la más reciente
+    assert cache.obtener(PUNTOS[0], PUNTOS[1]) == 1.0
+    time.sleep(0.01)
+    cache.guardar(PUNTOS[2], PUNTOS[0], 3.0)
+    assert len(cache) == 2
+    assert cache.obtener(PUNTOS[1], PUNTOS[2]) is None
+    assert cache.obtener(PUNTOS[0], PUNTOS[1]) == 1.0
+
+
+def test_entradas_vencidas_no_se_devuelven(tmp_path):
+    cache = CacheCarretera(str(tmp_path / 'c.sqlite'), ttl_segundos=0.05)
+    cache.guardar(PUNTOS[0], PUNTOS[1], 1.0)
+    assert cache.obtener(PUNTOS[0], PUNTOS[1]) == 1.0
+    time.sleep(0.1)
+    assert cache.obtener(PUNTOS[0], PUNTOS[1]) is None
+    # Al guardar se borran las vencidas
+    cache.guardar(PUNTOS[1], PUNTOS[2], 2.0)
+    assert len(cache) == 1
@@ -0,0 +1,53 @@
+"""Caché por contenido: huellas estables y valores que sobreviven al disco."""
+import numpy as np
+
+from core.cache_resultados import CacheResultados, huella
+
+COORDS = [(-33.45, -70.66), (-36.82, -73.05), (-23.65, -70.40)]
+
+
+def test_huella_depende_del_contenido_y_no_del_orden_de_parametros():
+    assert huella(COORDS, 'aereo', motor='nn', tiempo=None) == huella(np.array(COORDS), 'aereo', tiempo=None, motor='nn')
+    assert huella(COORDS, 'aereo', motor='nn') != huella(COORDS, 'aereo', motor='held_karp')
+    assert huella(COORDS, 'aereo') != huella(COORDS, 'carretera')
+    assert huella(COORDS, 'aereo') != huella(COORDS[::-1], 'aereo')
+
+
+def test_ida_y_vuelta_por_disco(tmp_path):
+    matriz = np.arange(9, dtype=np.float64).reshape(3, 3)
+    resultado = {'ruta': [0, 2, 1, 0], 'costo': np.float64(12.5), 'motor': 'nn'}
+    cache = CacheResultados(str(tmp_path))
+    cache.guardar('matriz', matriz)
+    cache.guardar('tour', resultado)
+
+    # Otra instancia (otra corrida u otro proceso) lee lo mismo desde los archivos
+    nueva = CacheResultados(str(tmp_path))
+    assert 'matriz' in nueva and 'tour' in nueva and len(nueva) == 0
+    leida = nueva.obtener('matriz')
+    assert isinstance(leida, np.memmap)
+    np.testing.assert_array_equal(leida, matriz)
+    assert nueva.obtener('tour') == {'ruta': [0, 2, 1, 0], 'costo': 12.5, 'motor': 'nn'}
+    assert nueva.obtener('otra') is None
+    assert (nueva.aciertos, nueva.fallos) == (2, 1)
+
+    nueva.limpiar(disco=True)
+    assert CacheResultados(str(tmp_path)).obtener('tour') is None
+
+
+def test_expulsa_los_menos_usados():
+    cache = CacheResultados(max_entradas=2)
+    cache.guardar('a', 1)
+    cache.guardar('b', 2)
+    cache.obtener('a')
+    cache.guardar('c', 3)
+    assert cache.obtener('b') is None
+    assert cache.obtener('a') == 1 and cache.obtener('c') == 3
+
+
+def test_obtener_o_calcular_calcula_una_sola_vez():
+    cache = CacheResultados()
+    llamadas = []
+    calcular = lambda: llamadas.append(1) or {'costo': 1.0}
+    assert cache.obtener_o_calcular('k', calcular) == {'costo': 1.0}
+    assert cache.obtener_o_calcular('k', calcular) == {'costo': 1.0}
+    assert len(llamadas) == 1
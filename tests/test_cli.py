@@ -0,0 +1,52 @@
+"""Resolución por lotes con caché: qué se reutiliza entre corridas."""
+import pytest
+
+import cli
+from core import logica
+
+
+@pytest.fixture
+def instancia(tmp_path):
+    ruta = tmp_path / 'sur.csv'
+    ruta.write_text("nombre,lat,lon\nSantiago,-33.45,-70.66\nConcepcion,-36.82,-73.05\n"
+                    "Temuco,-38.74,-72.60\nTalca,-35.43,-71.66\nChillan,-36.61,-72.10\n", encoding='utf-8')
+    return str(ruta)
+
+
+@pytest.fixture
+def osrm_caido(monkeypatch):
+    def sin_tabla(coords, **opciones):
+        logica.LAST_ROAD_MATRIX_STATUS = 'unavailable'
+        return None
+    monkeypatch.setattr(logica, '_road_matrix_osrm', sin_tabla)
+
+
+def test_resultado_completo_se_reutiliza(instancia, tmp_path):
+    cache = str(tmp_path / 'cache')
+    primero = cli.resolver(instancia, 'held_karp', cache=cache)
+    segundo = cli.resolver(instancia, 'held_karp', cache=cache)
+    assert 'desde_cache' not in primero
+    assert segundo['desde_cache'] and segundo['ruta'] == primero['ruta']
+    # Otro motor es otra clave
+    assert 'desde_cache' not in cli.resolver(instancia, 'nn', cache=cache)
+
+
+def test_carretera_con_fallback_aereo_no_se_cachea(instancia, tmp_path, osrm_caido):
+    cache = str(tmp_path / 'cache')
+    primero = cli.resolver(instancia, 'held_karp', metrica='carretera', cache=cache)
+    assert primero['estado_carretera'] == 'unavailable'
+    segundo = cli.resolver(instancia, 'held_karp', metrica='carretera', cache=cache)
+    assert 'desde_cache' not in segundo
+
+
+def test_rechaza_instancias_mayores_que_n_max(tmp_path):
+    ruta = tmp_path / 'grande.tsp'
+    coords = "\n".join(f"{i + 1} {i * 7 % 101} {i * 13 % 97}" for i in range(40))
+    ruta.write_text(f"NAME: grande\nDIMENSION: 40\nEDGE_WEIGHT_TYPE: EUC_2D\nNODE_COORD_SECTION\n{coords}\nEOF\n",
+                    encoding='utf-8')
+    with pytest.raises(ValueError, match="n_max"):
+        cli.resolver(str(ruta), 'held_karp')
+    fallido = cli._resolver_seguro((str(ruta), 'held_karp', None, 'aereo', False, False, None, None, False))
+    assert 'n_max' in fallido['error']
+    # El motor por omisión es heurístico y resuelve la instancia
+    assert cli.resolver(str(ruta), 'busqueda_local')['n'] == 40
@@ -0,0 +1,64 @@
+"""Grafo de k vecinas y matriz perezosa contra la matriz densa."""
+import numpy as np
+import pytest
+
+from core.espacial import MatrizPerezosa, grafo_candidatos
+from core.logica import calcular_costo_ruta, matriz_aerea
+from core.motores import ejecutar, listar_motores
+
+
+def _puntos(n, metrica, semilla=0):
+    azar = np.random.default_rng(semilla)
+    # Un cúmulo denso y puntos dispersos: la búsqueda por anillos tiene que crecer
+    puntos = np.vstack([azar.normal(0.0, 0.05, (n // 2, 2)), azar.uniform(-5.0, 5.0, (n - n // 2, 2))])
+    if metrica == 'aereo':
+        return puntos + (-33.0, -70.0)
+    return puntos * 1000.0
+
+
+def _densa(puntos, metrica):
+    if metrica == 'aereo':
+        return matriz_aerea(puntos)
+    return np.sqrt(((puntos[:, None] - puntos[None]) ** 2).sum(axis=-1))
+
+
+@pytest.mark.parametrize('metrica', ['aereo', 'euclidea'])
+@pytest.mark.parametrize('k', [1, 5, 12])
+def test_k_vecinos_igual_a_fuerza_bruta(metrica, k):
+    puntos = _puntos(300, metrica)
+    grafo = grafo_candidatos(puntos, k, metrica)
+    d = _densa(puntos, metrica)
+    np.fill_diagonal(d, np.inf)
+    esperadas = np.sort(d, axis=1)[:, :k]
+    assert grafo.vecinos.shape == (300, k)
+    np.testing.assert_allclose(grafo.distancias, esperadas, rtol=1e-9)
+    np.testing.assert_allclose(np.take_along_axis(d, grafo.vecinos.astype(np.intp), axis=1), esperadas, rtol=1e-9)
+
+
+def test_k_mayor_que_n():
+    grafo = grafo_candidatos(_puntos(4, 'aereo'), 10)
+    assert grafo.vecinos.shape == (4, 3)
+    assert all(i not in fila for i, fila in enumerate(grafo.vecinos.tolist()))
+
+
+def test_matriz_perezosa_igual_a_la_densa():
+    puntos = _puntos(50, 'aereo')
+    perezosa = MatrizPerezosa.desde_coordenadas(puntos, max_filas=4)
+    densa = matriz_aerea(puntos)
+    np.testing.assert_allclose(np.asarray(perezosa), densa)
+    assert perezosa[3, 7] == pytest.approx(densa[3, 7])
+    np.testing.assert_allclose(perezosa[5], densa[5])
+    filas, columnas = np.array([1, 2, 3]), np.array([4, 5, 6])
+    np.testing.assert_allclose(perezosa[filas, columnas], densa[filas, columnas])
+    ruta = list(range(50)) + [0]
+    assert perezosa.costo_ruta(ruta) == pytest.approx(calcular_costo_ruta(ruta, densa))
+    assert len(perezosa._filas) <= 4
+
+
+@pytest.mark.parametrize('motor', [m.nombre for m in listar_motores(grafo=True)])
+def test_motores_de_grafo_entregan_tours_validos(motor):
+    puntos = _puntos(200, 'aereo', semilla=1)
+    registro = ejecutar(motor, grafo_candidatos(puntos, 8))
+    ruta = registro['ruta']
+    assert ruta[0] == ruta[-1] and sorted(ruta[:-1]) == list(range(200))
+    assert registro['costo'] == pytest.approx(calcular_costo_ruta(ruta, matriz_aerea(puntos)))
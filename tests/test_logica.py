@@ -0,0 +1,46 @@
+"""Matrices de distancias aéreas: densa, condensada y costos de rutas."""
+import numpy as np
+import pytest
+
+from core.logica import (MatrizCondensada, calcular_costo_ruta, calcular_costos_lote, euclidian_km,
+                         generar_matriz_distancias, matriz_aerea)
+
+COORDS = [(-33.45, -70.66), (-36.82, -73.05), (-23.65, -70.40), (-38.74, -72.60), (-35.43, -71.66)]
+
+
+def test_matriz_aerea_usa_la_misma_formula_que_euclidian_km():
+    d = matriz_aerea(COORDS)
+    assert d.shape == (5, 5) and not d.diagonal().any()
+    for i in range(5):
+        for j in range(5):
+            if i != j:
+                assert d[i, j] == pytest.approx(euclidian_km(COORDS[i], COORDS[j]))
+
+
+@pytest.mark.parametrize('n', [0, 1, 2, 5])
+def test_condensada_ida_y_vuelta(n):
+    densa = matriz_aerea(COORDS[:n])
+    condensada = generar_matriz_distancias(COORDS[:n], condensada=True)
+    assert isinstance(condensada, MatrizCondensada)
+    assert condensada.nbytes == 8 * n * (n - 1) // 2
+    np.testing.assert_allclose(np.asarray(condensada), densa)
+
+
+def test_condensada_accesos():
+    densa = matriz_aerea(COORDS)
+    m = MatrizCondensada.desde_coordenadas(COORDS)
+    assert m[1, 3] == pytest.approx(densa[1, 3]) and m[3, 1] == pytest.approx(densa[1, 3])
+    assert m[2][2] == 0
+    np.testing.assert_allclose(m[4], densa[4])
+    filas, columnas = np.array([0, 1, 4, 2]), np.array([3, 1, 0, 4])
+    np.testing.assert_allclose(m[filas, columnas], densa[filas, columnas])
+    np.testing.assert_allclose(np.array(list(m)), densa)
+    ruta = [0, 2, 4, 1, 3, 0]
+    assert calcular_costo_ruta(ruta, m) == pytest.approx(calcular_costo_ruta(ruta, densa))
+
+
+def test_costos_lote():
+    densa = matriz_aerea(COORDS)
+    rutas = np.array([[0, 1, 2, 3, 4, 0], [0, 4, 3, 2, 1, 0]])
+    np.testing.assert_allclose(calcular_costos_lote(rutas, densa),
+                               [calcular_costo_ruta(list(r), densa) for r in rutas])
@@ -0,0 +1,219 @@
+"""Consultas a OSRM: por par contra un servidor HTTP local que imita el servicio 'route', y la
+tabla por bloques con una sesión 'requests' simulada."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+pytest.importorskip('requests')
+
+from core import logica
+from core.cache_carretera import CacheCarretera
+
+COORDS = [(-33.45, -70.66), (-36.82, -73.05), (-23.65, -70.40)]
+
+
+def _indice(texto):
+    lon, lat = (float(v) for v in texto.split(','))
+    return COORDS.index((lat, lon))
+
+
+class _Stub(BaseHTTPRequestHandler):
+    """Responde /route/v1/driving/lon,lat;lon,lat con el código que indique server.estado(i, j, intento)."""
+
+    def do_GET(self):
+        ruta = self.path.split('?')[0].rsplit('/', 1)[-1]
+        origen, destino = ruta.split(';')
+        i, j = _indice(origen), _indice(destino)
+        with self.server.lock:
+            intento = self.server.intentos.get((i, j), 0)
+            self.server.intentos[(i, j)] = intento + 1
+        codigo = self.server.estado(i, j, intento)
+        cuerpo = json.dumps({'routes': [{'distance': _km(i, j) * 1000.0}]} if codigo == 200 else {}).encode()
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def _km(i, j):
+    return 100.0 * (i + 1) + j
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    monkeypatch.setattr(logica, '_ROAD_CACHE', CacheCarretera(':memory:'))
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), _Stub)
+    srv.lock = threading.Lock()
+    srv.intentos = {}
+    srv.estado = lambda i, j, intento: 200
+    hilo = threading.Thread(target=srv.serve_forever, daemon=True)
+    hilo.start()
+    srv.url = f"http://127.0.0.1:{srv.server_address[1]}"
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_pares_exitosos_se_guardan_en_cache(servidor):
+    distancias, fallidos = logica._road_pairs_osrm(COORDS, url_base=servidor.url, espera=0)
+    assert fallidos == 0
+    assert distancias == {(i, j): _km(i, j) for i in range(3) for j in range(3) if i != j}
+    assert len(logica._ROAD_CACHE) == 6
+
+    # La segunda vez todo sale de la caché y no hay peticiones nuevas
+    pedidas = sum(servidor.intentos.values())
+    assert logica._road_pairs_osrm(COORDS, url_base=servidor.url, espera=0) == (distancias, 0)
+    assert sum(servidor.intentos.values()) == pedidas
+
+
+def test_reintenta_y_luego_usa_distancia_aerea(servidor):
+    # (0, 1) se recupera al segundo intento; (1, 2) responde 503 siempre
+    def estado(i, j, intento):
+        if (i, j) == (0, 1):
+            return 503 if intento == 0 else 200
+        return 503 if (i, j) == (1, 2) else 200
+    servidor.estado = estado
+
+    distancias, fallidos = logica._road_pairs_osrm(COORDS, url_base=servidor.url, reintentos=2, espera=0)
+    assert fallidos == 1
+    assert distancias[(0, 1)] == _km(0, 1)
+    assert distancias[(1, 2)] == pytest.approx(logica.euclidian_km(COORDS[1], COORDS[2]))
+    assert servidor.intentos[(0, 1)] == 2
+    assert servidor.intentos[(1, 2)] == 3
+    # El fallback aéreo no se guarda como distancia por carretera
+    assert logica._ROAD_CACHE.obtener(COORDS[1], COORDS[2]) is None
+
+
+def test_error_de_cliente_no_se_reintenta(servidor):
+    servidor.estado = lambda i, j, intento: 404 if i == 2 else 200
+    logica._road_pairs_osrm(COORDS, url_base=servidor.url, reintentos=2, espera=0)
+    assert servidor.intentos[(2, 0)] == 1
+
+
+def test_estado_mixto_de_la_matriz(servidor):
+    servidor.estado = lambda i, j, intento: 404 if i == 0 else 200
+    matriz = logica._matriz_carretera_por_pares(COORDS, url_base=servidor.url, espera=0)
+    assert logica.LAST_ROAD_MATRIX_STATUS == 'partial'
+    assert matriz[1, 2] == _km(1, 2)
+    assert matriz[0, 1] == pytest.approx(logica.euclidian_km(COORDS[0], COORDS[1]))
+    assert matriz[0, 0] == 0
+
+    servidor.estado = lambda i, j, intento: 404
+    logica._ROAD_CACHE.limpiar()
+    logica._matriz_carretera_por_pares(COORDS, url_base=servidor.url, espera=0)
+    assert logica.LAST_ROAD_MATRIX_STATUS == 'unavailable'
+
+
+# --- Servicio 'table' por bloques, con una sesión 'requests' simulada ---
+
+PUNTOS = [(-33.45, -70.66), (-36.82, -73.05), (-23.65, -70.40), (-38.74, -72.60), (-35.43, -71.66)]
+
+
+def _km_tabla(i, j):
+    return 10.0 * i + j + 1
+
+
+class _Respuesta:
+    def __init__(self, codigo, datos=None):
+        self.status_code = codigo
+        self._datos = datos or {}
+
+    def json(self):
+        return self._datos
+
+
+class _SesionSimulada:
+    """Responde 'table' y 'route' con _km_tabla; 'falla(servicio, filas, columnas)' decide qué se cae."""
+
+    def __init__(self, falla=lambda servicio, filas, columnas: False):
+        self.falla = falla
+        self.pedidos = []
+
+    def get(self, url, timeout=None):
+        ruta, _, consulta = url.partition('?')
+        servicio = ruta.split('/')[-4]
+        puntos = [PUNTOS.index((lat, lon)) for lon, lat in
+                  (tuple(float(v) for v in p.split(',')) for p in ruta.rsplit('/', 1)[-1].split(';'))]
+        if servicio == 'route':
+            filas, columnas = [puntos[0]], [puntos[1]]
+        else:
+            params = dict(p.split('=') for p in consulta.split('&'))
+            filas = [puntos[int(k)] for k in params['sources'].split(';')]
+            columnas = [puntos[int(k)] for k in params['destinations'].split(';')]
+        self.pedidos.append((servicio, tuple(filas), tuple(columnas)))
+        if self.falla(servicio, filas, columnas):
+            raise ConnectionError("sin red")
+        if servicio == 'route':
+            return _Respuesta(200, {'routes': [{'distance': _km_tabla(filas[0], columnas[0]) * 1000.0}]})
+        return _Respuesta(200, {'distances': [[_km_tabla(i, j) * 1000.0 for j in columnas] for i in filas]})
+
+
+def _esperada():
+    n = len(PUNTOS)
+    return np.array([[0.0 if i == j else _km_tabla(i, j) for j in range(n)] for i in range(n)])
+
+
+@pytest.fixture
+def sesion(monkeypatch):
+    monkeypatch.setattr(logica, '_ROAD_CACHE', CacheCarretera(':memory:'))
+    simulada = _SesionSimulada()
+    monkeypatch.setattr(logica, '_sesion_http', lambda: simulada)
+    return simulada
+
+
+def test_tabla_por_bloques(sesion):
+    matriz = logica._road_matrix_osrm(PUNTOS, tam_bloque=2, espera=0)
+    np.testing.assert_allclose(matriz, _esperada())
+    assert logica.LAST_ROAD_MATRIX_STATUS == 'ok'
+    # El bloque 4x4 es solo diagonal y no se pide
+    assert [b['estado'] for b in logica.LAST_ROAD_MATRIX_TILES].count('ok') == 8
+    assert len(sesion.pedidos) == 8
+
+    # Todo queda en caché: la segunda vez no se pide nada
+    np.testing.assert_allclose(logica._road_matrix_osrm(PUNTOS, tam_bloque=2, espera=0), _esperada())
+    assert len(sesion.pedidos) == 8
+    assert {b['estado'] for b in logica.LAST_ROAD_MATRIX_TILES} == {'cache'}
+
+
+def test_bloque_caido_se_completa_por_pares(sesion):
+    sesion.falla = lambda servicio, filas, columnas: servicio == 'table' and filas[0] == 0 and columnas[0] == 2
+    matriz = logica._road_matrix_osrm(PUNTOS, tam_bloque=2, reintentos=1, espera=0)
+    np.testing.assert_allclose(matriz, _esperada())
+    # Recuperado entero por pares: la matriz sigue siendo de carretera
+    assert logica.LAST_ROAD_MATRIX_STATUS == 'ok'
+    caido = next(b for b in logica.LAST_ROAD_MATRIX_TILES if b['filas'] == (0, 2) and b['columnas'] == (2, 4))
+    assert caido['estado'] == 'por_pares'
+    assert sum(1 for p in sesion.pedidos if p[0] == 'route') == 4
+
+
+def test_bloque_caido_con_pares_caidos_es_parcial(sesion):
+    def falla(servicio, filas, columnas):
+        return (filas[0] == 0 and columnas[0] in (2, 3)) if servicio == 'table' else columnas[0] == 3
+    sesion.falla = falla
+    matriz = logica._road_matrix_osrm(PUNTOS, tam_bloque=2, reintentos=0, espera=0)
+    assert logica.LAST_ROAD_MATRIX_STATUS == 'partial'
+    assert matriz[0, 2] == _km_tabla(0, 2)
+    assert matriz[0, 3] == pytest.approx(logica.euclidian_km(PUNTOS[0], PUNTOS[3]))
+    caido = next(b for b in logica.LAST_ROAD_MATRIX_TILES if b['filas'] == (0, 2) and b['columnas'] == (2, 4))
+    assert caido['estado'] == 'mixto'
+
+
+def test_servidor_inalcanzable(sesion):
+    sesion.falla = lambda servicio, filas, columnas: True
+    assert logica._road_matrix_osrm(PUNTOS, tam_bloque=2, reintentos=0, espera=0) is None
+    assert logica.LAST_ROAD_MATRIX_STATUS == 'unavailable'
+    assert [b['estado'] for b in logica.LAST_ROAD_MATRIX_TILES].count('aereo') == 8
+
+
+def test_pares_consultan_solo_sus_filas_y_columnas_en_cache(sesion):
+    cache = logica._ROAD_CACHE
+    logica._road_pairs_osrm(PUNTOS, [(0, 1), (0, 2)], espera=0)
+    # Una fila x dos columnas: dos consultas a la caché, no n x n
+    assert cache.aciertos + cache.fallos == 2
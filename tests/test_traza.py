@@ -0,0 +1,67 @@
+"""Tramos de tiempo y su exportación en formato Chrome."""
+import json
+
+import pytest
+
+from core import traza
+
+
+@pytest.fixture
+def trazando():
+    traza.activar()
+    yield
+    traza.desactivar()
+
+
+@traza.trazar('calculo', 'prueba')
+def _calculo():
+    with traza.tramo('interno', 'prueba', paso=1):
+        return sum(range(1000))
+
+
+def _generador():
+    for k in range(3):
+        yield [k], float(k)
+
+
+def _dentro(hijo, padre):
+    return (hijo['tid'] == padre['tid'] and hijo['ts'] >= padre['ts']
+            and hijo['ts'] + hijo['dur'] <= padre['ts'] + padre['dur'])
+
+
+def test_desactivada_no_registra():
+    traza.desactivar()
+    gen = _generador()
+    assert traza.generador(gen, 'solver.x') is gen
+    assert traza.tramo('nada') is traza.tramo('otro')
+    antes = len(traza.eventos())
+    _calculo()
+    assert len(traza.eventos()) == antes
+
+
+def test_exporta_tramos_anidados(trazando, tmp_path):
+    with traza.tramo('corrida', 'prueba', n=3):
+        _calculo()
+        entregas = list(traza.generador(_generador(), 'solver.prueba', n=3))
+    assert len(entregas) == 3
+
+    ruta = tmp_path / 'traza.json'
+    assert traza.exportar_chrome(str(ruta)) == 4
+    datos = json.loads(ruta.read_text(encoding='utf-8'))
+    tramos = {e['name']: e for e in datos['traceEvents'] if e['ph'] == 'X'}
+    assert set(tramos) == {'corrida', 'calculo', 'interno', 'solver.prueba'}
+    assert any(e['ph'] == 'M' and e['name'] == 'thread_name' for e in datos['traceEvents'])
+
+    assert _dentro(tramos['interno'], tramos['calculo'])
+    assert _dentro(tramos['calculo'], tramos['corrida'])
+    assert _dentro(tramos['solver.prueba'], tramos['corrida'])
+    assert tramos['interno']['args'] == {'paso': 1}
+    assert tramos['corrida']['cat'] == 'prueba' and tramos['corrida']['args'] == {'n': 3}
+    assert tramos['solver.prueba']['args']['entregas'] == 3
+
+
+def test_error_queda_en_el_tramo(trazando):
+    with pytest.raises(KeyError):
+        with traza.tramo('falla'):
+            raise KeyError('x')
+    assert traza.eventos()[-1]['args'] == {'error': 'KeyError'}
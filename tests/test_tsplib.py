@@ -0,0 +1,105 @@
+"""Lectura de instancias TSPLIB y matrices guardadas junto a la instancia."""
+import os
+
+import numpy as np
+import pytest
+
+from core import logica
+from core.motores import ejecutar
+from data import tsplib
+from data.instancias import cargar_instancia, cargar_o_construir_matriz, matriz_de_instancia, ruta_matriz
+
+BURMA14 = """NAME: burma14
+TYPE: TSP
+COMMENT: 14-Staedte in Burma (Zaw Win)
+DIMENSION: 14
+EDGE_WEIGHT_TYPE: GEO
+EDGE_WEIGHT_FORMAT: FUNCTION
+DISPLAY_DATA_TYPE: COORD_DISPLAY
+NODE_COORD_SECTION
+   1  16.47       96.10
+   2  16.47       94.44
+   3  20.09       92.54
+   4  22.39       93.37
+   5  25.23       97.24
+   6  22.00       96.05
+   7  20.47       97.02
+   8  17.20       96.29
+   9  16.30       97.38
+  10  14.05       98.12
+  11  16.53       97.38
+  12  21.52       95.59
+  13  19.41       97.13
+  14  20.09       94.55
+EOF
+"""
+
+PESOS = np.array([[0, 3, 5, 9],
+                  [3, 0, 4, 7],
+                  [5, 4, 0, 2],
+                  [9, 7, 2, 0]], dtype=float)
+
+
+def _escribir(tmp_path, nombre, texto):
+    ruta = tmp_path / nombre
+    ruta.write_text(texto, encoding='utf-8')
+    return str(ruta)
+
+
+def _explicita(formato, valores):
+    return (f"NAME: cuatro\nTYPE: TSP\nDIMENSION: 4\nEDGE_WEIGHT_TYPE: EXPLICIT\n"
+            f"EDGE_WEIGHT_FORMAT: {formato}\nEDGE_WEIGHT_SECTION\n{valores}\nEOF\n")
+
+
+def test_geo_reproduce_el_optimo_publicado(tmp_path):
+    instancia = cargar_instancia(_escribir(tmp_path, 'burma14.tsp', BURMA14))
+    assert (instancia.nombre, instancia.n, instancia.tipo) == ('burma14', 14, 'GEO')
+    # Las coordenadas DDD.MM se convierten a grados decimales solo para el mapa
+    assert instancia.coords_mapa[0] == pytest.approx((16 + 47 / 60, 96 + 10 / 60))
+    d = matriz_de_instancia(instancia)
+    assert np.array_equal(d, d.T) and not d.diagonal().any()
+    assert ejecutar('held_karp', d)['costo'] == 3323
+
+
+def test_euc_2d_redondea_como_tsplib(tmp_path):
+    texto = "NAME: t\nDIMENSION: 3\nEDGE_WEIGHT_TYPE: EUC_2D\nNODE_COORD_SECTION\n1 0 0\n2 3 4\n3 1 1\nEOF\n"
+    d = matriz_de_instancia(cargar_instancia(_escribir(tmp_path, 't.tsp', texto)))
+    np.testing.assert_array_equal(d, [[0, 5, 1], [5, 0, 4], [1, 4, 0]])
+
+
+@pytest.mark.parametrize('formato, valores', [
+    ('FULL_MATRIX', "0 3 5 9\n3 0 4 7\n5 4 0 2\n9 7 2 0"),
+    ('UPPER_ROW', "3 5 9\n4 7\n2"),
+    ('LOWER_ROW', "3\n5 4\n9 7 2"),
+    ('UPPER_DIAG_ROW', "0 3 5 9 0 4 7 0 2 0"),
+    ('LOWER_DIAG_ROW', "0 3 0 5 4 0 9 7 2 0"),
+])
+def test_formatos_explicitos(tmp_path, formato, valores):
+    datos = tsplib.leer_tsplib(_escribir(tmp_path, 'cuatro.tsp', _explicita(formato, valores)))
+    assert datos['coords'] is None
+    np.testing.assert_array_equal(datos['pesos'], PESOS)
+
+
+def test_tipo_no_soportado(tmp_path):
+    texto = "NAME: t\nDIMENSION: 2\nEDGE_WEIGHT_TYPE: ATT\nNODE_COORD_SECTION\n1 0 0\n2 1 1\nEOF\n"
+    with pytest.raises(ValueError, match="ATT"):
+        tsplib.leer_tsplib(_escribir(tmp_path, 't.tsp', texto))
+
+
+def test_matriz_guardada_se_reutiliza_mapeada(tmp_path):
+    instancia = cargar_instancia(_escribir(tmp_path, 'burma14.tsp', BURMA14))
+    primera = cargar_o_construir_matriz(instancia)
+    assert isinstance(primera, np.memmap)
+    assert os.path.exists(ruta_matriz(instancia))
+    np.testing.assert_array_equal(cargar_o_construir_matriz(instancia), matriz_de_instancia(instancia))
+
+
+def test_matriz_carretera_con_fallback_no_se_guarda(tmp_path, monkeypatch):
+    def sin_tabla(coords, **opciones):
+        logica.LAST_ROAD_MATRIX_STATUS = 'unavailable'
+        return None
+    monkeypatch.setattr(logica, '_road_matrix_osrm', sin_tabla)
+    instancia = cargar_instancia(_escribir(tmp_path, 'dos.csv', "a,-33.45,-70.66\nb,-36.82,-73.05\n"))
+    matriz = cargar_o_construir_matriz(instancia, 'carretera')
+    assert matriz[0, 1] == pytest.approx(logica.matriz_aerea(instancia.coords)[0, 1])
+    assert not os.path.exists(ruta_matriz(instancia, 'carretera'))
@@ -1,16 +1,21 @@
 import math
+import os
 import matplotlib
-matplotlib.use('TkAgg')
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+# MPLBACKEND=Agg permite usar MapaGrafico sin pantalla (benchmarks, pruebas)
+matplotlib.use(os.environ.get('MPLBACKEND', 'TkAgg'))
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import matplotlib.pyplot as plt
 import matplotlib.patheffects as pe
+import numpy as np
 
-try:
-    import contextily as ctx
-    _HAS_CTX = True
-except Exception:
-    ctx = None
-    _HAS_CTX = False
+import threading
+from core.traza import trazar
+from . import teselas
+
+# Mapa base desde la caché local de teselas (ui/teselas.py); False dibuja solo el fondo gris
+_USAR_MAPA_BASE = True
+_CACHE_TESELAS = teselas.CacheTeselas()
 
 def ll2mercator(lat, lon):
     """Convierte Lat/Lon (WGS84) a Web Mercator (metros)."""
@@ -29,10 +34,17 @@ class MapaGrafico:
         self.mercator_coords = [ll2mercator(lat, lon) for lat, lon in self.coords]
         self.xs = [c[0] for c in self.mercator_coords]
         self.ys = [c[1] for c in self.mercator_coords]
+        self._xs_arr = np.array(self.xs)
+        self._ys_arr = np.array(self.ys)
 
         # Configuración de la Figura
         # dpi=100 asegura textos nítidos
-        self.fig, self.ax = plt.subplots(figsize=(6.5, 5.0), dpi=100)
+        if parent is None:
+            # Sin ventana: figura fuera de pantalla con el backend Agg
+            self.fig = Figure(figsize=(6.5, 5.0), dpi=100)
+            self.ax = self.fig.add_subplot()
+        else:
+            self.fig, self.ax = plt.subplots(figsize=(6.5, 5.0), dpi=100)
         
         # Quitamos márgenes blancos de la figura
         self.fig.subplots_adjust(left=0, right=1, top=1, bottom=0)
@@ -40,8 +52,19 @@ class MapaGrafico:
         # Fondo gris oscuro para que se funda con la ventana de la App
         self.fig.patch.set_facecolor('#2b2b2b')
         
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self.parent)
-        self.canvas.get_tk_widget().pack(fill='both', expand=True)
+        if parent is None:
+            self.canvas = FigureCanvasAgg(self.fig)
+        else:
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            self.canvas = FigureCanvasTkAgg(self.fig, master=self.parent)
+            self.canvas.get_tk_widget().pack(fill='both', expand=True)
+
+        # Capa estática (mapa base, pines, etiquetas) guardada como fondo para el blitting
+        self._fondo = None
+        # Rutas animadas sobre el fondo, una capa por resultado ('NN', 'EX'...): {capa: (sombra, línea)}
+        self._capas = {}
+        self._destruido = False
+        self.canvas.mpl_connect('draw_event', self._al_dibujar)
         
         # Dibujar estado inicial
         self.reset_plot()
@@ -54,41 +77,55 @@ class MapaGrafico:
         self.mercator_coords = [ll2mercator(lat, lon) for lat, lon in self.coords]
         self.xs = [c[0] for c in self.mercator_coords]
         self.ys = [c[1] for c in self.mercator_coords]
+        self._xs_arr = np.array(self.xs)
+        self._ys_arr = np.array(self.ys)
         
         self.reset_plot()
 
+    @trazar('MapaGrafico.reset_plot', 'dibujo')
     def reset_plot(self):
+        """Redibuja la capa estática completa. Las rutas se dibujan aparte con dibujar_ruta
+        y se conservan al redibujar."""
+        self._fondo = None
+        rutas = {capa: (linea.get_xdata(), linea.get_ydata(), linea.get_color())
+                 for capa, (_, linea) in self._capas.items()}
+        self._capas = {}
         self.ax.clear()
         
         # 1. CALCULO DE ZOOM "ARMONIOSO" (Más alejado)
+        # PADDING 60%: Esto aleja el mapa para que se vea "armónico" y no apretado
+        extension = None
         if len(self.xs) > 0:
-            xmin, xmax = min(self.xs), max(self.xs)
-            ymin, ymax = min(self.ys), max(self.ys)
-            
-            dx = xmax - xmin if xmax > xmin else 5000.0
-            dy = ymax - ymin if ymax > ymin else 5000.0
-            
-            # Usamos la dimensión mayor para mantener la proporción cuadrada
-            max_dim = max(dx, dy)
-            
-            # PADDING 60%: Esto aleja el mapa para que se vea "armónico" y no apretado
-            pad = max_dim * 0.60 
-            
-            self.ax.set_xlim(xmin - pad, xmax + pad)
-            self.ax.set_ylim(ymin - pad, ymax + pad)
+            extension = teselas.extension_mapa(self.xs, self.ys, padding=0.60)
+            self.ax.set_xlim(extension[0], extension[1])
+            self.ax.set_ylim(extension[2], extension[3])
         
         # 2. MAPA BASE VIBRANTE (Estilo Clásico Claro)
         # Usamos OpenStreetMap.Mapnik para colores vivos (azul agua, verde bosque)
         # Sin filtros de tinte encima para máxima claridad.
-        if _HAS_CTX:
+        # Las teselas salen de la caché en disco; con ventana las que falten se descargan en
+        # segundo plano y el mapa se redibuja al terminar, sin bloquear el hilo de Tk.
+        # Sin ventana (benchmarks, pruebas) solo se usa lo que ya esté en disco: para tener
+        # mapa base ahí hay que precargarlo antes con 'python -m ui.teselas'.
+        completo = False
+        if _USAR_MAPA_BASE and extension is not None:
             try:
-                ctx.add_basemap(self.ax, source=ctx.providers.OpenStreetMap.Mapnik, zoom_adjust=0)
+                z = teselas.zoom_automatico(*extension)
+                imagen, ext_img, completo = _CACHE_TESELAS.mosaico(*extension, z, descargar=False)
+                self.ax.imshow(imagen, extent=ext_img, interpolation='bilinear', zorder=0)
+                self.ax.text(0.995, 0.005, teselas.ATRIBUCION, transform=self.ax.transAxes,
+                             ha='right', va='bottom', fontsize=7, color='#333333', zorder=30,
+                             bbox=dict(boxstyle='square,pad=0.2', fc='white', ec='none', alpha=0.7))
+                self.ax.set_xlim(extension[0], extension[1])
+                self.ax.set_ylim(extension[2], extension[3])
+                if not completo and self.parent is not None:
+                    self._precargar_en_segundo_plano(extension, z)
             except Exception:
-                # Fallback si falla la descarga
-                self.ax.set_facecolor('#f2f2f2')
-                self.ax.grid(True, color='#e0e0e0', linestyle='--')
-        else:
+                completo = False
+        if not completo:
+            # Fallback mientras no haya teselas
             self.ax.set_facecolor('#f2f2f2')
+            self.ax.grid(True, color='#e0e0e0', linestyle='--')
 
         # 3. MARCADORES ESTILO "PIN" (Naranja/Rojo Vibrante)
         self.ax.scatter(self.xs, self.ys, 
@@ -112,29 +149,103 @@ class MapaGrafico:
                                    ha='center', va='bottom', zorder=21)
 
         self.ax.axis('off')
+
+        # 5. RUTAS: se recrean las que había (el clear borró sus artistas)
+        for capa, (rx, ry, color) in rutas.items():
+            sombra, linea = self._capa(capa)
+            sombra.set_data(rx, ry)
+            linea.set_data(rx, ry)
+            linea.set_color(color)
+
+        # El draw_event guarda el fondo (ver _al_dibujar)
         self.canvas.draw()
 
-    def dibujar_ruta(self, ruta_indices, color_linea='#E91E63'):
-        """Dibuja la ruta. Color Rosa Fuerte (#E91E63) para contraste alto."""
+    def _precargar_en_segundo_plano(self, extension, z):
+        if getattr(self, '_precargando', False):
+            return
+        self._precargando = True
+
+        def tarea():
+            nuevas = 0
+            try:
+                nuevas = _CACHE_TESELAS.precargar(*extension, [z])
+            except Exception:
+                pass
+            finally:
+                # Aunque la descarga falle la bandera se libera: el próximo dibujo lo reintenta
+                self._precargando = False
+            def listo():
+                if nuevas and not self._destruido:
+                    self.reset_plot()
+            try:
+                self.parent.after(0, listo)
+            except Exception:
+                pass
+
+        threading.Thread(target=tarea, daemon=True).start()
+
+    def _al_dibujar(self, event):
+        """Tras cada dibujo completo (inicial o por redimensionar) guarda el fondo y repinta la ruta."""
+        self._fondo = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._pintar_ruta()
+
+    def _capa(self, capa):
+        """Artistas (sombra, línea) de la capa, creados la primera vez: persistentes y animados
+        (fuera del fondo), luego solo se actualizan sus datos."""
+        if capa not in self._capas:
+            z = 14 + 2 * len(self._capas)
+            # Sombra suave debajo de la ruta (Efecto profundidad)
+            sombra, = self.ax.plot([], [], '-', color='black', linewidth=4.0, alpha=0.2,
+                                   zorder=z, animated=True)
+            # Línea principal
+            linea, = self.ax.plot([], [], '-', color='#E91E63', linewidth=2.5, alpha=0.9,
+                                  zorder=z + 1, animated=True)
+            self._capas[capa] = (sombra, linea)
+        return self._capas[capa]
+
+    def _pintar_ruta(self):
+        for sombra, linea in self._capas.values():
+            self.ax.draw_artist(sombra)
+            self.ax.draw_artist(linea)
+
+    def _blit(self):
+        if self._fondo is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self._fondo)
+        self._pintar_ruta()
+        self.canvas.blit(self.fig.bbox)
+
+    @trazar('MapaGrafico.dibujar_ruta', 'dibujo')
+    def dibujar_ruta(self, ruta_indices, color_linea='#E91E63', capa='ruta'):
+        """Dibuja la ruta en su capa (cada resultado tiene la suya y no pisa a los demás).
+        Color Rosa Fuerte (#E91E63) para contraste alto.
+        Solo se actualizan los datos de las líneas y se hace blit sobre el fondo guardado."""
         if not ruta_indices:
             return
 
-        # Redibujamos base limpia
-        self.reset_plot()
-        
-        rx = [self.mercator_coords[i][0] for i in ruta_indices]
-        ry = [self.mercator_coords[i][1] for i in ruta_indices]
-        
-        # Sombra suave debajo de la ruta (Efecto profundidad)
-        self.ax.plot(rx, ry, '-', color='black', linewidth=4.0, alpha=0.2, zorder=14)
-        
-        # Línea principal
-        self.ax.plot(rx, ry, '-', color=color_linea, linewidth=2.5, alpha=0.9, zorder=15)
-        
-        self.canvas.draw()
+        idx = np.asarray(ruta_indices, dtype=np.intp)
+        rx = self._xs_arr[idx]
+        ry = self._ys_arr[idx]
+        sombra, linea = self._capa(capa)
+        sombra.set_data(rx, ry)
+        linea.set_data(rx, ry)
+        linea.set_color(color_linea)
+        self._blit()
+
+    def limpiar_ruta(self, capa=None):
+        """Borra la ruta de la capa (todas con capa=None) sin volver a dibujar el mapa base."""
+        for nombre, (sombra, linea) in self._capas.items():
+            if capa is None or nombre == capa:
+                sombra.set_data([], [])
+                linea.set_data([], [])
+        self._blit()
 
     def destroy(self):
         """Libera los recursos de Matplotlib de forma explícita."""
+        self._destruido = True
+        if self.parent is None:
+            return
         # Destruir el widget del canvas de Tkinter
         if self.canvas and self.canvas.get_tk_widget():
             self.canvas.get_tk_widget().destroy()
@@ -0,0 +1,233 @@
+"""Caché local de teselas del mapa base (OpenStreetMap Mapnik) y precarga para un conjunto de ciudades.
+
+Las teselas se guardan en disco como z/x/y.png, con un tope de tamaño: al superarlo se
+borran las usadas hace más tiempo. Precargar la zona permite dibujar el mapa sin red:
+
+    python -m ui.teselas --zoom 6 7 8
+    python -m ui.teselas --instancia ciudades.csv --max-mb 500
+"""
+import argparse
+import io
+import math
+import os
+import threading
+
+import numpy as np
+
+URL_TESELAS = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+# La política de teselas de OpenStreetMap exige mostrar esta atribución sobre el mapa
+ATRIBUCION = "© OpenStreetMap contributors"
+# La política de uso de OpenStreetMap exige identificar la aplicación
+_USER_AGENT = "TSP-Chile/1.0 (Teoria de Grafos)"
+_DIRECTORIO_POR_DEFECTO = os.path.join(os.path.expanduser('~'), '.cache', 'tsp_chile', 'teselas')
+_ORIGEN = 20037508.34
+TAM_TESELA = 256
+
+
+def extension_mapa(xs, ys, padding=0.60):
+    """Límites (xmin, xmax, ymin, ymax) en Web Mercator con el margen que usa MapaGrafico."""
+    xmin, xmax = min(xs), max(xs)
+    ymin, ymax = min(ys), max(ys)
+    dx = xmax - xmin if xmax > xmin else 5000.0
+    dy = ymax - ymin if ymax > ymin else 5000.0
+    # Usamos la dimensión mayor para mantener la proporción cuadrada
+    pad = max(dx, dy) * padding
+    return xmin - pad, xmax + pad, ymin - pad, ymax + pad
+
+
+def _mercator_a_lonlat(x, y):
+    lon = x * 180.0 / _ORIGEN
+    lat = math.degrees(2.0 * math.atan(math.exp(y * math.pi / _ORIGEN)) - math.pi / 2.0)
+    return lon, lat
+
+
+def zoom_automatico(xmin, xmax, ymin, ymax):
+    """Mismo criterio que contextily (zoom 'auto') para que el mapa se vea igual."""
+    oeste, sur = _mercator_a_lonlat(xmin, ymin)
+    este, norte = _mercator_a_lonlat(xmax, ymax)
+    zoom_lon = math.ceil(math.log2(360 * 2.0 / max(este - oeste, 1e-9)))
+    zoom_lat = math.ceil(math.log2(360 * 2.0 / max(norte - sur, 1e-9)))
+    # La extensión más larga (en proporción) manda: así basta un puñado de teselas por eje
+    return int(min(max(min(zoom_lon, zoom_lat), 0), 19))
+
+
+def _tesela_de(x, y, z):
+    """Índices (tx, ty) de la tesela que contiene el punto Web Mercator (x, y)."""
+    k = 2 ** z
+    tx = int((x + _ORIGEN) / (2 * _ORIGEN) * k)
+    ty = int((_ORIGEN - y) / (2 * _ORIGEN) * k)
+    return min(max(tx, 0), k - 1), min(max(ty, 0), k - 1)
+
+
+def teselas_para(xmin, xmax, ymin, ymax, z):
+    """Lista de (x, y) de las teselas de zoom z que cubren la extensión."""
+    x0, y0 = _tesela_de(xmin, ymax, z)
+    x1, y1 = _tesela_de(xmax, ymin, z)
+    return [(tx, ty) for ty in range(y0, y1 + 1) for tx in range(x0, x1 + 1)]
+
+
+class CacheTeselas:
+    """Teselas PNG en disco con tope de tamaño y expulsión de las menos usadas (por mtime)."""
+
+    def __init__(self, directorio=None, max_bytes=200 * 1024 * 1024, url=URL_TESELAS):
+        self.directorio = directorio or os.environ.get('TSP_CACHE_TESELAS', _DIRECTORIO_POR_DEFECTO)
+        self.max_bytes = max_bytes
+        self.url = url
+        self.aciertos = 0
+        self.fallos = 0
+        self._bytes = None
+        self._lock = threading.Lock()
+        self._sesion = None
+
+    def ruta(self, z, x, y):
+        return os.path.join(self.directorio, str(z), str(x), f"{y}.png")
+
+    def tiene(self, z, x, y):
+        return os.path.exists(self.ruta(z, x, y))
+
+    def obtener(self, z, x, y, descargar=True):
+        """Bytes PNG de la tesela; si no está en disco y descargar=True se baja y guarda."""
+        ruta = self.ruta(z, x, y)
+        try:
+            with open(ruta, 'rb') as f:
+                datos = f.read()
+            # Marca de uso reciente para la expulsión
+            os.utime(ruta)
+            self.aciertos += 1
+            return datos
+        except OSError:
+            pass
+        self.fallos += 1
+        if not descargar:
+            return None
+        datos = self._descargar(z, x, y)
+        if datos is not None:
+            self._guardar(ruta, datos)
+        return datos
+
+    def _descargar(self, z, x, y):
+        try:
+            if self._sesion is None:
+                import requests
+                self._sesion = requests.Session()
+                self._sesion.headers['User-Agent'] = _USER_AGENT
+            resp = self._sesion.get(self.url.format(z=z, x=x, y=y), timeout=10)
+            if resp.status_code == 200:
+                return resp.content
+        except Exception:
+            pass
+        return None
+
+    def _guardar(self, ruta, datos):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = ruta + '.tmp'
+        with open(temporal, 'wb') as f:
+            f.write(datos)
+        os.replace(temporal, ruta)
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self.tamano()
+            else:
+                self._bytes += len(datos)
+            if self._bytes > self.max_bytes:
+                self._expulsar()
+
+    def _archivos(self):
+        for raiz, _, nombres in os.walk(self.directorio):
+            for nombre in nombres:
+                if nombre.endswith('.png'):
+                    yield os.path.join(raiz, nombre)
+
+    def tamano(self):
+        return sum(os.path.getsize(r) for r in self._archivos())
+
+    def _expulsar(self):
+        # Se deja la caché al 90% del tope para no expulsar en cada descarga
+        archivos = sorted(((os.path.getmtime(r), os.path.getsize(r), r) for r in self._archivos()))
+        objetivo = self.max_bytes * 0.9
+        for _, tam, ruta in archivos:
+            if self._bytes <= objetivo:
+                break
+            try:
+                os.remove(ruta)
+                self._bytes -= tam
+            except OSError:
+                pass
+
+    def mosaico(self, xmin, xmax, ymin, ymax, z, descargar=True):
+        """Une las teselas de la extensión en una imagen.
+
+        Devuelve (imagen RGBA, (izq, der, abajo, arriba), completo). Las teselas que no se
+        pudieron obtener quedan transparentes y completo es False.
+        """
+        from PIL import Image
+
+        teselas = teselas_para(xmin, xmax, ymin, ymax, z)
+        xs = sorted({t[0] for t in teselas})
+        ys = sorted({t[1] for t in teselas})
+        imagen = np.zeros((len(ys) * TAM_TESELA, len(xs) * TAM_TESELA, 4), dtype=np.uint8)
+        completo = True
+        for tx, ty in teselas:
+            datos = self.obtener(z, tx, ty, descargar=descargar)
+            if datos is None:
+                completo = False
+                continue
+            try:
+                tesela = np.asarray(Image.open(io.BytesIO(datos)).convert('RGBA'))
+            except Exception:
+                completo = False
+                continue
+            fila, col = ys.index(ty) * TAM_TESELA, xs.index(tx) * TAM_TESELA
+            imagen[fila:fila + TAM_TESELA, col:col + TAM_TESELA] = tesela
+
+        lado = 2 * _ORIGEN / 2 ** z
+        extension = (-_ORIGEN + xs[0] * lado, -_ORIGEN + (xs[-1] + 1) * lado,
+                     _ORIGEN - (ys[-1] + 1) * lado, _ORIGEN - ys[0] * lado)
+        return imagen, extension, completo
+
+    def precargar(self, xmin, xmax, ymin, ymax, zooms):
+        """Descarga las teselas que falten para la extensión en cada zoom. Devuelve cuántas bajó."""
+        nuevas = 0
+        for z in zooms:
+            for tx, ty in teselas_para(xmin, xmax, ymin, ymax, z):
+                if not self.tiene(z, tx, ty) and self.obtener(z, tx, ty) is not None:
+                    nuevas += 1
+        return nuevas
+
+
+def main(argv=None):
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    from data.ciudades import CIUDADES
+    from data.instancias import cargar_instancia
+    from ui.grafico import ll2mercator
+
+    parser = argparse.ArgumentParser(description="Precarga las teselas del mapa base para un conjunto de ciudades.")
+    parser.add_argument('--instancia', default=None, help="CSV o TSPLIB GEO (por defecto data.ciudades)")
+    parser.add_argument('--ciudades', type=int, default=None, help="Usar solo las primeras N ciudades")
+    parser.add_argument('--zoom', type=int, nargs='*', default=None,
+                        help="Niveles de zoom (por defecto el automático del mapa y el siguiente)")
+    parser.add_argument('--max-mb', type=float, default=200.0)
+    parser.add_argument('--directorio', default=None)
+    args = parser.parse_args(argv)
+
+    if args.instancia:
+        coords = cargar_instancia(args.instancia).coords_mapa
+        if coords is None:
+            parser.error("La instancia no tiene coordenadas geográficas")
+    else:
+        coords = list(CIUDADES.values())
+    conjuntos = [coords[:args.ciudades]] if args.ciudades else [coords[:k] for k in range(1, len(coords) + 1)]
+
+    cache = CacheTeselas(args.directorio, max_bytes=int(args.max_mb * 1024 * 1024))
+    total = 0
+    for conjunto in conjuntos:
+        merc = [ll2mercator(lat, lon) for lat, lon in conjunto]
+        ext = extension_mapa([m[0] for m in merc], [m[1] for m in merc])
+        z = zoom_automatico(*ext)
+        total += cache.precargar(*ext, args.zoom or [z, z + 1])
+    print(f"{total} teselas descargadas en {cache.directorio} ({cache.tamano() / 1e6:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
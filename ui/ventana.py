@@ -1,29 +1,61 @@
 import customtkinter as ctk
 import time
 import threading
-import math
 import queue
 from data.ciudades import CIUDADES
 from core.logica import generar_matriz_distancias
 import core.logica as logica
-from core.algoritmos import generador_vecino_mas_cercano, generador_fuerza_bruta
+from core.algoritmos import generador_fuerza_bruta_paralela
+from core.motores import listar_motores, obtener_motor
+from core import traza
+from core.cache_resultados import CacheResultados, huella
 from ui.grafico import MapaGrafico
 
-def _fast_forward_thread_target(generador, q, is_closing_func, estimated_time):
-    try:
-        items = list(generador)
-        if is_closing_func() or not items:
-            q.put(None)
+# Milisegundos entre cuadros de animación; cada cuadro vacía la cola y dibuja solo lo último
+_INTERVALO_CUADRO_MS = 33
+# Segundos entre avisos de progreso en el avance rápido
+_INTERVALO_PROGRESO = 0.2
+
+def _publicar(cola, mensaje):
+    """Encola sin bloquear al solver: si la cola está llena se descarta el mensaje más antiguo."""
+    while True:
+        try:
+            cola.put_nowait(mensaje)
             return
-        final_ruta, final_costo = items[-1]
-        q.put({
-            "ruta": final_ruta,
-            "costo": final_costo,
-            "estimated_time": estimated_time
-        })
+        except queue.Full:
+            try:
+                cola.get_nowait()
+            except queue.Empty:
+                pass
+
+def _productor(generador, cola, detener, publicar_pasos=True):
+    """Consume el generador a toda velocidad en un hilo aparte.
+
+    Publica ('paso', ruta, costo, pasos) por cada entrega y al terminar ('fin', ruta, costo,
+    pasos) con la última ruta, para que no se pierda aunque se descarten pasos intermedios.
+    Con publicar_pasos=False (avance rápido) solo se conserva la última entrega, que en estos
+    generadores es la ruta final, y cada _INTERVALO_PROGRESO s se publica ('progreso', None,
+    None, pasos): la memoria no crece con la cantidad de rutas evaluadas.
+    'detener' es la señal de cancelación; se revisa entre entregas y al cancelar se cierra el
+    generador para que libere sus recursos (por ejemplo el pool de procesos).
+    """
+    ruta, costo, pasos = None, 0, 0
+    siguiente = time.perf_counter() + _INTERVALO_PROGRESO
+    try:
+        for ruta, costo in generador:
+            if detener.is_set():
+                return
+            pasos += 1
+            if publicar_pasos:
+                _publicar(cola, ('paso', list(ruta), costo, pasos))
+            elif time.perf_counter() >= siguiente:
+                _publicar(cola, ('progreso', None, None, pasos))
+                siguiente = time.perf_counter() + _INTERVALO_PROGRESO
+        _publicar(cola, ('fin', list(ruta) if ruta is not None else None, costo, pasos))
     except Exception as e:
-        print(f"Error in fast-forward thread: {e}")
-        q.put(None)
+        _publicar(cola, ('error', e, None, pasos))
+    finally:
+        generador.close()
 
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
@@ -43,19 +75,31 @@ class AppTSP(ctk.CTk):
         
         self.nombres = all_city_names[:initial_num_cities]
         self.coords = [CIUDADES[name] for name in self.nombres]
-        self.matriz = generar_matriz_distancias(self.coords, metric='aereo')
+        # Matrices y resultados por configuración (ciudades + métrica): volver a una ya
+        # resuelta no recalcula nada
+        self.cache = CacheResultados()
+        self.metrica = 'aereo'
+        self.matriz = self.cache.obtener_o_calcular(huella(self.coords, 'aereo', tipo='matriz'),
+                                                    lambda: generar_matriz_distancias(self.coords, metric='aereo'))
         self.n = len(self.nombres)
         self.res_optimo = None
         self.res_heuristica = None
+        self.clave_corrida = None
         self.animation_after_id = None
         self.last_route = None
         self.last_cost = 0
 
-        # Vars for time estimation
-        self.bf_total_steps = 0
-        self.bf_time_per_step_samples = []
-        self.bf_last_step_time = None
-        self.bf_estimated_time = None
+        # Pipeline productor/consumidor de la corrida actual
+        self.cola = None
+        self.detener = None
+        self.omitir = False
+        self.avance = None
+        self.motor_actual = None
+        self.estadisticas = {}
+        self.pasos = 0
+        self.evaluadas_previas = 0
+        self.t_previo = None
+        self.t_tramo = None
 
         self.grid_columnconfigure(1, weight=1)
         self.grid_rowconfigure(0, weight=1)
@@ -91,6 +135,10 @@ class AppTSP(ctk.CTk):
         
         ctk.CTkButton(btn_frame, text="▶ NN", command=self.run_nn, height=40).grid(row=0, column=0, padx=(0, 5), sticky='ew')
         ctk.CTkButton(btn_frame, text="✕ Limpiar", fg_color="#FF6B6B", hover_color="#FF5252", command=self.limpiar_nn, height=40).grid(row=0, column=1, padx=(5, 0), sticky='ew')
+        # Los motores salen del registro de core.motores: uno nuevo aparece aquí sin tocar la ventana
+        self.heuristicas = {m.descripcion: m.nombre for m in listar_motores(exacto=False)}
+        self.var_heuristica = ctk.StringVar(value=next(iter(self.heuristicas)))
+        ctk.CTkOptionMenu(btn_frame, values=list(self.heuristicas), variable=self.var_heuristica).grid(row=1, column=0, columnspan=2, pady=(6, 0), sticky='ew')
         
         btn_frame2 = ctk.CTkFrame(self.sidebar, fg_color="transparent")
         btn_frame2.grid(row=4, column=0, padx=20, pady=8, sticky='ew')
@@ -98,6 +146,10 @@ class AppTSP(ctk.CTk):
         
         ctk.CTkButton(btn_frame2, text="▶ BF", fg_color="#D35B58", hover_color="#C74542", command=self.run_ex, height=40).grid(row=0, column=0, padx=(0, 5), sticky='ew')
         ctk.CTkButton(btn_frame2, text="✕ Limpiar", fg_color="#FF6B6B", hover_color="#FF5252", command=self.limpiar_bf, height=40).grid(row=0, column=1, padx=(5, 0), sticky='ew')
+        self.exactos = {m.descripcion: m.nombre for m in listar_motores(exacto=True)}
+        self.var_exacto = ctk.StringVar(value=next(iter(self.exactos)))
+        ctk.CTkOptionMenu(btn_frame2, values=list(self.exactos), variable=self.var_exacto,
+                          fg_color="#D35B58", button_color="#C74542").grid(row=1, column=0, columnspan=2, pady=(6, 0), sticky='ew')
 
         self.btn_skip = ctk.CTkButton(self.sidebar, text="≫ Omitir Animación", command=self.skip_animation, height=30, fg_color="#333", hover_color="#444")
         self.btn_skip.grid(row=5, column=0, padx=20, pady=(5, 10), sticky='ew')
@@ -125,6 +177,7 @@ class AppTSP(ctk.CTk):
         if num == self.n:
             return
 
+        self.cancelar_corrida()
         self.lbl_status.configure(text=f"Cambiando a {num} ciudades...", text_color="#FFA500")
 
         # Get the first 'num' cities from the original list
@@ -154,13 +207,14 @@ class AppTSP(ctk.CTk):
     def on_closing(self):
         if self.is_closing: return
         self.is_closing = True
-        if self.animation_after_id:
-            self.after_cancel(self.animation_after_id)
+        self.cancelar_corrida()
         if self.mapa:
             self.mapa.destroy()
         self.destroy()
 
     def cambiar_metrica(self):
+        # La corrida en curso resuelve la matriz anterior: su resultado no vale para la nueva
+        self.cancelar_corrida()
         m = 'carretera' if self.var_metric.get() == "Carretera" else 'aereo'
         self.lbl_status.configure(text=f"Recalculando matriz ({m})...", text_color="#FFA500")
         
@@ -169,8 +223,13 @@ class AppTSP(ctk.CTk):
 
     def _recalc_matriz(self, m):
         if self.is_closing: return
+        coords = self.coords
+        clave = huella(coords, m, tipo='matriz')
+        matriz = self.cache.obtener(clave)
+        desde_cache = matriz is not None
         try:
-            matriz = generar_matriz_distancias(self.coords, metric=m)
+            if not desde_cache:
+                matriz = generar_matriz_distancias(coords, metric=m)
         except Exception as e:
             if self.is_closing: return
             def update_status_error():
@@ -179,10 +238,16 @@ class AppTSP(ctk.CTk):
             self.after(0, update_status_error)
             return
 
+        # Solo se guarda la de carretera cuando OSRM respondió completa (si no, es aérea o mixta);
+        # por lo mismo un acierto de carretera siempre tiene estado 'ok'
+        status = 'ok' if desde_cache else getattr(logica, 'LAST_ROAD_MATRIX_STATUS', None)
+        metrica = 'aereo' if m == 'aereo' or status == 'unavailable' else ('carretera' if status == 'ok' else None)
+        if not desde_cache and metrica == m:
+            self.cache.guardar(clave, matriz)
+
         # Impresiones en consola (seguras, no afectan UI)
-        if not self.is_closing:
+        if not self.is_closing and not desde_cache:
             try:
-                status = getattr(logica, 'LAST_ROAD_MATRIX_STATUS', None)
                 print(f"[INFO] metric={m} LAST_ROAD_MATRIX_STATUS={status}")
                 names = self.nombres
                 colw = 12
@@ -200,12 +265,13 @@ class AppTSP(ctk.CTk):
 
         # Actualizar UI en hilo principal
         def _apply():
-            if self.is_closing: return
+            if self.is_closing or coords is not self.coords: return
             
             self.matriz = matriz
-            status = getattr(logica, 'LAST_ROAD_MATRIX_STATUS', None)
             
-            if m == 'carretera':
+            if desde_cache:
+                self.lbl_status.configure(text=f"Matriz {'carretera' if m == 'carretera' else 'aérea'} (caché)", text_color="#4ADE80")
+            elif m == 'carretera':
                 if status == 'ok':
                     self.lbl_status.configure(text=f"Matriz carretera lista", text_color="#4ADE80")
                 elif status == 'unavailable':
@@ -215,14 +281,7 @@ class AppTSP(ctk.CTk):
             else:
                 self.lbl_status.configure(text=f"Matriz recalculada (aérea)", text_color="#4ADE80")
             
-            self.res_optimo = None
-            self.res_heuristica = None
-            self.lbl_gap.configure(text="GAP: -")
-            
-            try:
-                self.mapa.reset_plot()
-            except Exception:
-                pass
+            self._restaurar_resultados(metrica)
 
         # Usar try-except en self.after por si la ventana se destruye justo antes
         if not self.is_closing:
@@ -232,6 +291,7 @@ class AppTSP(ctk.CTk):
                 pass
 
     def forzar_carretera(self):
+        self.cancelar_corrida()
         self.lbl_status.configure(text="Forzando cálculo carretera...", text_color="#FFA500")
         thread = threading.Thread(target=self._force_carretera_thread, daemon=True)
         thread.start()
@@ -252,13 +312,8 @@ class AppTSP(ctk.CTk):
             if self.is_closing: return
             self.matriz = matriz
             self.lbl_status.configure(text="Matriz carretera (forzada) lista", text_color="#4ADE80")
-            self.res_optimo = None
-            self.res_heuristica = None
-            self.lbl_gap.configure(text="GAP: -")
-            try:
-                self.mapa.reset_plot()
-            except Exception:
-                pass
+            # Par a par puede quedar mixta si fallan llamadas: no se asocia a la métrica carretera
+            self._restaurar_resultados(None)
             
             # Print consola
             names = self.nombres
@@ -277,10 +332,50 @@ class AppTSP(ctk.CTk):
             except Exception:
                 pass
 
+    def _restaurar_resultados(self, metrica):
+        """Fija la métrica de la matriz actual y recupera los resultados NN/EX ya calculados
+        para esta configuración (None: la matriz no corresponde a una métrica cacheable)."""
+        self.metrica = metrica
+        self.res_optimo = self.res_heuristica = None
+        self.lbl_gap.configure(text="GAP: -")
+        try:
+            self.mapa.limpiar_ruta()
+        except Exception:
+            pass
+        if metrica is None:
+            return
+
+        # Se recupera el resultado del motor elegido en cada menú: el de otro motor no vale
+        seleccion = {"NN": self.heuristicas[self.var_heuristica.get()], "EX": self.exactos[self.var_exacto.get()]}
+        guardados = {tipo: self.cache.obtener(self._clave_resultado(tipo, nombre, metrica))
+                     for tipo, nombre in seleccion.items()}
+        lineas = []
+        for tipo, color in (("NN", "#3B8ED0"), ("EX", "#D35B58")):
+            guardado = guardados[tipo]
+            if guardado is None:
+                continue
+            if tipo == "NN":
+                self.res_heuristica = guardado['costo']
+            else:
+                self.res_optimo = guardado['costo']
+            self.mapa.dibujar_ruta(guardado['ruta'], color, capa=tipo)
+            lineas.append(f"{tipo} (caché): {guardado['costo']:>8.2f} km — {guardado['motor']}")
+        if lineas:
+            self.txt_log.configure(state="normal")
+            self.txt_log.delete("0.0", "end")
+            self.txt_log.insert("0.0", "\n".join(lineas))
+            self.txt_log.configure(state="disabled")
+        self._mostrar_gap()
+
+    def _mostrar_gap(self):
+        if self.res_optimo is not None and self.res_heuristica is not None:
+            gap = ((self.res_heuristica - self.res_optimo) / self.res_optimo) * 100
+            self.lbl_gap.configure(text=f"GAP: {gap:.2f}%", text_color="#FFD700" if gap > 10 else "#4ADE80")
+
     def limpiar_nn(self):
         self.res_heuristica = None
         self.lbl_status.configure(text="NN Limpio", text_color="#FFA500")
-        self.mapa.reset_plot()
+        self.mapa.limpiar_ruta("NN")
         self.txt_log.configure(state="normal")
         self.txt_log.delete("0.0", "end")
         self.txt_log.insert("0.0", "Datos NN borrados")
@@ -291,7 +386,7 @@ class AppTSP(ctk.CTk):
     def limpiar_bf(self):
         self.res_optimo = None
         self.lbl_status.configure(text="BF Limpio", text_color="#FFA500")
-        self.mapa.reset_plot()
+        self.mapa.limpiar_ruta("EX")
         self.txt_log.configure(state="normal")
         self.txt_log.delete("0.0", "end")
         self.txt_log.insert("0.0", "Datos BF borrados")
@@ -300,30 +395,63 @@ class AppTSP(ctk.CTk):
             self.lbl_gap.configure(text="GAP: -")
 
     def run_nn(self):
-        self.start_algo(generador_vecino_mas_cercano(self.n, self.matriz), "NN", "#3B8ED0")
+        self._correr_motor(self.heuristicas[self.var_heuristica.get()], "NN", "#3B8ED0")
 
     def run_ex(self):
-        # Setup for time estimation
-        if self.n > 1:
-            self.bf_total_steps = math.factorial(self.n - 1)
-        else:
-            self.bf_total_steps = 1
-        self.bf_time_per_step_samples = []
-        self.bf_last_step_time = None
-        self.start_algo(generador_fuerza_bruta(self.n, self.matriz), "EX", "#D35B58")
-
-    def start_algo(self, generador, tipo, color):
+        self._correr_motor(self.exactos[self.var_exacto.get()], "EX", "#D35B58")
+
+    def _clave_resultado(self, tipo, nombre, metrica, **opciones):
+        """Clave del resultado en la caché: ciudades, métrica, motor y sus opciones (como en cli.py)."""
+        return huella(self.coords, metrica, tipo=tipo, motor=nombre, **opciones)
+
+    def _correr_motor(self, nombre, tipo, color, **opciones):
+        motor = obtener_motor(nombre)
+        estadisticas = {}
+        total = motor.total_entregas(self.n, **opciones) if motor.total_entregas else None
+        self.motor_actual = motor
+        self.estadisticas = estadisticas
+        # La clave se fija al iniciar: si la matriz cambia durante la corrida el resultado
+        # queda asociado a la configuración con la que se calculó
+        clave = self._clave_resultado(tipo, nombre, self.metrica, **opciones) if self.metrica else None
+        # Fracción según las entregas esperadas; evaluaciones según el motor o, si no las informa, entregas
+        self.start_algo(motor.crear(self.n, self.matriz, estadisticas, **opciones), tipo, color,
+                        avance=lambda pasos: (pasos / total if total else None,
+                                              estadisticas.get('evaluadas', pasos)),
+                        clave=clave)
+
+    def _iniciar_productor(self, generador, publicar_pasos=True):
+        if self.detener:
+            self.detener.set()
+        self.cola = queue.Queue(maxsize=64)
+        self.detener = threading.Event()
+        threading.Thread(target=_productor, args=(generador, self.cola, self.detener, publicar_pasos),
+                         daemon=True).start()
+
+    def cancelar_corrida(self):
+        """Aborta la corrida en curso: detiene el productor y la animación."""
+        if self.detener:
+            self.detener.set()
+        if self.animation_after_id:
+            self.after_cancel(self.animation_after_id)
+            self.animation_after_id = None
+        self.btn_skip.configure(state="disabled")
+
+    def start_algo(self, generador, tipo, color, avance=None, clave=None):
         if self.animation_after_id:
             self.after_cancel(self.animation_after_id)
         
-        self.gen = generador
         self.tipo_actual = tipo
         self.color_actual = color
+        self.clave_corrida = clave
         self.start_time = time.time()
-        
-        if self.tipo_actual == "EX":
-            self.btn_skip.configure(state="normal")
-            self.bf_last_step_time = time.time()
+        self.omitir = False
+        self.avance = avance
+        self.pasos = 0
+        self.evaluadas_previas = 0
+        self.t_previo = self.t_tramo = self.start_time
+        self.last_route, self.last_cost = None, 0
+        self._iniciar_productor(generador)
+        self.btn_skip.configure(state="normal")
 
         self.lbl_status.configure(text=f"Ejecutando {tipo}...", text_color=color)
         self.txt_log.configure(state="normal")
@@ -335,50 +463,52 @@ class AppTSP(ctk.CTk):
         if not self.animation_after_id:
             return
 
-        self.bf_estimated_time = None
-        if self.tipo_actual == "EX" and self.bf_time_per_step_samples:
-            avg_time = sum(self.bf_time_per_step_samples) / len(self.bf_time_per_step_samples)
-            self.bf_estimated_time = avg_time * self.bf_total_steps
-        
-        self.after_cancel(self.animation_after_id)
-        self.animation_after_id = None
+        self.omitir = True
         self.btn_skip.configure(state="disabled")
         self.lbl_status.configure(text="Finalizando cálculo...", text_color="#FFA500")
-        
-        thread = threading.Thread(target=self._fast_forward_algo, daemon=True)
-        thread.start()
-
-    def _fast_forward_algo(self):
-        try:
-            items = list(self.gen)
-            if self.is_closing or not items: return
-            final_ruta, final_costo = items[-1]
-            
-            def final_update():
-                if self.is_closing: return
-                self._finalize_run(final_ruta, final_costo, override_dt=self.bf_estimated_time)
-            
-            self.after(0, final_update)
-        except Exception as e:
-            print(f"Error in fast-forward: {e}")
-
-    def _finalize_run(self, final_ruta, final_costo, override_dt=None):
+        if self.motor_actual.nombre == "fuerza_bruta_secuencial":
+            # Sin animación no importa el orden: se reparte la búsqueda entre todos los núcleos
+            estadisticas = self.estadisticas = {}
+            self.avance = lambda pasos: (
+                estadisticas.get('bloques_completados', 0) / max(estadisticas.get('bloques_totales', 1), 1),
+                estadisticas.get('evaluadas', 0))
+            self.pasos = 0
+            self.evaluadas_previas = 0
+            self.t_previo = self.t_tramo = time.time()
+            # Prefijos de dos ciudades: bloques chicos para que el progreso avance parejo
+            # y la cancelación no espere un bloque largo
+            generador = generador_fuerza_bruta_paralela(self.n, self.matriz, largo_prefijo=2,
+                                                        estadisticas=estadisticas)
+            self._iniciar_productor(traza.generador(generador, "solver.fuerza_bruta_paralela", n=self.n),
+                                    publicar_pasos=False)
+
+    def _finalize_run(self, final_ruta, final_costo):
         if self.is_closing: return
 
-        if override_dt is not None:
-            dt = override_dt
-            time_str = f"~{dt:.2f}s (est.)"
-        else:
-            dt = time.time() - self.start_time
-            time_str = f"{dt:.3f}s"
+        self.btn_skip.configure(state="disabled")
+        self.animation_after_id = None
+        if final_ruta is None:
+            # Terminó sin entregar ningún tour completo: no hay nada que dibujar ni guardar
+            self.lbl_status.configure(text=f"{self.tipo_actual}: sin ruta completa", text_color="#FFA500")
+            return
+
+        dt = time.time() - self.start_time
+        time_str = f"{dt:.3f}s"
         
         if self.tipo_actual == "NN": self.res_heuristica = final_costo
         else: self.res_optimo = final_costo
         
-        self.mapa.dibujar_ruta(final_ruta, self.color_actual)
+        self.mapa.dibujar_ruta(final_ruta, self.color_actual, capa=self.tipo_actual)
         self.lbl_status.configure(text=f"✓ {self.tipo_actual} Fin: {time_str}", text_color="#4ADE80")
         
-        log_lines = [f"Costo total: {final_costo:>8.2f} km", "─" * 30]
+        log_lines = [f"Costo total: {final_costo:>8.2f} km"]
+        if self.motor_actual:
+            evaluadas = self.estadisticas.get('evaluadas', self.pasos)
+            log_lines.append(f"Motor: {self.motor_actual.descripcion}")
+            log_lines.append(f"Evaluadas: {evaluadas:,} ({evaluadas / max(dt, 1e-9):,.0f}/s)")
+            if 'nodos_expandidos' in self.estadisticas:
+                log_lines.append(f"Nodos: {self.estadisticas['nodos_expandidos']:,}")
+        log_lines.append("─" * 30)
         for i in range(len(final_ruta) - 1):
             u, v = final_ruta[i], final_ruta[i+1]
             dist = self.matriz[u][v]
@@ -389,36 +519,67 @@ class AppTSP(ctk.CTk):
         self.txt_log.insert("0.0", "\n".join(log_lines))
         self.txt_log.configure(state="disabled")
 
-        if self.res_optimo is not None and self.res_heuristica is not None:
-            gap = ((self.res_heuristica - self.res_optimo) / self.res_optimo) * 100
-            self.lbl_gap.configure(text=f"GAP: {gap:.2f}%", text_color="#FFD700" if gap > 10 else "#4ADE80")
-        
-        self.btn_skip.configure(state="disabled")
-        self.animation_after_id = None
+        self._mostrar_gap()
+        if self.clave_corrida is not None and self.motor_actual:
+            self.cache.guardar(self.clave_corrida, {'ruta': [int(c) for c in final_ruta], 'costo': float(final_costo),
+                                                    'motor': self.motor_actual.descripcion})
+
+    def _mostrar_progreso(self):
+        """Fracción completada, rutas por segundo y tiempo restante estimado del tramo actual."""
+        ahora = time.time()
+        if ahora - self.t_previo < 0.5:
+            return
+        texto = "Finalizando cálculo..." if self.omitir else f"Ejecutando {self.tipo_actual}..."
+        fraccion, evaluadas = self.avance(self.pasos) if self.avance else (None, self.pasos)
+        ritmo = (evaluadas - self.evaluadas_previas) / (ahora - self.t_previo)
+        self.evaluadas_previas, self.t_previo = evaluadas, ahora
+        partes = [texto]
+        if fraccion:
+            fraccion = min(fraccion, 1.0)
+            restante = (ahora - self.t_tramo) * (1 - fraccion) / fraccion
+            partes.append(f"{fraccion:.0%}")
+        partes.append(f"{ritmo:,.0f} rutas/s")
+        if fraccion:
+            partes.append(f"ETA {restante:.1f}s")
+        self.lbl_status.configure(text=" · ".join(partes))
 
     def animar(self):
+        """Un cuadro: vacía la cola, dibuja solo la última ruta y muestra el progreso del solver."""
         if self.is_closing: return
 
-        if self.tipo_actual == "EX" and self.bf_last_step_time is not None:
-            step_duration = time.time() - self.bf_last_step_time
-            self.bf_time_per_step_samples.append(step_duration)
-            if len(self.bf_time_per_step_samples) > 10:
-                self.bf_time_per_step_samples.pop(0)
-        self.bf_last_step_time = time.time()
+        ultimo, final = None, None
+        while True:
+            try:
+                mensaje = self.cola.get_nowait()
+            except queue.Empty:
+                break
+            if mensaje[0] == 'paso':
+                ultimo = mensaje
+                self.pasos = mensaje[3]
+            elif mensaje[0] == 'progreso':
+                self.pasos = mensaje[3]
+            else:
+                final = mensaje
+                break
+
+        if ultimo is not None:
+            _, self.last_route, self.last_cost, _ = ultimo
+
+        if final is not None:
+            tipo, ruta, costo, self.pasos = final
+            if tipo == 'error':
+                print(f"Error en el solver: {ruta}")
+                self.lbl_status.configure(text=f"Error: {ruta}", text_color="#FF6B6B")
+                self.btn_skip.configure(state="disabled")
+                self.animation_after_id = None
+                return
+            if ruta is None:
+                ruta, costo = self.last_route, self.last_cost
+            self._finalize_run(ruta, costo)
+            return
 
-        try:
-            ruta, costo = next(self.gen)
-            self.last_route, self.last_cost = ruta, costo
-            
-            if self.is_closing: return
-            
-            self.mapa.dibujar_ruta(ruta, self.color_actual)
-            # ... (resto de la lógica de UI sin cambios)
-            
-            self.animation_after_id = self.after(50, self.animar) 
-                
-        except StopIteration:
-            self._finalize_run(self.last_route, self.last_cost)
-        except Exception as e:
-            # ... (manejo de errores sin cambios)
-            pass
\ No newline at end of file
+        if ultimo is not None and not self.omitir:
+            self.mapa.dibujar_ruta(self.last_route, self.color_actual, capa=self.tipo_actual)
+
+        self._mostrar_progreso()
+        self.animation_after_id = self.after(_INTERVALO_CUADRO_MS, self.animar)